@@ -0,0 +1,51 @@
+import random
+import sys
+import time
+
+from queueit_knownuserv3.batch_evaluator import BatchUrlEvaluator
+from queueit_knownuserv3.http_context_providers import HttpContextProvider
+from queueit_knownuserv3.integration_config_helpers import IntegrationEvaluator
+from benchmarks.bench_url_decision_table import _createConfig
+
+EVALUATOR_SAMPLE_SIZE = 20000
+
+
+def _createUrls(rnd, rowCount, integrationCount):
+    return ["https://shop{}.example.com/campaign{}/item{}".format(
+        rnd.randrange(10), rnd.randrange(integrationCount * 2), rnd.randrange(100))
+        for _ in range(rowCount)]
+
+
+def main():
+    rowCount = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    integrationCount = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rnd = random.Random(41)
+    customerIntegration = _createConfig(integrationCount)
+    urls = _createUrls(rnd, rowCount, integrationCount)
+    batchEvaluator = BatchUrlEvaluator(customerIntegration)
+
+    start = time.perf_counter()
+    hosts, paths, pageUrls = BatchUrlEvaluator.splitUrls(urls)
+    splitSeconds = time.perf_counter() - start
+    start = time.perf_counter()
+    result = batchEvaluator.evaluate(hosts, paths, pageUrls)
+    batchSeconds = time.perf_counter() - start
+
+    evaluator = IntegrationEvaluator()
+    provider = HttpContextProvider()
+    sample = urls[:EVALUATOR_SAMPLE_SIZE]
+    start = time.perf_counter()
+    for url in sample:
+        evaluator.getMatchedIntegrationConfig(customerIntegration, url, provider)
+    evaluatorSeconds = (time.perf_counter() - start) * rowCount / len(sample)
+
+    print("rows: {}, integrations: {}, matched: {}".format(
+        rowCount, integrationCount, rowCount - result.getNoMatchCount()))
+    print("{:<48}{:>10.2f} s".format("splitUrls (host/path columns)", splitSeconds))
+    print("{:<48}{:>10.2f} s".format("BatchUrlEvaluator.evaluate", batchSeconds))
+    print("{:<48}{:>10.2f} s".format("IntegrationEvaluator per URL (extrapolated)",
+                                     evaluatorSeconds))
+
+
+if __name__ == "__main__":
+    main()
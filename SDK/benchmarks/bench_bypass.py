@@ -0,0 +1,42 @@
+import timeit
+
+from queueit_knownuserv3.bypass_rules import BypassRules
+from queueit_knownuserv3.integration_config_helpers import UrlValidatorHelper
+from queueit_knownuserv3.queueit_helpers import QueueitHelpers
+
+NUMBER = 200000
+
+URL = "https://shop.example.com/static/img/products/sneakers-limited.png?v=42"
+TRIGGER_PART = {
+    "UrlPart": "PagePath",
+    "ValidatorType": "UrlValidator",
+    "ValueToCompare": "/checkout",
+    "Operator": "Contains",
+    "IsIgnoreCase": True,
+    "IsNegative": False
+}
+
+
+def _run(label, statement):
+    seconds = timeit.timeit(statement, number=NUMBER)
+    print("{:<48}{:>10.1f} ns/op".format(label, seconds / NUMBER * 1e9))
+
+
+def main():
+    rules = BypassRules.forStaticAssets(pathPrefixes=["/assets/", "/health"],
+                                        methods=["OPTIONS", "HEAD"])
+    path = QueueitHelpers.urlSplit(URL).path
+
+    _run("UrlValidatorHelper.evaluate (one part)",
+         lambda: UrlValidatorHelper.evaluate(TRIGGER_PART, URL))
+    _run("BypassRules.isBypassed (parsed path)",
+         lambda: rules.isBypassed(path, "GET"))
+    _run("BypassRules.isBypassed (split + check)",
+         lambda: rules.isBypassed(QueueitHelpers.urlSplit(URL).path, "GET"))
+    _run("BypassRules.isBypassed (no match)",
+         lambda: rules.isBypassed("/products/sneakers-limited", "GET"))
+    print("bypassed: {}".format(rules.bypassedCount))
+
+
+if __name__ == "__main__":
+    main()
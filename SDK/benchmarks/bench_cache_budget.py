@@ -0,0 +1,58 @@
+import os
+import sys
+import threading
+import time
+
+from queueit_knownuserv3.lru_cache import CacheBudget, LruCache
+
+PUTS_PER_THREAD = 200000
+MAX_THREADS = max(4, min(16, os.cpu_count() or 1))
+
+
+def _worker(cache, seed, barrier):
+    keys = [(seed, i) for i in range(PUTS_PER_THREAD)]
+    barrier.wait()
+    for key in keys:
+        cache.put(key, True)
+
+
+def _run(threadCount):
+    # Every thread inserts new keys for its own owner into a full budget, so
+    # each put is admitted and evicts one entry of that owner.
+    cacheBudget = CacheBudget(1000 * threadCount)
+    caches = [LruCache(PUTS_PER_THREAD, cacheBudget, "owner" + str(seed))
+              for seed in range(threadCount)]
+    barrier = threading.Barrier(threadCount + 1)
+    threads = [threading.Thread(target=_worker,
+                                args=(caches[seed], seed, barrier))
+               for seed in range(threadCount)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, cacheBudget.totalUsage, \
+        cacheBudget.maxEntries
+
+
+def main():
+    isGilEnabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print("python {} (GIL {})".format(sys.version.split()[0],
+                                      "enabled" if isGilEnabled else "disabled"))
+
+    baseline = None
+    threadCount = 1
+    while (threadCount <= MAX_THREADS):
+        seconds, totalUsage, maxEntries = _run(threadCount)
+        throughput = threadCount * PUTS_PER_THREAD / seconds
+        if (baseline is None):
+            baseline = throughput
+        print("{:>3} threads {:>12.0f} puts/s {:>8.2f}x  usage {}/{}".format(
+            threadCount, throughput, throughput / baseline, totalUsage,
+            maxEntries))
+        threadCount *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import timeit
+from http.cookies import SimpleCookie
+
+from queueit_knownuserv3.lazy_cookie_jar import LazyCookieJar
+from queueit_knownuserv3.queueit_helpers import QueueitHelpers
+
+NUMBER = 50000
+
+OTHER_COOKIES = "; ".join("_analytics_cookie_{}=GA1.2.{}.1700000000".format(i, 1000000 + i) for i in range(30))
+QUEUE_COOKIE_NAME = "QueueITAccepted-SDFrts345E-V3_summersale"
+QUEUE_COOKIE = (QUEUE_COOKIE_NAME + "=EventId%3Dsummersale%26QueueId%3D3e8bc0ad-7a6b-4f7e-9c50-1f2f3b0d9a11"
+                "%26RedirectType%3Dqueue%26IssueTime%3D1700000000%26Hash%3D9f86d081884c7d659a2f")
+
+
+def _parseAll(cookieHeader):
+    cookies = {}
+    for cookie in cookieHeader.split(";"):
+        key, _, value = cookie.partition("=")
+        cookies[key.strip()] = QueueitHelpers.urlDecode(value.strip())
+    return cookies
+
+
+def _run(label, statement):
+    seconds = timeit.timeit(statement, number=NUMBER)
+    print("{:<44}{:>10.1f} ns/op".format(label, seconds / NUMBER * 1e9))
+
+
+def main():
+    for name, cookieHeader in [("queue cookie last", OTHER_COOKIES + "; " + QUEUE_COOKIE),
+                               ("queue cookie first", QUEUE_COOKIE + "; " + OTHER_COOKIES),
+                               ("no queue cookie", OTHER_COOKIES)]:
+        print("{} ({} cookies)".format(name, cookieHeader.count(";") + 1))
+        _run("  http.cookies.SimpleCookie", lambda: SimpleCookie(cookieHeader).get(QUEUE_COOKIE_NAME))
+        _run("  parse all into a dict", lambda: _parseAll(cookieHeader).get(QUEUE_COOKIE_NAME))
+        _run("  LazyCookieJar", lambda: LazyCookieJar(cookieHeader).get(QUEUE_COOKIE_NAME))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import gc
+import json
+import pickle
+import sys
+import tracemalloc
+
+from queueit_knownuserv3.compiled_integration_config import CompiledIntegrationConfig
+
+from .bench_startup import _createConfig
+
+
+def _measure(label, create, integrationCount):
+    gc.collect()
+    tracemalloc.start()
+    compiledConfig = create()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print("{:<48}{:>10.2f} MB{:>10} B/integration".format(
+        label, size / 1e6, size // integrationCount))
+    return compiledConfig
+
+
+def main():
+    integrationCount = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    integrationsConfigString = json.dumps(_createConfig(integrationCount))
+    print("integrations: {}, json: {} bytes".format(
+        integrationCount, len(integrationsConfigString)))
+
+    _measure("json.loads + CompiledIntegrationConfig",
+             lambda: CompiledIntegrationConfig(
+                 json.loads(integrationsConfigString)), integrationCount)
+    compiledConfig = _measure(
+        "CompiledIntegrationConfig.compile (interned)",
+        lambda: CompiledIntegrationConfig.compile(integrationsConfigString),
+        integrationCount)
+    pickled = pickle.dumps(compiledConfig, pickle.HIGHEST_PROTOCOL)
+    _measure("compiled config cache (pickle.loads)",
+             lambda: pickle.loads(pickled), integrationCount)
+
+    triggerParts = list(compiledConfig.configNode.getTriggerParts())
+    print("trigger parts: {}, distinct nodes: {}".format(
+        len(triggerParts), len(set(id(part) for part in triggerParts))))
+
+
+if __name__ == "__main__":
+    main()
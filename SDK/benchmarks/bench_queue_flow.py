@@ -0,0 +1,126 @@
+import http.client
+import json
+import sys
+import threading
+import time
+
+from queueit_knownuserv3.http_context_providers import HttpContextProvider
+from queueit_knownuserv3.known_user import KnownUser
+from queueit_knownuserv3.known_user_engine import KnownUserEngine
+from queueit_knownuserv3.local_queue import LocalQueueServer, LocalTokenIssuer
+from queueit_knownuserv3.request_url import RequestUrl
+
+STEADY_REQUESTS = 20
+
+CONFIG = {
+    "Version": 3,
+    "Integrations": [{
+        "Name": "event1action",
+        "ActionType": "Queue",
+        "EventId": "event1",
+        "CookieDomain": "",
+        "LayoutName": "",
+        "Culture": "",
+        "ExtendCookieValidity": True,
+        "CookieValidityMinute": 20,
+        "QueueDomain": None,
+        "RedirectLogic": "AllowTParameter",
+        "ForcedTargetUrl": "",
+        "Triggers": [{
+            "TriggerParts": [{
+                "Operator": "Contains",
+                "ValueToCompare": "/tickets/",
+                "UrlPart": "PagePath",
+                "ValidatorType": "UrlValidator",
+                "IsNegative": False,
+                "IsIgnoreCase": True
+            }],
+            "LogicalOperator": "And"
+        }]
+    }]
+}
+
+
+class HttpContextProviderMock(HttpContextProvider):
+    def __init__(self):
+        self.cookies = {}
+
+    def getProviderName(self):
+        return "bench"
+
+    def getHeader(self, headerName):
+        return None
+
+    def getCookie(self, cookieName):
+        return self.cookies.get(cookieName)
+
+    def setCookie(self, name, value, expire, domain):
+        self.cookies[name] = value
+
+    def getRequestMethod(self):
+        return "GET"
+
+
+def _visitor(engine, server, userCount, timings):
+    # Each user is redirected to the queue once, comes back with a token and
+    # then browses with the queue cookie.
+    connection = http.client.HTTPConnection(server.getQueueDomain())
+    redirectSeconds = 0.0
+    steadySeconds = 0.0
+    for user in range(userCount):
+        hcp = HttpContextProviderMock()
+        url = "https://shop.example.com/tickets/" + str(user)
+        result = engine.validateRequestByIntegrationConfig(url, None, hcp)
+        queueUrl = LocalQueueServer.getLocalUrl(result.redirectUrl)
+        start = time.perf_counter()
+        connection.request("GET", queueUrl[queueUrl.index("/", len("http://")):])
+        response = connection.getresponse()
+        response.read()
+        redirectSeconds += time.perf_counter() - start
+        requestUrl = RequestUrl.parse(response.getheader("Location"))
+        result = engine.validateRequestByIntegrationConfig(
+            requestUrl, requestUrl.queueitToken, hcp)
+        assert (not result.doRedirect())
+
+        start = time.perf_counter()
+        for _ in range(STEADY_REQUESTS):
+            result = engine.validateRequestByIntegrationConfig(url, None, hcp)
+        steadySeconds += time.perf_counter() - start
+        assert (not result.doRedirect())
+    connection.close()
+    timings.append((redirectSeconds, steadySeconds))
+
+
+def main():
+    threadCount = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    userCount = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    KnownUser.userInQueueService = None
+    server = LocalQueueServer(LocalTokenIssuer("secretkey")).start()
+    try:
+        CONFIG["Integrations"][0]["QueueDomain"] = server.getQueueDomain()
+        engine = KnownUserEngine("customerid", "secretkey", json.dumps(CONFIG))
+        timings = []
+        threads = [threading.Thread(target=_visitor,
+                                    args=(engine, server, userCount, timings))
+                   for _ in range(threadCount)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - start
+    finally:
+        server.stop()
+
+    users = threadCount * userCount
+    print("{} threads x {} users: {:.0f} users/s".format(
+        threadCount, userCount, users / seconds))
+    print("queue round trip {:>10.1f} us".format(
+        sum(timing[0] for timing in timings) / users * 1e6))
+    print("cookie request   {:>10.1f} us".format(
+        sum(timing[1] for timing in timings) / (users * STEADY_REQUESTS) * 1e6))
+    print("tokens issued: {}".format(server.tokenIssuer.issuedCount))
+
+
+if __name__ == "__main__":
+    main()
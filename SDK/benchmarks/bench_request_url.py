@@ -0,0 +1,40 @@
+import re
+import timeit
+from urllib.parse import parse_qs, urlparse
+
+from queueit_knownuserv3.request_url import RequestUrl
+
+NUMBER = 200000
+
+PLAIN_URL = "https://shop.example.com/products/sneakers-limited?size=42&color=black&utm_source=newsletter"
+TOKEN_URL = ("https://shop.example.com/products/sneakers-limited?size=42&queueittoken="
+             "e_summersale~q_3e8bc0ad-7a6b-4f7e-9c50-1f2f3b0d9a11~ts_1700000000~ce_true~rt_queue"
+             "~h_9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08&color=black")
+TOKEN_PATTERN = "([\\?&])(queueittoken=[^&]*)"
+
+
+def _readmeNormalize(url):
+    urlWithoutToken = re.sub(TOKEN_PATTERN, "", url, flags=re.IGNORECASE)
+    queueitToken = parse_qs(urlparse(url).query).get("queueittoken", [None])[-1]
+    uri = urlparse(urlWithoutToken)
+    return urlWithoutToken, queueitToken, uri.hostname, uri.path
+
+
+def _run(label, statement):
+    seconds = timeit.timeit(statement, number=NUMBER)
+    print("{:<44}{:>10.1f} ns/op".format(label, seconds / NUMBER * 1e9))
+
+
+def main():
+    for name, url in [("no token", PLAIN_URL), ("with token", TOKEN_URL)]:
+        print("{} ({} chars)".format(name, len(url)))
+        _run("  re.sub + query parse + urlparse", lambda: _readmeNormalize(url))
+        _run("  RequestUrl.parse", lambda: RequestUrl.parse(url))
+
+    print("host name and path")
+    _run("  urlparse", lambda: urlparse(PLAIN_URL).hostname)
+    _run("  RequestUrl.splitUrl", lambda: RequestUrl.splitUrl(PLAIN_URL))
+
+
+if __name__ == "__main__":
+    main()
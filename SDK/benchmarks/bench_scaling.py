@@ -0,0 +1,160 @@
+import argparse
+import csv
+import gc
+import json
+import time
+import tracemalloc
+
+from queueit_knownuserv3.http_context_providers import HttpContextProvider
+from queueit_knownuserv3.known_user import KnownUser
+from queueit_knownuserv3.known_user_engine import KnownUserEngine
+
+from .config_generator import ConfigGenerator
+
+COLUMNS = ["integrations", "triggers", "parts", "values", "evaluator",
+           "requests", "meanUs", "p50Us", "p99Us", "retainedMB", "peakMB"]
+
+
+class HttpContextProviderMock(HttpContextProvider):
+    def __init__(self, cookies, headers):
+        self.cookies = cookies
+        self.headers = headers
+
+    def getProviderName(self):
+        return "bench"
+
+    def getHeader(self, headerName):
+        return self.headers.get(headerName)
+
+    def getCookie(self, cookieName):
+        return self.cookies.get(cookieName)
+
+    def setCookie(self, name, value, expire, domain):
+        pass
+
+    def getRequestMethod(self):
+        return "GET"
+
+    def getOriginalRequestUrl(self):
+        return None
+
+
+def _createEvaluators(integrationsConfigString):
+    # Each factory returns the object the evaluator keeps between requests and
+    # a function that validates one request.
+    def current():
+        return (integrationsConfigString,
+                lambda url, hcp: KnownUser.validateRequestByIntegrationConfig(
+                    url, None, integrationsConfigString, "customerid",
+                    "secretkey", hcp))
+
+    def engine(**options):
+        def create():
+            knownUserEngine = KnownUserEngine(
+                "customerid", "secretkey", integrationsConfigString, **options)
+            return (knownUserEngine,
+                    lambda url, hcp:
+                        knownUserEngine.validateRequestByIntegrationConfig(
+                            url, None, hcp))
+        return create
+
+    return [("KnownUser", current),
+            ("KnownUserEngine", engine()),
+            ("KnownUserEngine+table", engine(useUrlDecisionTable=True)),
+            ("KnownUserEngine+optimize", engine(optimizeConfig=True))]
+
+
+def _measureMemory(create, request):
+    # The retained memory is what the evaluator keeps between requests, the
+    # peak is the most it holds while creating it and validating one request.
+    gc.collect()
+    tracemalloc.start()
+    state, validate = create()
+    gc.collect()
+    retainedSize = tracemalloc.get_traced_memory()[0]
+    url, cookies, headers = request
+    validate(url, HttpContextProviderMock(cookies, headers))
+    peakSize = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return state, validate, retainedSize, peakSize
+
+
+def _measureLatency(validate, requests, maxSeconds):
+    durations = []
+    deadline = time.perf_counter() + maxSeconds
+    for url, cookies, headers in requests:
+        hcp = HttpContextProviderMock(cookies, headers)
+        start = time.perf_counter()
+        validate(url, hcp)
+        end = time.perf_counter()
+        durations.append(end - start)
+        if (end > deadline and len(durations) >= 20):
+            break
+    durations.sort()
+    return (len(durations), sum(durations) / len(durations),
+            durations[len(durations) // 2],
+            durations[min(len(durations) - 1, int(len(durations) * 0.99))])
+
+
+def _getCounts(value):
+    return [int(count) for count in value.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Validation latency and memory by integration config size.")
+    parser.add_argument("--integrations", type=_getCounts,
+                        default=[10, 100, 1000, 5000])
+    parser.add_argument("--triggers", type=_getCounts, default=[1, 3])
+    parser.add_argument("--parts", type=_getCounts, default=[2])
+    parser.add_argument("--values", type=_getCounts, default=[2, 10])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--max-seconds", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--evaluators",
+                        help="comma-separated evaluator names to run")
+    parser.add_argument("--csv", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    evaluatorNames = args.evaluators.split(",") if args.evaluators else None
+
+    KnownUser.userInQueueService = None
+    rows = []
+    print("{:>12}{:>9}{:>6}{:>7}  {:<26}{:>9}{:>11}{:>11}{:>11}{:>11}{:>9}".format(
+        *COLUMNS))
+    for integrationCount in args.integrations:
+        for triggerCount in args.triggers:
+            for partCount in args.parts:
+                for valueCount in args.values:
+                    generator = ConfigGenerator(args.seed, triggerCount,
+                                                partCount, valueCount)
+                    integrationsConfigString = json.dumps(
+                        generator.createConfig(integrationCount))
+                    requests = generator.createRequests(integrationCount,
+                                                        args.requests)
+                    for name, create in _createEvaluators(
+                            integrationsConfigString):
+                        if (evaluatorNames and name not in evaluatorNames):
+                            continue
+                        state, validate, retainedSize, peakSize = \
+                            _measureMemory(create, requests[0])
+                        count, mean, p50, p99 = _measureLatency(
+                            validate, requests, args.max_seconds)
+                        row = [integrationCount, triggerCount, partCount,
+                               valueCount, name, count, mean * 1e6,
+                               p50 * 1e6, p99 * 1e6, retainedSize / 1e6,
+                               peakSize / 1e6]
+                        rows.append(row)
+                        print("{:>12}{:>9}{:>6}{:>7}  {:<26}{:>9}{:>11.1f}"
+                              "{:>11.1f}{:>11.1f}{:>11.2f}{:>9.2f}".format(
+                                  *row))
+                        del state, validate
+
+    if (args.csv):
+        with open(args.csv, "w", newline="") as csvFile:
+            writer = csv.writer(csvFile)
+            writer.writerow(COLUMNS)
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
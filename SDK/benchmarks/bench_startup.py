@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+from queueit_knownuserv3.compiled_config_cache import CompiledConfigCache
+from queueit_knownuserv3.compiled_integration_config import CompiledIntegrationConfig
+
+NUMBER = 20
+SECRET_KEY = "secretkey"
+
+
+def _createConfig(integrationCount):
+    integrations = []
+    for i in range(integrationCount):
+        integrations.append({
+            "Name": "integration" + str(i),
+            "EventId": "event" + str(i),
+            "CookieDomain": ".example.com",
+            "LayoutName": None,
+            "Culture": "",
+            "ExtendQueueCookie": True,
+            "CookieValidityMinute": 20,
+            "QueueDomain": "example.queue-it.net",
+            "RedirectLogic": "AllowTParameter",
+            "ForcedTargetUrl": "",
+            "ActionType": "Queue",
+            "Triggers": [{
+                "TriggerParts": [{
+                    "Operator": "Contains",
+                    "ValueToCompare": "/campaign" + str(i) + "/",
+                    "UrlPart": "PagePath",
+                    "ValidatorType": "UrlValidator",
+                    "IsNegative": False,
+                    "IsIgnoreCase": True
+                }, {
+                    "Operator": "EqualsAny",
+                    "ValuesToCompare": ["member", "vip"],
+                    "CookieName": "segment",
+                    "ValidatorType": "CookieValidator",
+                    "IsNegative": True,
+                    "IsIgnoreCase": False
+                }],
+                "LogicalOperator": "And"
+            }]
+        })
+    return {"Version": 1, "Integrations": integrations}
+
+
+def _readConfig(configPath):
+    with open(configPath, "rb") as configFile:
+        return configFile.read().decode("utf-8")
+
+
+def _run(label, statement):
+    seconds = timeit.timeit(statement, number=NUMBER)
+    print("{:<48}{:>10.2f} ms/load".format(label, seconds / NUMBER * 1e3))
+
+
+def main():
+    integrationCount = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    directory = tempfile.mkdtemp()
+    try:
+        configPath = os.path.join(directory, "integrationconfig.json")
+        with open(configPath, "w") as configFile:
+            json.dump(_createConfig(integrationCount), configFile)
+        CompiledConfigCache.loadOrCompile(configPath, SECRET_KEY)
+        cachePath = CompiledConfigCache.getCachePath(configPath)
+        print("integrations: {}, json: {} bytes, cache: {} bytes".format(
+            integrationCount, os.path.getsize(configPath),
+            os.path.getsize(cachePath)))
+
+        _run("read JSON + compile",
+             lambda: CompiledIntegrationConfig.compile(_readConfig(configPath)))
+        _run("read JSON + load compiled cache",
+             lambda: CompiledConfigCache.load(cachePath,
+                                              _readConfig(configPath),
+                                              SECRET_KEY))
+        _run("CompiledConfigCache.loadOrCompile",
+             lambda: CompiledConfigCache.loadOrCompile(configPath, SECRET_KEY))
+
+        configString = _readConfig(configPath)
+        data = CompiledConfigCache.dumps(
+            CompiledIntegrationConfig.compile(configString), configString,
+            SECRET_KEY)
+        tableData = CompiledConfigCache.dumps(
+            CompiledIntegrationConfig.compile(configString,
+                                              useUrlDecisionTable=True),
+            configString, SECRET_KEY)
+        _run("load cache + build URL decision table",
+             lambda: CompiledConfigCache.loads(data, configString, SECRET_KEY,
+                                               useUrlDecisionTable=True))
+        _run("load cache with URL decision table",
+             lambda: CompiledConfigCache.loads(tableData, configString,
+                                               SECRET_KEY,
+                                               useUrlDecisionTable=True))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import json
+import os
+import sys
+import threading
+import time
+
+from queueit_knownuserv3.http_context_providers import HttpContextProvider
+from queueit_knownuserv3.known_user import KnownUser
+from queueit_knownuserv3.known_user_engine import KnownUserEngine
+
+REQUESTS_PER_THREAD = 20000
+MAX_THREADS = max(4, min(16, os.cpu_count() or 1))
+
+CONFIG = json.dumps({
+    "Version": 3,
+    "Integrations": [{
+        "Name": "event" + str(i) + "action",
+        "ActionType": "Queue",
+        "EventId": "event" + str(i),
+        "CookieDomain": "",
+        "LayoutName": "",
+        "Culture": "",
+        "ExtendCookieValidity": True,
+        "CookieValidityMinute": 20,
+        "QueueDomain": "bench.queue-it.net",
+        "RedirectLogic": "AllowTParameter",
+        "ForcedTargetUrl": "",
+        "Triggers": [{
+            "TriggerParts": [{
+                "Operator": "Contains",
+                "ValueToCompare": "/event" + str(i) + "/",
+                "UrlPart": "PagePath",
+                "ValidatorType": "UrlValidator",
+                "IsNegative": False,
+                "IsIgnoreCase": True
+            }],
+            "LogicalOperator": "And"
+        }]
+    } for i in range(50)]
+})
+
+
+class HttpContextProviderMock(HttpContextProvider):
+    def getProviderName(self):
+        return "bench"
+
+    def getHeader(self, headerName):
+        return None
+
+    def getCookie(self, cookieName):
+        return None
+
+    def setCookie(self, name, value, expire, domain):
+        pass
+
+    def getRequestMethod(self):
+        return "GET"
+
+
+def _worker(engine, seed, barrier):
+    hcpMock = HttpContextProviderMock()
+    urls = ["https://shop.example.com/products/" + str((seed * 31 + i) % 500)
+            for i in range(REQUESTS_PER_THREAD)]
+    barrier.wait()
+    for url in urls:
+        engine.validateRequestByIntegrationConfig(url, None, hcpMock)
+
+
+def _run(engine, threadCount):
+    barrier = threading.Barrier(threadCount + 1)
+    threads = [threading.Thread(target=_worker, args=(engine, seed, barrier))
+               for seed in range(threadCount)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main():
+    KnownUser.userInQueueService = None
+    engine = KnownUserEngine("customerid", "secretkey", CONFIG)
+    isGilEnabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print("python {} (GIL {})".format(sys.version.split()[0],
+                                      "enabled" if isGilEnabled else "disabled"))
+
+    baseline = None
+    threadCount = 1
+    while (threadCount <= MAX_THREADS):
+        seconds = _run(engine, threadCount)
+        throughput = threadCount * REQUESTS_PER_THREAD / seconds
+        if (baseline is None):
+            baseline = throughput
+        print("{:>3} threads {:>12.0f} req/s {:>8.2f}x".format(
+            threadCount, throughput, throughput / baseline))
+        threadCount *= 2
+    print("match cache hits: {}".format(engine.compiledConfig.matchCache.hits))
+
+
+if __name__ == "__main__":
+    main()
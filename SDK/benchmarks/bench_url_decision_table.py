@@ -0,0 +1,71 @@
+import random
+import sys
+import timeit
+
+from queueit_knownuserv3.compiled_integration_config import CompiledIntegrationConfig
+from queueit_knownuserv3.request_inputs import RequestInputs
+
+NUMBER = 2000
+URL_COUNT = 1000
+
+
+def _createConfig(integrationCount):
+    integrations = []
+    for i in range(integrationCount):
+        integrations.append({
+            "Name": "integration" + str(i),
+            "Triggers": [{
+                "LogicalOperator": "And",
+                "TriggerParts": [{
+                    "UrlPart": "HostName",
+                    "ValidatorType": "UrlValidator",
+                    "ValueToCompare": "shop" + str(i % 10) + ".example.com",
+                    "Operator": "Equals",
+                    "IsIgnoreCase": True,
+                    "IsNegative": False
+                }, {
+                    "UrlPart": "PagePath",
+                    "ValidatorType": "UrlValidator",
+                    "ValuesToCompare": ["/campaign" + str(i) + "/", "/drop" + str(i) + "/"],
+                    "Operator": "ContainsAny",
+                    "IsIgnoreCase": True,
+                    "IsNegative": False
+                }]
+            }]
+        })
+    return {"Version": 1, "Integrations": integrations}
+
+
+def _createUrls(rnd, integrationCount):
+    return ["https://shop{}.example.com/campaign{}/item{}?v={}".format(
+        rnd.randrange(10), rnd.randrange(integrationCount * 2), rnd.randrange(100), i)
+        for i in range(URL_COUNT)]
+
+
+def _run(label, compiledConfig, urls):
+    requestInputs = RequestInputs()
+    index = [0]
+
+    def match():
+        index[0] = (index[0] + 1) % len(urls)
+        compiledConfig.getMatchedIntegrationConfig(urls[index[0]], requestInputs)
+
+    seconds = timeit.timeit(match, number=NUMBER)
+    print("{:<48}{:>10.1f} us/op".format(label, seconds / NUMBER * 1e6))
+
+
+def main():
+    integrationCounts = [int(count) for count in sys.argv[1:]] or [10, 100, 1000, 5000]
+    rnd = random.Random(40)
+    for integrationCount in integrationCounts:
+        customerIntegration = _createConfig(integrationCount)
+        urls = _createUrls(rnd, integrationCount)
+        _run("{} integrations, per-part evaluation".format(integrationCount),
+             CompiledIntegrationConfig(customerIntegration, 0), urls)
+        _run("{} integrations, URL decision table".format(integrationCount),
+             CompiledIntegrationConfig(customerIntegration, 0,
+                                       useUrlDecisionTable=True), urls)
+
+
+if __name__ == "__main__":
+    main()
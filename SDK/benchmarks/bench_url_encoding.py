@@ -0,0 +1,40 @@
+import timeit
+from urllib.parse import quote, unquote
+
+from queueit_knownuserv3.queueit_helpers import QueueitHelpers, _urlEncode, _urlDecode
+
+NUMBER = 200000
+
+TARGET_URL = "https://shop.example.com/products/sneakers-limited?size=42&color=black&utm_source=newsletter"
+COOKIE_VALUE = ("EventId=summersale&QueueId=3e8bc0ad-7a6b-4f7e-9c50-1f2f3b0d9a11"
+                "&RedirectType=queue&IssueTime=1700000000"
+                "&Hash=9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08")
+ENCODED_COOKIE_VALUE = quote(COOKIE_VALUE, safe='~')
+SAFE_VALUE = "summersale"
+
+
+def _run(label, statement):
+    seconds = timeit.timeit(statement, number=NUMBER)
+    print("{:<44}{:>10.1f} ns/op".format(label, seconds / NUMBER * 1e9))
+
+
+def main():
+    print("urlEncode, target url ({} chars)".format(len(TARGET_URL)))
+    _run("  urllib.parse.quote", lambda: quote(TARGET_URL, safe='~'))
+    _run("  table encoder (uncached)", lambda: _urlEncode.__wrapped__(TARGET_URL))
+    _run("  QueueitHelpers.urlEncode (cached)", lambda: QueueitHelpers.urlEncode(TARGET_URL))
+
+    print("urlEncode, safe value ({} chars)".format(len(SAFE_VALUE)))
+    _run("  urllib.parse.quote", lambda: quote(SAFE_VALUE, safe='~'))
+    _run("  table encoder (uncached)", lambda: _urlEncode.__wrapped__(SAFE_VALUE))
+    _run("  QueueitHelpers.urlEncode (cached)", lambda: QueueitHelpers.urlEncode(SAFE_VALUE))
+
+    print("urlDecode, state cookie ({} chars)".format(len(ENCODED_COOKIE_VALUE)))
+    _run("  urllib.parse.unquote", lambda: unquote(ENCODED_COOKIE_VALUE))
+    _run("  QueueitHelpers.urlDecode (cached)", lambda: QueueitHelpers.urlDecode(ENCODED_COOKIE_VALUE))
+
+    print("cache: encode {}, decode {}".format(_urlEncode.cache_info(), _urlDecode.cache_info()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import argparse
+import json
+import random
+import sys
+
+HOSTS = ["shop.example.com", "www.example.com", "tickets.example.com",
+         "m.example.com", "api.example.com"]
+COOKIE_NAMES = ["segment", "country", "abtest", "loggedin"]
+HEADER_NAMES = ["x-channel", "x-forwarded-host", "accept-language"]
+USER_AGENTS = ["Mozilla/5.0 (Windows NT 10.0)", "Mozilla/5.0 (iPhone)",
+               "googlebot", "curl/8.0"]
+SEGMENTS = ["member", "vip", "guest", "staff", "press", "partner"]
+ACTION_TYPES = ["Queue"] * 8 + ["Cancel", "Ignore"]
+# Most trigger parts of a real config match on the URL.
+VALIDATOR_TYPES = (["UrlValidator"] * 7 +
+                   ["CookieValidator", "UserAgentValidator",
+                    "HttpHeaderValidator"])
+
+
+class ConfigGenerator:
+    def __init__(self, seed=0, triggerCount=1, partCount=2, valueCount=2):
+        self.seed = seed
+        self.triggerCount = triggerCount
+        self.partCount = partCount
+        self.valueCount = valueCount
+
+    def createConfig(self, integrationCount):
+        rnd = random.Random(self.seed)
+        integrations = []
+        for i in range(integrationCount):
+            integrations.append({
+                "Name": "integration" + str(i),
+                "EventId": "event" + str(i),
+                "CookieDomain": ".example.com",
+                "LayoutName": None,
+                "Culture": "",
+                "ExtendCookieValidity": True,
+                "CookieValidityMinute": 20,
+                "QueueDomain": "example.queue-it.net",
+                "RedirectLogic": "AllowTParameter",
+                "ForcedTargetUrl": "",
+                "ActionType": rnd.choice(ACTION_TYPES),
+                "Triggers": [self.__createTrigger(rnd, i, j)
+                             for j in range(self.triggerCount)]
+            })
+        return {"Version": 1, "Integrations": integrations}
+
+    def __createTrigger(self, rnd, integrationIndex, triggerIndex):
+        # The first part selects a campaign path of the integration, the
+        # others are drawn from the validator mix.
+        if (triggerIndex == 0):
+            path = "/campaign" + str(integrationIndex) + "/"
+        else:
+            path = "/sale" + str(integrationIndex) + "-" + str(
+                triggerIndex) + "/"
+        triggerParts = [{
+            "Operator": "ContainsAny" if self.valueCount > 1 else "Contains",
+            "ValueToCompare": path,
+            "ValuesToCompare": [path] + [path[:-1] + "-" + str(k) + "/"
+                                         for k in range(1, self.valueCount)],
+            "UrlPart": "PagePath",
+            "ValidatorType": "UrlValidator",
+            "IsNegative": False,
+            "IsIgnoreCase": True
+        }]
+        for _ in range(1, self.partCount):
+            triggerParts.append(self.__createTriggerPart(rnd))
+        return {"TriggerParts": triggerParts, "LogicalOperator": "And"}
+
+    def __createTriggerPart(self, rnd):
+        validatorType = rnd.choice(VALIDATOR_TYPES)
+        if (validatorType == "UrlValidator"):
+            triggerPart = {"UrlPart": rnd.choice(["HostName", "PageUrl"])}
+            values = HOSTS
+        elif (validatorType == "CookieValidator"):
+            triggerPart = {"CookieName": rnd.choice(COOKIE_NAMES)}
+            values = SEGMENTS
+        elif (validatorType == "UserAgentValidator"):
+            triggerPart = {}
+            values = ["bot", "iPhone", "curl"]
+        else:
+            triggerPart = {"HttpHeaderName": rnd.choice(HEADER_NAMES)}
+            values = SEGMENTS
+        valuesToCompare = [rnd.choice(values)
+                           for _ in range(max(1, self.valueCount))]
+        triggerPart.update({
+            "Operator": rnd.choice(["Equals", "Contains"]
+                                   if self.valueCount <= 1 else
+                                   ["EqualsAny", "ContainsAny"]),
+            "ValueToCompare": valuesToCompare[0],
+            "ValuesToCompare": valuesToCompare,
+            "ValidatorType": validatorType,
+            "IsNegative": rnd.random() < 0.2,
+            "IsIgnoreCase": rnd.random() < 0.5
+        })
+        return triggerPart
+
+    def createRequests(self, integrationCount, count):
+        rnd = random.Random(self.seed + 1)
+        requests = []
+        for i in range(count):
+            # Half of the requests hit a campaign path, the rest other pages.
+            if (rnd.random() < 0.5):
+                path = "/campaign{}/item{}".format(
+                    rnd.randrange(max(1, integrationCount)), rnd.randrange(100))
+            else:
+                path = "/products/{}".format(rnd.randrange(1000))
+            url = "https://{}{}?v={}".format(rnd.choice(HOSTS), path, i)
+            cookies = dict((name, rnd.choice(SEGMENTS))
+                           for name in COOKIE_NAMES if rnd.random() < 0.5)
+            headers = dict((name, rnd.choice(SEGMENTS))
+                           for name in HEADER_NAMES if rnd.random() < 0.5)
+            headers["user-agent"] = rnd.choice(USER_AGENTS)
+            requests.append((url, cookies, headers))
+        return requests
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Writes a synthetic integration config as JSON.")
+    parser.add_argument("integrations", type=int)
+    parser.add_argument("--triggers", type=int, default=1)
+    parser.add_argument("--parts", type=int, default=2)
+    parser.add_argument("--values", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    generator = ConfigGenerator(args.seed, args.triggers, args.parts,
+                                args.values)
+    json.dump(generator.createConfig(args.integrations), sys.stdout)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import argparse
+import sys
+
+
+def _openInput(path):
+    if (path == "-"):
+        return sys.stdin
+    return open(path, encoding="utf-8", errors="replace")
+
+
+def _readConfig(path):
+    with open(path, "rb") as configFile:
+        return configFile.read().decode("utf-8")
+
+
+def _coverage(args):
+    import json
+    from .coverage_analyzer import CoverageAnalyzer, LogParser
+
+    analyzer = CoverageAnalyzer.loads(
+        _readConfig(args.config),
+        LogParser(args.format, args.host, args.scheme))
+    logFile = _openInput(args.log)
+    try:
+        report = analyzer.analyzeStream(logFile, args.processes,
+                                        args.chunk_size)
+    finally:
+        if (logFile is not sys.stdin):
+            logFile.close()
+
+    if (args.json):
+        print(json.dumps(analyzer.toDict(report), indent=2))
+    else:
+        print(analyzer.formatReport(report))
+    return 0
+
+
+def _optimize(args):
+    import json
+    from .config_optimizer import ConfigOptimizer
+    from .coverage_analyzer import LogParser
+
+    result = ConfigOptimizer.loads(_readConfig(args.config), args.strict)
+    if (args.log is None):
+        requests = ConfigOptimizer.createSampleRequests(
+            result.originalNode, args.samples, args.seed)
+        checkedCount, mismatchCount, mismatches = result.checkEquivalence(
+            requests)
+    else:
+        logParser = LogParser(args.format, args.host, args.scheme)
+        logFile = _openInput(args.log)
+        try:
+            requests = (request for request in map(logParser.parseLine,
+                                                   logFile)
+                        if request is not None)
+            checkedCount, mismatchCount, mismatches = \
+                result.checkEquivalence(requests)
+        finally:
+            if (logFile is not sys.stdin):
+                logFile.close()
+
+    print(result.formatReport())
+    print("Equivalence check: {} requests, {} mismatches".format(
+        checkedCount, mismatchCount))
+    for currentPageUrl, originalIndex, optimizedIndex in mismatches:
+        print("  {} matched {} instead of {}".format(
+            currentPageUrl, optimizedIndex, originalIndex))
+    if (mismatchCount > 0):
+        return 1
+
+    if (args.output is not None):
+        with open(args.output, "w", encoding="utf-8") as outputFile:
+            json.dump(result.customerIntegration, outputFile, indent=2)
+    return 0
+
+
+def _getSecretKey(args):
+    import os
+    secretKey = args.secret_key or os.environ.get("QUEUEIT_SECRET_KEY")
+    if (not secretKey):
+        print("A secret key is required (--secret-key or QUEUEIT_SECRET_KEY).",
+              file=sys.stderr)
+    return secretKey
+
+
+def _replay(args):
+    from .request_capture import RequestCaptureWriter, RequestReplayer
+
+    secretKey = _getSecretKey(args)
+    if (not secretKey):
+        return 2
+    integrationsConfigString = _readConfig(args.config)
+    engine = None
+    if (args.engine):
+        from .known_user_engine import KnownUserEngine
+        engine = KnownUserEngine(args.customer_id, secretKey,
+                                 integrationsConfigString)
+    replayer = RequestReplayer(integrationsConfigString, args.customer_id,
+                               secretKey, engine)
+    report = replayer.replay(RequestCaptureWriter.readRecords(args.capture))
+    print(report.formatReport())
+    if (report.mismatchCount > 0):
+        return 1
+    return 0
+
+
+def _createTokenIssuer(args, secretKey):
+    from .local_queue import LocalTokenIssuer
+    return LocalTokenIssuer(secretKey, args.validity, args.cookie_validity,
+                            not args.not_extendable, args.redirect_type)
+
+
+def _token(args):
+    secretKey = _getSecretKey(args)
+    if (not secretKey):
+        return 2
+    tokenIssuer = _createTokenIssuer(args, secretKey)
+    for queueitToken in tokenIssuer.createTokens(args.event_id, args.count):
+        sys.stdout.write(queueitToken + "\n")
+    return 0
+
+
+def _queueServer(args):
+    from .local_queue import LocalQueueServer
+
+    secretKey = _getSecretKey(args)
+    if (not secretKey):
+        return 2
+    if (not args.allow_remote and
+            not LocalQueueServer.isLoopbackHost(args.host)):
+        print("{} is not a loopback address and anyone who can reach the local "
+              "queue gets valid tokens. Pass --allow-remote to listen on it "
+              "anyway.".format(args.host), file=sys.stderr)
+        return 2
+    server = LocalQueueServer(_createTokenIssuer(args, secretKey), args.host,
+                              args.port, args.allow_remote, args.target_host)
+    print("Local queue on http://{}/ (use it as the QueueDomain)".format(
+        server.getQueueDomain()))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print("Issued tokens: {}".format(server.tokenIssuer.issuedCount))
+    return 0
+
+
+def _addTokenArguments(parser):
+    parser.add_argument("--secret-key", help="secret key, defaults to the QUEUEIT_SECRET_KEY environment variable")
+    parser.add_argument("--validity", type=int, default=180, help="seconds until a token expires")
+    parser.add_argument("--cookie-validity", type=int, help="cookie validity in minutes (cv_)")
+    parser.add_argument("--not-extendable", action="store_true", help="issue tokens with ce_false")
+    parser.add_argument("--redirect-type", default="queue", help="redirect type (rt_)")
+
+
+def createParser():
+    from .coverage_analyzer import LOG_FORMATS, AUTO_FORMAT
+
+    parser = argparse.ArgumentParser(prog="python -m queueit_knownuserv3")
+    subparsers = parser.add_subparsers(dest="command")
+
+    coverage = subparsers.add_parser(
+        "coverage",
+        help="report how much logged traffic each integration would match")
+    coverage.add_argument("log", help="access log file (JSONL or combined log format), - for stdin")
+    coverage.add_argument("--config", required=True, help="integration config JSON file")
+    coverage.add_argument("--format", choices=LOG_FORMATS, default=AUTO_FORMAT,
+                          help="log format, auto detects JSON lines per line")
+    coverage.add_argument("--host", help="host name for log lines without one (combined log format)")
+    coverage.add_argument("--scheme", default="https", help="URL scheme for log lines without one")
+    coverage.add_argument("--processes", type=int, default=1, help="number of worker processes")
+    coverage.add_argument("--chunk-size", type=int, default=None, help="log lines per worker task")
+    coverage.add_argument("--json", action="store_true", help="print the report as JSON")
+    coverage.set_defaults(handler=_coverage)
+
+    optimize = subparsers.add_parser(
+        "optimize",
+        help="rewrite an integration config to an equivalent config with cheaper triggers")
+    optimize.add_argument("config", help="integration config JSON file")
+    optimize.add_argument("-o", "--output", help="file to write the optimized config to")
+    optimize.add_argument("--strict", action="store_true", help="reject invalid configs")
+    optimize.add_argument("--samples", type=int, default=10000,
+                          help="number of generated requests for the equivalence check")
+    optimize.add_argument("--seed", type=int, default=0, help="seed of the generated requests")
+    optimize.add_argument("--log", help="check equivalence against an access log instead, - for stdin")
+    optimize.add_argument("--format", choices=LOG_FORMATS, default=AUTO_FORMAT, help="log format")
+    optimize.add_argument("--host", help="host name for log lines without one (combined log format)")
+    optimize.add_argument("--scheme", default="https", help="URL scheme for log lines without one")
+    optimize.set_defaults(handler=_optimize)
+
+    replay = subparsers.add_parser(
+        "replay",
+        help="replay captured requests with their recorded clock and compare the decisions")
+    replay.add_argument("capture", help="capture file, its rotated files are replayed first")
+    replay.add_argument("--config", required=True, help="integration config JSON file")
+    replay.add_argument("--customer-id", required=True, help="Queue-it customer id")
+    replay.add_argument("--secret-key", help="secret key, defaults to the QUEUEIT_SECRET_KEY environment variable")
+    replay.add_argument("--engine", action="store_true",
+                        help="replay through a KnownUserEngine instead of KnownUser")
+    replay.set_defaults(handler=_replay)
+
+    token = subparsers.add_parser(
+        "token", help="print queueittokens signed with the secret key, for load tests")
+    token.add_argument("--event-id", required=True, help="event id (e_)")
+    token.add_argument("--count", type=int, default=1, help="number of tokens")
+    _addTokenArguments(token)
+    token.set_defaults(handler=_token)
+
+    queueServer = subparsers.add_parser(
+        "queue-server",
+        help="serve a local queue that redirects back to the target URL with a token, for load tests")
+    queueServer.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    queueServer.add_argument("--port", type=int, default=8080, help="port to listen on")
+    queueServer.add_argument("--allow-remote", action="store_true",
+                             help="allow a non-loopback --host; anyone who can reach it gets valid tokens")
+    queueServer.add_argument("--target-host", action="append",
+                             help="only redirect to this target host (repeatable)")
+    _addTokenArguments(queueServer)
+    queueServer.set_defaults(handler=_queueServer)
+    return parser
+
+
+def main(argv=None):
+    parser = createParser()
+    args = parser.parse_args(argv)
+    if (args.command is None):
+        parser.print_help()
+        return 2
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
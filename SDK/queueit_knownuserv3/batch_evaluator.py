@@ -0,0 +1,258 @@
+from .integration_config_helpers import ComparisonOperatorHelper
+from .integration_config_loader import (URL_PARTS, URL_VALIDATOR,
+                                        IntegrationConfigLoader)
+from .models import KnownUserError
+from .queueit_helpers import QueueitHelpers
+
+NO_MATCH = -1
+MAX_UPPER_CASE_EXPANSION = 3
+
+
+def _importNumpy():
+    try:
+        import numpy
+    except ImportError:
+        raise KnownUserError(
+            "BatchUrlEvaluator requires numpy, install queueit-knownuserv3[batch].")
+    return numpy
+
+
+class BatchEvaluationResult:
+    def __init__(self, matchIndices, hitCounts, integrationNames):
+        self.matchIndices = matchIndices
+        self.hitCounts = hitCounts
+        self.integrationNames = integrationNames
+
+    def getHitCountsByName(self):
+        return dict((name, int(hitCount)) for name, hitCount in zip(
+            self.integrationNames, self.hitCounts) if name is not None)
+
+    def getNoMatchCount(self):
+        return int((self.matchIndices == NO_MATCH).sum())
+
+
+class BatchUrlEvaluator:
+    CHUNK_SIZE = 1000000
+
+    def __init__(self, customerIntegration, strict=False):
+        self.configNode = IntegrationConfigLoader.load(customerIntegration,
+                                                       strict)
+        for triggerPart in self.configNode.getTriggerParts():
+            if (triggerPart.validatorType != URL_VALIDATOR):
+                raise KnownUserError(
+                    "BatchUrlEvaluator only supports UrlValidator trigger parts, found " +
+                    triggerPart.validatorType + ".")
+
+        integrationConfigs = customerIntegration["Integrations"]
+        self.integrationNames = [
+            integrationConfig.get("Name")
+            if isinstance(integrationConfig, dict) else None
+            for integrationConfig in integrationConfigs]
+        indicesById = dict((id(integrationConfig), index)
+                           for index, integrationConfig in
+                           enumerate(integrationConfigs))
+        self.integrationIndices = [
+            indicesById[id(integration.config)]
+            for integration in self.configNode.integrations]
+
+    @staticmethod
+    def loads(integrationsConfigString, strict=False):
+        return BatchUrlEvaluator(
+            IntegrationConfigLoader.parseJson(integrationsConfigString), strict)
+
+    @staticmethod
+    def splitUrls(urls):
+        hosts = []
+        paths = []
+        pageUrls = []
+        for url in urls:
+            try:
+                uri = QueueitHelpers.urlParse(url)
+                hosts.append(uri.hostname or "")
+                paths.append(uri.path)
+                pageUrls.append(url)
+            except:
+                hosts.append("")
+                paths.append("")
+                pageUrls.append("")
+        return hosts, paths, pageUrls
+
+    def evaluateUrls(self, urls):
+        hosts, paths, urls = BatchUrlEvaluator.splitUrls(urls)
+        return self.evaluate(hosts, paths, urls)
+
+    def evaluate(self, hosts, paths, urls):
+        numpy = _importNumpy()
+        nulTerminatedRows = BatchUrlEvaluator.__getNulTerminatedRows(
+            numpy, [hosts, paths, urls])
+        nulTerminatedValues = [(row, hosts[row], paths[row], urls[row])
+                               for row in nulTerminatedRows]
+        hosts = numpy.asarray(hosts, dtype=str)
+        paths = numpy.asarray(paths, dtype=str)
+        urls = numpy.asarray(urls, dtype=str)
+        if (not hosts.shape == paths.shape == urls.shape or hosts.ndim != 1):
+            raise KnownUserError(
+                "hosts, paths and urls must be one-dimensional arrays of the same length.")
+
+        matchIndices = numpy.full(len(urls), NO_MATCH, dtype=numpy.int32)
+        for start in range(0, len(urls), BatchUrlEvaluator.CHUNK_SIZE):
+            end = start + BatchUrlEvaluator.CHUNK_SIZE
+            matchIndices[start:end] = self.__evaluateChunk(
+                numpy, {
+                    "HostName": hosts[start:end],
+                    "PagePath": paths[start:end],
+                    "PageUrl": urls[start:end]
+                })
+        for row, host, path, url in nulTerminatedValues:
+            matchIndices[row] = self.__evaluateRow(host, path, url)
+
+        hitCounts = numpy.bincount(matchIndices[matchIndices != NO_MATCH],
+                                   minlength=len(self.integrationNames))
+        return BatchEvaluationResult(matchIndices, hitCounts,
+                                     self.integrationNames)
+
+    @staticmethod
+    def __getNulTerminatedRows(numpy, columns):
+        # Fixed-width numpy strings drop trailing "\x00" characters, so rows
+        # with such a value are evaluated one by one.
+        rows = set()
+        for column in columns:
+            if (isinstance(column, numpy.ndarray)
+                    and column.dtype.kind == "U"):
+                continue
+            rows.update(row for row, value in enumerate(column)
+                        if isinstance(value, str) and value.endswith("\x00"))
+        return sorted(rows)
+
+    def __evaluateRow(self, host, path, url):
+        values = {"HostName": host, "PagePath": path, "PageUrl": url}
+        for integration, integrationIndex in zip(self.configNode.integrations,
+                                                 self.integrationIndices):
+            for trigger in integration.triggers:
+                evaluations = (
+                    BatchUrlEvaluator.__evaluateValue(
+                        triggerPart, values.get(
+                            BatchUrlEvaluator.__getUrlPartKey(
+                                triggerPart.urlPart), ""))
+                    for triggerPart in trigger.triggerParts)
+                if (any(evaluations) if trigger.isOrOperator else
+                        all(evaluations)):
+                    return integrationIndex
+        return NO_MATCH
+
+    @staticmethod
+    def __evaluateValue(triggerPart, value):
+        return ComparisonOperatorHelper.evaluate(
+            triggerPart.operator, triggerPart.isNegative,
+            triggerPart.isIgnoreCase, value, triggerPart.valueToCompare,
+            triggerPart.valuesToCompare)
+
+    def __evaluateChunk(self, numpy, columns):
+        rowCount = len(columns["PageUrl"])
+        columns[None] = numpy.zeros(rowCount, dtype=str)
+        upperCaseColumns = {}
+        matchIndices = numpy.full(rowCount, NO_MATCH, dtype=numpy.int32)
+        isUnmatched = numpy.ones(rowCount, dtype=bool)
+        for integration, integrationIndex in zip(self.configNode.integrations,
+                                                 self.integrationIndices):
+            isMatched = numpy.zeros(rowCount, dtype=bool)
+            for trigger in integration.triggers:
+                isMatched |= BatchUrlEvaluator.__evaluateTrigger(
+                    numpy, trigger, columns, upperCaseColumns)
+            isMatched &= isUnmatched
+            matchIndices[isMatched] = integrationIndex
+            isUnmatched &= ~isMatched
+            if (not isUnmatched.any()):
+                break
+        return matchIndices
+
+    @staticmethod
+    def __evaluateTrigger(numpy, trigger, columns, upperCaseColumns):
+        rowCount = len(columns["PageUrl"])
+        isOrOperator = trigger.isOrOperator
+        if (isOrOperator):
+            evaluation = numpy.zeros(rowCount, dtype=bool)
+        else:
+            evaluation = numpy.ones(rowCount, dtype=bool)
+        for triggerPart in trigger.triggerParts:
+            partEvaluation = BatchUrlEvaluator.__evaluateTriggerPart(
+                numpy, triggerPart, columns, upperCaseColumns)
+            if (isOrOperator):
+                evaluation |= partEvaluation
+                if (evaluation.all()):
+                    break
+            else:
+                evaluation &= partEvaluation
+                if (not evaluation.any()):
+                    break
+        return evaluation
+
+    @staticmethod
+    def __getColumn(numpy, urlPart, isIgnoreCase, columns, upperCaseColumns):
+        urlPart = BatchUrlEvaluator.__getUrlPartKey(urlPart)
+        if (not isIgnoreCase):
+            return columns[urlPart]
+
+        upperCaseColumn = upperCaseColumns.get(urlPart)
+        if (upperCaseColumn is None):
+            column = columns[urlPart]
+            if (column.size > 0 and column.view(numpy.uint32).max() >= 128):
+                # Upper-casing can make a value longer (e.g. "ß" becomes
+                # "SS"), so widen the fixed-width strings first.
+                column = column.astype("U" + str(
+                    max(1, column.dtype.itemsize // 4) *
+                    MAX_UPPER_CASE_EXPANSION))
+            upperCaseColumn = numpy.char.upper(column)
+            upperCaseColumns[urlPart] = upperCaseColumn
+        return upperCaseColumn
+
+    @staticmethod
+    def __evaluateTriggerPart(numpy, triggerPart, columns, upperCaseColumns):
+        operator = triggerPart.operator
+        isIgnoreCase = triggerPart.isIgnoreCase
+        isNegative = triggerPart.isNegative
+        rowCount = len(columns["PageUrl"])
+        if (operator == "Equals" or operator == "Contains"):
+            values = [triggerPart.valueToCompare]
+        else:
+            values = triggerPart.valuesToCompare
+        if (any(value.endswith("\x00") for value in values)):
+            # numpy would compare these values without their trailing "\x00".
+            return numpy.fromiter(
+                (BatchUrlEvaluator.__evaluateValue(triggerPart, str(value))
+                 for value in columns[BatchUrlEvaluator.__getUrlPartKey(
+                     triggerPart.urlPart)]), bool, rowCount)
+
+        column = BatchUrlEvaluator.__getColumn(
+            numpy, triggerPart.urlPart, isIgnoreCase, columns,
+            upperCaseColumns)
+        evaluation = numpy.zeros(rowCount, dtype=bool)
+        for value in values:
+            if (operator == "Equals" or operator == "EqualsAny"):
+                if (isIgnoreCase):
+                    value = value.upper()
+                evaluation |= column == value
+                continue
+
+            if (value == "*"):
+                isNonEmpty = numpy.char.str_len(columns[
+                    BatchUrlEvaluator.__getUrlPartKey(triggerPart.urlPart)]) > 0
+                if (operator == "Contains" and isNegative):
+                    # A non-empty value always contains "*", even when negated,
+                    # and an empty one does not contain it.
+                    return numpy.ones(rowCount, dtype=bool)
+                evaluation |= isNonEmpty
+                continue
+            if (isIgnoreCase):
+                value = value.upper()
+            evaluation |= numpy.char.find(column, value) >= 0
+
+        if (isNegative):
+            return ~evaluation
+        return evaluation
+
+    @staticmethod
+    def __getUrlPartKey(urlPart):
+        if (not isinstance(urlPart, str) or urlPart not in URL_PARTS):
+            return None
+        return urlPart
@@ -0,0 +1,51 @@
+class BypassRules:
+    # Only stylesheets, scripts, images, fonts and media: documents and data
+    # files (json, xml, txt, pdf) are often served by the application itself.
+    STATIC_FILE_EXTENSIONS = ("css", "js", "map", "png", "jpg", "jpeg", "gif",
+                              "svg", "ico", "webp", "avif", "bmp", "woff",
+                              "woff2", "ttf", "otf", "eot", "mp4", "webm",
+                              "mp3", "wav")
+
+    def __init__(self, fileExtensions=None, pathPrefixes=None, methods=None):
+        self.fileExtensions = frozenset(
+            ext.lower().lstrip(".") for ext in (fileExtensions or ()))
+        self.pathPrefixes = tuple(pathPrefixes or ())
+        self.methods = frozenset(
+            method.upper() for method in (methods or ()))
+        self.bypassedCount = 0
+
+    @staticmethod
+    def forStaticAssets(pathPrefixes=None, methods=None):
+        return BypassRules(BypassRules.STATIC_FILE_EXTENSIONS, pathPrefixes,
+                           methods)
+
+    def usesMethod(self):
+        return len(self.methods) > 0
+
+    def isBypassed(self, path, method=None):
+        if (self.__matches(path, method)):
+            # Not locked: concurrent requests can lose an increment, so the
+            # count is approximate.
+            self.bypassedCount += 1
+            return True
+        return False
+
+    def __matches(self, path, method):
+        if (method is not None and method.upper() in self.methods):
+            return True
+
+        if (not path):
+            return False
+
+        # Paths are case-sensitive, so prefixes are matched as given. File
+        # extensions only name the file type and are matched in any case.
+        if (self.pathPrefixes and path.startswith(self.pathPrefixes)):
+            return True
+
+        if (self.fileExtensions):
+            dotIndex = path.rfind(".")
+            if (dotIndex > path.rfind("/") and
+                    path[dotIndex + 1:].lower() in self.fileExtensions):
+                return True
+
+        return False
@@ -0,0 +1,144 @@
+import hashlib
+import hmac
+import os
+import pickle
+import struct
+
+from .compiled_integration_config import CompiledIntegrationConfig
+from .user_in_queue_service import UserInQueueService
+
+MAGIC = b"QITCCFG\x00"
+FORMAT_VERSION = 5
+HEADER_FORMAT = ">8sHB??32s"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+
+class CompiledConfigCache:
+    FILE_SUFFIX = ".compiled"
+
+    @staticmethod
+    def getCachePath(configPath):
+        return configPath + CompiledConfigCache.FILE_SUFFIX
+
+    @staticmethod
+    def getContentHash(integrationsConfigString):
+        if (isinstance(integrationsConfigString, str)):
+            integrationsConfigString = integrationsConfigString.encode("utf-8")
+        return hashlib.sha256(integrationsConfigString).digest()
+
+    @staticmethod
+    def __getSdkVersion():
+        return UserInQueueService.SDK_VERSION.encode("utf-8")
+
+    @staticmethod
+    def __sign(data, secretKey):
+        if (isinstance(secretKey, str)):
+            secretKey = secretKey.encode("utf-8")
+        return hmac.new(secretKey, data, hashlib.sha256).digest()
+
+    @staticmethod
+    def dumps(compiledConfig, integrationsConfigString, secretKey,
+              strict=False, optimize=False):
+        sdkVersion = CompiledConfigCache.__getSdkVersion()
+        header = struct.pack(
+            HEADER_FORMAT, MAGIC, FORMAT_VERSION, len(sdkVersion), strict,
+            optimize, CompiledConfigCache.getContentHash(integrationsConfigString))
+        data = header + sdkVersion + pickle.dumps(
+            compiledConfig, pickle.HIGHEST_PROTOCOL)
+        return data + CompiledConfigCache.__sign(data, secretKey)
+
+    @staticmethod
+    def loads(data, integrationsConfigString, secretKey, strict=False,
+              matchCacheSize=None, cacheBudget=None, cacheOwner=None,
+              adaptiveOrdering=False, useUrlDecisionTable=False,
+              optimize=False):
+        if (len(data) < HEADER_SIZE + SIGNATURE_SIZE):
+            return None
+        # The payload is only unpickled when it was signed with the secret
+        # key, so a file written by anyone else is never deserialized.
+        signature = data[-SIGNATURE_SIZE:]
+        data = data[:-SIGNATURE_SIZE]
+        if (not hmac.compare_digest(
+                signature, CompiledConfigCache.__sign(data, secretKey))):
+            return None
+        (magic, formatVersion, sdkVersionLength, isStrict, isOptimized,
+         contentHash) = struct.unpack_from(HEADER_FORMAT, data)
+        payloadStart = HEADER_SIZE + sdkVersionLength
+        if (magic != MAGIC or formatVersion != FORMAT_VERSION
+                or isStrict != strict or isOptimized != optimize
+                or data[HEADER_SIZE:payloadStart] !=
+                CompiledConfigCache.__getSdkVersion()
+                or contentHash != CompiledConfigCache.getContentHash(
+                    integrationsConfigString)):
+            return None
+
+        try:
+            compiledConfig = pickle.loads(data[payloadStart:])
+        except Exception:
+            return None
+        if (not isinstance(compiledConfig, CompiledIntegrationConfig)):
+            return None
+        compiledConfig.adaptiveOrdering = adaptiveOrdering
+        compiledConfig.useUrlDecisionTable = useUrlDecisionTable
+        compiledConfig.createCaches(matchCacheSize, cacheBudget, cacheOwner)
+        return compiledConfig
+
+    @staticmethod
+    def save(cachePath, compiledConfig, integrationsConfigString, secretKey,
+             strict=False, optimize=False):
+        temporaryPath = cachePath + "." + str(os.getpid()) + ".tmp"
+        try:
+            with open(temporaryPath, "wb") as cacheFile:
+                cacheFile.write(CompiledConfigCache.dumps(
+                    compiledConfig, integrationsConfigString, secretKey,
+                    strict, optimize))
+            os.replace(temporaryPath, cachePath)
+        finally:
+            if (os.path.exists(temporaryPath)):
+                os.remove(temporaryPath)
+
+    @staticmethod
+    def load(cachePath, integrationsConfigString, secretKey, strict=False,
+             matchCacheSize=None, cacheBudget=None, cacheOwner=None,
+             adaptiveOrdering=False, useUrlDecisionTable=False,
+             optimize=False):
+        try:
+            with open(cachePath, "rb") as cacheFile:
+                data = cacheFile.read()
+        except OSError:
+            return None
+        return CompiledConfigCache.loads(data, integrationsConfigString,
+                                         secretKey, strict, matchCacheSize,
+                                         cacheBudget, cacheOwner,
+                                         adaptiveOrdering, useUrlDecisionTable,
+                                         optimize)
+
+    @staticmethod
+    def loadOrCompile(configPath, secretKey, strict=False, matchCacheSize=None,
+                      cacheBudget=None, cacheOwner=None,
+                      adaptiveOrdering=False, useUrlDecisionTable=False,
+                      optimize=False):
+        with open(configPath, "rb") as configFile:
+            integrationsConfigString = configFile.read().decode("utf-8")
+        cachePath = CompiledConfigCache.getCachePath(configPath)
+
+        compiledConfig = CompiledConfigCache.load(
+            cachePath, integrationsConfigString, secretKey, strict,
+            matchCacheSize, cacheBudget, cacheOwner, adaptiveOrdering,
+            useUrlDecisionTable, optimize)
+        if (compiledConfig is not None):
+            return compiledConfig
+
+        compiledConfig = CompiledIntegrationConfig.compile(
+            integrationsConfigString, matchCacheSize, cacheBudget, cacheOwner,
+            strict, adaptiveOrdering, useUrlDecisionTable, optimize)
+        try:
+            CompiledConfigCache.save(cachePath, compiledConfig,
+                                     integrationsConfigString, secretKey,
+                                     strict, optimize)
+        except Exception:
+            # The cache only speeds up the next start, the compiled config is
+            # used either way.
+            pass
+        return compiledConfig
@@ -0,0 +1,398 @@
+from .integration_config_helpers import ComparisonOperatorHelper, UrlValidatorHelper
+from .integration_config_loader import (COOKIE_VALIDATOR, URL_VALIDATOR,
+                                        USER_AGENT_VALIDATOR, ConfigInterner,
+                                        IntegrationConfigLoader)
+from .lru_cache import LruCache
+from .request_inputs import ConfigDependencies, RequestInputs
+from .request_url import RequestUrl
+from .url_decision_table import UrlDecisionTable
+
+HOST_PATH_URL_PARTS = frozenset(["HostName", "PagePath"])
+NOT_CACHED = object()
+URL_PART_COSTS = {"PageUrl": 1, "HostName": 3, "PagePath": 3}
+INPUT_COSTS = {COOKIE_VALIDATOR: 2, USER_AGENT_VALIDATOR: 2}
+DEFAULT_INPUT_COST = 3
+OPERATOR_COSTS = {"Equals": 1, "Contains": 2, "EqualsAny": 1, "ContainsAny": 2}
+IGNORE_CASE_COST = 1
+USER_AGENT_INPUT_KEY = (ConfigDependencies.HEADER_INPUT,
+                        ConfigDependencies.USER_AGENT_HEADER_NAME)
+
+
+class CompiledIntegrationConfig:
+    MATCH_CACHE_SIZE = 4096
+    RERANK_INTERVAL = 1024
+    MAX_CACHED_INPUT_LENGTH = 64
+
+    def __init__(self, customerIntegration, matchCacheSize=None,
+                 cacheBudget=None, cacheOwner=None, strict=False,
+                 adaptiveOrdering=False, useUrlDecisionTable=False,
+                 optimize=False):
+        if (optimize):
+            from .config_optimizer import ConfigOptimizer
+            customerIntegration = ConfigOptimizer(strict).optimize(
+                customerIntegration).customerIntegration
+        self.customerIntegration = customerIntegration
+        self.configNode = IntegrationConfigLoader.load(customerIntegration,
+                                                       strict)
+        self.version = self.configNode.version
+        self.adaptiveOrdering = adaptiveOrdering
+        self.useUrlDecisionTable = useUrlDecisionTable
+        self.compiledIntegrations = tuple(
+            (integration.config,
+             tuple(CompiledTrigger.compile(trigger)
+                   for trigger in integration.triggers))
+            for integration in self.configNode.integrations)
+        self.dependencies = CompiledIntegrationConfig.__getDependencies(
+            self.configNode.getTriggerParts())
+        self.isUrlOnly = self.dependencies.isUrlOnly()
+        # The loader shares one node per distinct trigger part, so a part
+        # used by several triggers is evaluated once per request.
+        triggerParts = list(self.configNode.getTriggerParts())
+        self.sharesTriggerParts = len(set(map(id, triggerParts))) < len(
+            triggerParts)
+        self.usesFullUrl = len(self.dependencies.urlParts -
+                               HOST_PATH_URL_PARTS) > 0
+        self.urlDecisionTable = None
+        self.createCaches(matchCacheSize, cacheBudget, cacheOwner)
+
+    def createCaches(self, matchCacheSize=None, cacheBudget=None,
+                     cacheOwner=None):
+        self.matchCache = None
+        self.inputMatchCache = None
+        if (matchCacheSize is None):
+            matchCacheSize = CompiledIntegrationConfig.MATCH_CACHE_SIZE
+        if (not self.useUrlDecisionTable):
+            self.urlDecisionTable = None
+        elif (self.urlDecisionTable is None):
+            self.urlDecisionTable = UrlDecisionTable(
+                self.compiledIntegrations, matchCacheSize, cacheBudget,
+                cacheOwner)
+        else:
+            # A decision table loaded from the compiled config cache only
+            # needs a new match table.
+            self.urlDecisionTable.createTable(matchCacheSize, cacheBudget,
+                                              cacheOwner)
+        if (matchCacheSize > 0):
+            self.matchCache = LruCache(matchCacheSize, cacheBudget,
+                                       cacheOwner)
+            if (not self.isUrlOnly):
+                self.inputMatchCache = LruCache(matchCacheSize, cacheBudget,
+                                                cacheOwner)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["matchCache"] = None
+        state["inputMatchCache"] = None
+        return state
+
+    @staticmethod
+    def compile(integrationsConfigString, matchCacheSize=None,
+                cacheBudget=None, cacheOwner=None, strict=False,
+                adaptiveOrdering=False, useUrlDecisionTable=False,
+                optimize=False):
+        if (strict):
+            customerIntegration = IntegrationConfigLoader.parseJson(
+                integrationsConfigString)
+        else:
+            import json
+            customerIntegration = json.loads(integrationsConfigString)
+        # The parsed config is only referenced from here, so repeated values
+        # can share one object.
+        customerIntegration = ConfigInterner().internConfig(customerIntegration)
+        return CompiledIntegrationConfig(customerIntegration, matchCacheSize,
+                                         cacheBudget, cacheOwner, strict,
+                                         adaptiveOrdering, useUrlDecisionTable,
+                                         optimize)
+
+    def clearCaches(self):
+        if (self.matchCache is not None):
+            self.matchCache.clear()
+        if (self.inputMatchCache is not None):
+            self.inputMatchCache.clear()
+        if (self.urlDecisionTable is not None):
+            self.urlDecisionTable.clear()
+
+    @staticmethod
+    def __getDependencies(triggerParts):
+        urlParts = set()
+        cookieNames = set()
+        headerNames = set()
+        usesUserAgent = False
+        for triggerPart in triggerParts:
+            validatorType = triggerPart.validatorType
+            if (validatorType == URL_VALIDATOR):
+                urlPart = triggerPart.urlPart
+                urlParts.add(urlPart if isinstance(urlPart, str) else "")
+            elif (validatorType == COOKIE_VALIDATOR):
+                cookieNames.add(triggerPart.inputName)
+            elif (validatorType == USER_AGENT_VALIDATOR):
+                usesUserAgent = True
+            else:
+                headerNames.add(triggerPart.inputName)
+        return ConfigDependencies(urlParts, cookieNames, usesUserAgent,
+                                  headerNames)
+
+    @staticmethod
+    def getTriggerPartCost(triggerPart):
+        if (triggerPart.validatorType == URL_VALIDATOR):
+            urlPart = triggerPart.urlPart
+            cost = URL_PART_COSTS.get(urlPart, 1) if isinstance(
+                urlPart, str) else 1
+        else:
+            cost = INPUT_COSTS.get(triggerPart.validatorType,
+                                   DEFAULT_INPUT_COST)
+        operatorCost = OPERATOR_COSTS.get(triggerPart.operator, 1)
+        if (triggerPart.isIgnoreCase):
+            operatorCost += IGNORE_CASE_COST
+        return cost + operatorCost * max(1, len(triggerPart.valuesToCompare))
+
+    @staticmethod
+    def evaluateTriggerPart(triggerPart, currentPageUrl, httpContextProvider):
+        validatorType = triggerPart.validatorType
+        if (validatorType == URL_VALIDATOR):
+            value = UrlValidatorHelper.getUrlPart(triggerPart.urlPart,
+                                                  currentPageUrl)
+        elif (validatorType == COOKIE_VALIDATOR):
+            value = httpContextProvider.getCookie(triggerPart.inputName)
+        elif (validatorType == USER_AGENT_VALIDATOR):
+            value = httpContextProvider.getHeader("user-agent")
+        else:
+            value = httpContextProvider.getHeader(triggerPart.inputName)
+
+        return ComparisonOperatorHelper.evaluate(
+            triggerPart.operator, triggerPart.isNegative,
+            triggerPart.isIgnoreCase, value, triggerPart.valueToCompare,
+            triggerPart.valuesToCompare)
+
+    @staticmethod
+    def evaluateSharedTriggerPart(triggerPart, currentPageUrl,
+                                  httpContextProvider, results):
+        evaluation = results.get(triggerPart)
+        if (evaluation is None):
+            evaluation = CompiledIntegrationConfig.evaluateTriggerPart(
+                triggerPart, currentPageUrl, httpContextProvider)
+            results[triggerPart] = evaluation
+        return evaluation
+
+    def getMatchedIntegrationConfig(self, currentPageUrl, httpContextProvider):
+        results = {} if self.sharesTriggerParts else None
+        if (self.matchCache is None):
+            return self.__evaluateCandidates(
+                self.__getUrlMatch(currentPageUrl, results)[0],
+                currentPageUrl, httpContextProvider, results)
+
+        cacheKey = self.__getCacheKey(currentPageUrl)
+        if (cacheKey is None):
+            return self.__evaluateCandidates(
+                self.__getUrlMatch(currentPageUrl, results)[0],
+                currentPageUrl, httpContextProvider, results)
+
+        urlMatch = self.matchCache.get(cacheKey)
+        if (urlMatch is None):
+            urlMatch = self.__getUrlMatch(currentPageUrl, results)
+            self.matchCache.put(cacheKey, urlMatch)
+
+        candidates, inputKeys = urlMatch
+        if (len(inputKeys) == 0):
+            if (len(candidates) == 0):
+                return self.configNode.noMatchResult
+            return candidates[0][0]
+
+        if (isinstance(httpContextProvider, RequestInputs)):
+            requestInputs = httpContextProvider
+        else:
+            requestInputs = RequestInputs.fetch(inputKeys, httpContextProvider)
+        values = requestInputs.getValues(inputKeys)
+        if (not CompiledIntegrationConfig.__isInputCacheable(inputKeys,
+                                                             values)):
+            return self.__evaluateCandidates(candidates, currentPageUrl,
+                                             requestInputs, results)
+        inputCacheKey = (cacheKey, values)
+        matchedConfig = self.inputMatchCache.get(inputCacheKey, NOT_CACHED)
+        if (matchedConfig is NOT_CACHED):
+            matchedConfig = self.__evaluateCandidates(candidates,
+                                                      currentPageUrl,
+                                                      requestInputs, results)
+            self.inputMatchCache.put(inputCacheKey, matchedConfig)
+        return matchedConfig
+
+    @staticmethod
+    def __isInputCacheable(inputKeys, values):
+        # The user agent and long cookie or header values are close to unique
+        # per visitor and would only fill the cache with large keys.
+        if (USER_AGENT_INPUT_KEY in inputKeys):
+            return False
+        maxLength = CompiledIntegrationConfig.MAX_CACHED_INPUT_LENGTH
+        for value in values:
+            if (value is not None and len(value) > maxLength):
+                return False
+        return True
+
+    def __getCacheKey(self, currentPageUrl):
+        if (self.usesFullUrl):
+            return currentPageUrl
+        try:
+            return RequestUrl.getHostNameAndPath(currentPageUrl)
+        except:
+            return None
+
+    def __evaluateCandidates(self, candidates, currentPageUrl,
+                             httpContextProvider, results):
+        for integrationConfig, undecidedTriggers in candidates:
+            if (undecidedTriggers is None):
+                return integrationConfig
+            for compiledTrigger in undecidedTriggers:
+                if (self.adaptiveOrdering):
+                    evaluation = compiledTrigger.evaluateRequestPartsAdaptive(
+                        currentPageUrl, httpContextProvider, results)
+                else:
+                    evaluation = compiledTrigger.evaluateRequestParts(
+                        currentPageUrl, httpContextProvider, results)
+                if (evaluation):
+                    return integrationConfig
+        return self.configNode.noMatchResult
+
+    def __getUrlMatch(self, currentPageUrl, results):
+        urlDecisionTable = self.urlDecisionTable
+        if (urlDecisionTable is None):
+            return self.__createUrlMatch(currentPageUrl, None, results)
+        return urlDecisionTable.getUrlMatch(
+            currentPageUrl,
+            lambda trueAtoms: self.__createUrlMatch(currentPageUrl, trueAtoms,
+                                                    results))
+
+    def __createUrlMatch(self, currentPageUrl, trueAtoms, results):
+        candidates = []
+        requestParts = []
+        if (trueAtoms is None):
+            compiledIntegrations = self.compiledIntegrations
+        else:
+            compiledIntegrations = \
+                self.urlDecisionTable.getCandidateIntegrations(trueAtoms)
+        for integrationConfig, compiledTriggers in compiledIntegrations:
+            undecidedTriggers = []
+            isMatched = False
+            for compiledTrigger in compiledTriggers:
+                if (trueAtoms is None):
+                    evaluation = compiledTrigger.evaluateUrlParts(
+                        currentPageUrl, results)
+                else:
+                    evaluation = self.urlDecisionTable.evaluateUrlParts(
+                        compiledTrigger, trueAtoms)
+                if (evaluation is True):
+                    isMatched = True
+                    break
+                if (evaluation is None):
+                    undecidedTriggers.append(compiledTrigger)
+
+            if (isMatched):
+                candidates.append((integrationConfig, None))
+                break
+            if (len(undecidedTriggers) > 0):
+                candidates.append((integrationConfig, tuple(undecidedTriggers)))
+                for undecidedTrigger in undecidedTriggers:
+                    requestParts.extend(undecidedTrigger.requestParts)
+
+        inputKeys = CompiledIntegrationConfig.__getDependencies(
+            requestParts).getInputKeys()
+        return (tuple(candidates), inputKeys)
+
+
+class CompiledTrigger:
+    __slots__ = ("isOrOperator", "urlParts", "requestParts", "statistics",
+                 "evaluationCount")
+
+    def __init__(self, isOrOperator, urlParts, requestParts):
+        self.isOrOperator = isOrOperator
+        self.urlParts = urlParts
+        self.requestParts = requestParts
+        self.statistics = dict((triggerPart, [0, 0])
+                               for triggerPart in requestParts)
+        self.evaluationCount = 0
+
+    def __reduce__(self):
+        return (CompiledTrigger,
+                (self.isOrOperator, self.urlParts, self.requestParts))
+
+    @staticmethod
+    def compile(trigger):
+        triggerParts = sorted(trigger.triggerParts,
+                              key=CompiledIntegrationConfig.getTriggerPartCost)
+        return CompiledTrigger(
+            trigger.isOrOperator,
+            tuple(triggerPart for triggerPart in triggerParts
+                  if triggerPart.validatorType == URL_VALIDATOR),
+            tuple(triggerPart for triggerPart in triggerParts
+                  if triggerPart.validatorType != URL_VALIDATOR))
+
+    def evaluateUrlParts(self, currentPageUrl, results=None):
+        isOrOperator = self.isOrOperator
+        for triggerPart in self.urlParts:
+            if (results is None):
+                evaluation = CompiledIntegrationConfig.evaluateTriggerPart(
+                    triggerPart, currentPageUrl, None)
+            else:
+                evaluation = CompiledIntegrationConfig.evaluateSharedTriggerPart(
+                    triggerPart, currentPageUrl, None, results)
+            if (evaluation == isOrOperator):
+                return evaluation
+
+        if (len(self.requestParts) == 0):
+            return not isOrOperator
+        return None
+
+    def evaluateRequestParts(self, currentPageUrl, httpContextProvider,
+                             results=None):
+        isOrOperator = self.isOrOperator
+        for triggerPart in self.requestParts:
+            if (results is None):
+                evaluation = CompiledIntegrationConfig.evaluateTriggerPart(
+                    triggerPart, currentPageUrl, httpContextProvider)
+            else:
+                evaluation = CompiledIntegrationConfig.evaluateSharedTriggerPart(
+                    triggerPart, currentPageUrl, httpContextProvider, results)
+            if (evaluation == isOrOperator):
+                return evaluation
+        return not isOrOperator
+
+    def evaluateRequestPartsAdaptive(self, currentPageUrl,
+                                     httpContextProvider, results=None):
+        isOrOperator = self.isOrOperator
+        statistics = self.statistics
+        result = not isOrOperator
+        for triggerPart in self.requestParts:
+            if (results is None):
+                evaluation = CompiledIntegrationConfig.evaluateTriggerPart(
+                    triggerPart, currentPageUrl, httpContextProvider)
+            else:
+                evaluation = CompiledIntegrationConfig.evaluateSharedTriggerPart(
+                    triggerPart, currentPageUrl, httpContextProvider, results)
+            # The counters are not locked. An increment lost to a concurrent
+            # request only makes the pass rates approximate, and any order of
+            # the parts gives the same result.
+            counters = statistics[triggerPart]
+            counters[0] += 1
+            if (evaluation == isOrOperator):
+                counters[1] += 1
+                result = evaluation
+                break
+
+        self.evaluationCount += 1
+        if (self.evaluationCount >= CompiledIntegrationConfig.RERANK_INTERVAL):
+            self.rerank()
+        return result
+
+    def getShortCircuitRate(self, triggerPart):
+        evaluations, shortCircuits = self.statistics[triggerPart]
+        return (shortCircuits + 1.0) / (evaluations + 2.0)
+
+    def rerank(self):
+        self.evaluationCount = 0
+        self.requestParts = tuple(sorted(
+            self.requestParts,
+            key=lambda triggerPart:
+                CompiledIntegrationConfig.getTriggerPartCost(triggerPart) /
+                self.getShortCircuitRate(triggerPart)))
+        for counters in self.statistics.values():
+            counters[0] //= 2
+            counters[1] //= 2
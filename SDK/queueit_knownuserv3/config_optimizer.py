@@ -0,0 +1,408 @@
+from .compiled_integration_config import CompiledIntegrationConfig
+from .integration_config_helpers import IntegrationEvaluator
+from .integration_config_loader import (COOKIE_VALIDATOR, HTTP_HEADER_VALIDATOR,
+                                        URL_PARTS, URL_VALIDATOR,
+                                        USER_AGENT_VALIDATOR,
+                                        IntegrationConfigLoader)
+from .request_inputs import RequestInputs
+
+
+class Predicate:
+    __slots__ = ("validatorType", "urlPart", "inputName", "isContains",
+                 "isNegative", "isIgnoreCase", "values")
+
+    def __init__(self, validatorType, urlPart, inputName, isContains,
+                 isNegative, isIgnoreCase, values):
+        self.validatorType = validatorType
+        self.urlPart = urlPart
+        self.inputName = inputName
+        self.isContains = isContains
+        self.isNegative = isNegative
+        self.isIgnoreCase = isIgnoreCase
+        self.values = {}
+        self.addValues(values)
+
+    @staticmethod
+    def create(triggerPart):
+        operator = triggerPart.operator
+        if (operator == "Equals" or operator == "Contains"):
+            if (operator == "Contains" and triggerPart.isNegative
+                    and triggerPart.valueToCompare == "*"):
+                # A non-empty value always contains "*", even when negated,
+                # and an empty one does not contain it.
+                return True
+            values = [triggerPart.valueToCompare]
+        else:
+            values = triggerPart.valuesToCompare
+        return Predicate(triggerPart.validatorType, triggerPart.urlPart,
+                         triggerPart.inputName,
+                         operator == "Contains" or operator == "ContainsAny",
+                         triggerPart.isNegative, triggerPart.isIgnoreCase,
+                         values)
+
+    def copy(self):
+        return Predicate(self.validatorType, self.urlPart, self.inputName,
+                         self.isContains, self.isNegative, self.isIgnoreCase,
+                         self.values.values())
+
+    def addValues(self, values):
+        for value in values:
+            self.values.setdefault(
+                value.upper() if self.isIgnoreCase else value, value)
+
+    def getMergeKey(self):
+        urlPart = self.urlPart
+        if (not isinstance(urlPart, str) or urlPart not in URL_PARTS):
+            urlPart = None
+        return (self.validatorType, urlPart, self.inputName, self.isContains,
+                self.isIgnoreCase)
+
+    def getKey(self, isNegative=None):
+        if (isNegative is None):
+            isNegative = self.isNegative
+        return (self.getMergeKey(), frozenset(self.values), isNegative)
+
+    def simplify(self):
+        values = self.values
+        if (self.isContains):
+            if ("" in values):
+                return not self.isNegative
+            if ("*" in values):
+                # "*" matches any non-empty value, which covers every other
+                # value in the list.
+                self.values = {"*": "*"}
+            else:
+                self.values = dict(
+                    (value, originalValue)
+                    for value, originalValue in values.items()
+                    if not any(otherValue != value and otherValue in value
+                               for otherValue in values))
+        if (len(self.values) == 0):
+            return self.isNegative
+        return None
+
+    def toConfig(self):
+        values = list(self.values.values())
+        if (self.isContains):
+            operator = "Contains"
+        else:
+            operator = "Equals"
+        triggerPart = {
+            "ValidatorType": self.validatorType,
+            "Operator": operator,
+            "IsNegative": self.isNegative,
+            "IsIgnoreCase": self.isIgnoreCase
+        }
+        if (len(values) == 1 and not (self.isContains and self.isNegative
+                                      and values[0] == "*")):
+            triggerPart["ValueToCompare"] = values[0]
+        else:
+            triggerPart["Operator"] = operator + "Any"
+            triggerPart["ValuesToCompare"] = values
+
+        if (self.validatorType == URL_VALIDATOR):
+            triggerPart["UrlPart"] = self.urlPart
+        elif (self.validatorType == COOKIE_VALIDATOR):
+            triggerPart["CookieName"] = self.inputName
+        elif (self.validatorType == HTTP_HEADER_VALIDATOR):
+            triggerPart["HttpHeaderName"] = self.inputName
+        return triggerPart
+
+
+class OptimizationResult:
+    MAX_REPORTED_MISMATCHES = 10
+
+    def __init__(self, originalConfig, customerIntegration, originalIndices,
+                 strict):
+        self.originalConfig = originalConfig
+        self.customerIntegration = customerIntegration
+        self.originalIndices = originalIndices
+        self.originalNode = IntegrationConfigLoader.load(originalConfig,
+                                                         strict)
+        self.optimizedNode = IntegrationConfigLoader.load(customerIntegration,
+                                                          strict)
+
+    @staticmethod
+    def getCost(configNode):
+        return sum(CompiledIntegrationConfig.getTriggerPartCost(triggerPart)
+                   for triggerPart in configNode.getTriggerParts())
+
+    @staticmethod
+    def __getCounts(configNode):
+        return {
+            "integrations": len(configNode.integrations),
+            "triggers": sum(len(integration.triggers)
+                            for integration in configNode.integrations),
+            "triggerParts": sum(1 for _ in configNode.getTriggerParts()),
+            "cost": OptimizationResult.getCost(configNode)
+        }
+
+    def getReport(self):
+        original = OptimizationResult.__getCounts(self.originalNode)
+        optimized = OptimizationResult.__getCounts(self.optimizedNode)
+        costReduction = 0.0
+        if (original["cost"] > 0):
+            costReduction = 1.0 - float(optimized["cost"]) / original["cost"]
+        return {
+            "original": original,
+            "optimized": optimized,
+            "costReduction": costReduction
+        }
+
+    def formatReport(self):
+        report = self.getReport()
+        lines = ["{:<16}{:>12}{:>12}".format("", "original", "optimized")]
+        for key in ["integrations", "triggers", "triggerParts", "cost"]:
+            lines.append("{:<16}{:>12}{:>12}".format(
+                key, report["original"][key], report["optimized"][key]))
+        lines.append("Estimated evaluation cost reduction: {:.2%}".format(
+            report["costReduction"]))
+        return "\n".join(lines)
+
+    @staticmethod
+    def __getMatchIndex(matchedConfig, originalIndices):
+        if (isinstance(matchedConfig, dict)):
+            return originalIndices[id(matchedConfig)]
+        # None and False (the evaluator stopped at an invalid trigger) are
+        # different results, and False must not compare equal to index 0.
+        if (matchedConfig is None):
+            return None
+        return str(matchedConfig)
+
+    def checkEquivalence(self, requests):
+        evaluator = IntegrationEvaluator()
+        compiledConfig = CompiledIntegrationConfig(self.customerIntegration,
+                                                   0)
+        originalIndices = {}
+        if (isinstance(self.originalConfig, dict) and isinstance(
+                self.originalConfig.get("Integrations"), list)):
+            for index, integrationConfig in enumerate(
+                    self.originalConfig["Integrations"]):
+                originalIndices.setdefault(id(integrationConfig), index)
+        checkedCount = 0
+        mismatchCount = 0
+        mismatches = []
+        for currentPageUrl, httpContextProvider in requests:
+            checkedCount += 1
+            originalIndex = OptimizationResult.__getMatchIndex(
+                evaluator.getMatchedIntegrationConfig(
+                    self.originalConfig, currentPageUrl, httpContextProvider),
+                originalIndices)
+            optimizedIndex = OptimizationResult.__getMatchIndex(
+                compiledConfig.getMatchedIntegrationConfig(
+                    currentPageUrl, httpContextProvider),
+                self.originalIndices)
+            if (originalIndex != optimizedIndex):
+                mismatchCount += 1
+                if (len(mismatches) <
+                        OptimizationResult.MAX_REPORTED_MISMATCHES):
+                    mismatches.append((currentPageUrl, originalIndex,
+                                       optimizedIndex))
+        return checkedCount, mismatchCount, mismatches
+
+
+class ConfigOptimizer:
+    def __init__(self, strict=False):
+        self.strict = strict
+
+    @staticmethod
+    def loads(integrationsConfigString, strict=False):
+        return ConfigOptimizer(strict).optimize(
+            IntegrationConfigLoader.parseJson(integrationsConfigString))
+
+    def optimize(self, customerIntegration):
+        configNode = IntegrationConfigLoader.load(customerIntegration,
+                                                  self.strict)
+        integrationConfigs = []
+        originalIndices = {}
+        indicesById = {}
+        if (isinstance(customerIntegration, dict) and isinstance(
+                customerIntegration.get("Integrations"), list)):
+            for index, integrationConfig in enumerate(
+                    customerIntegration["Integrations"]):
+                indicesById.setdefault(id(integrationConfig), index)
+
+        isTerminated = configNode.noMatchResult is False
+        for integration in configNode.integrations:
+            triggers, isAlwaysMatched = ConfigOptimizer.__optimizeIntegration(
+                integration)
+            if (len(triggers) == 0):
+                continue
+            integrationConfig = dict(integration.config)
+            integrationConfig["Triggers"] = triggers
+            originalIndices[id(integrationConfig)] = indicesById[id(
+                integration.config)]
+            integrationConfigs.append(integrationConfig)
+            if (isAlwaysMatched):
+                # Nothing after an integration that always matches is ever
+                # evaluated.
+                isTerminated = False
+                break
+
+        if (isTerminated):
+            # The original config stops at a trigger that is not an object,
+            # which makes the evaluator return False instead of None.
+            if (len(integrationConfigs) == 0):
+                integrationConfigs.append({"Triggers": []})
+            integrationConfigs[-1]["Triggers"].append(None)
+
+        optimizedConfig = {"Integrations": integrationConfigs}
+        if (isinstance(customerIntegration, dict)):
+            optimizedConfig = dict(customerIntegration)
+            optimizedConfig["Integrations"] = integrationConfigs
+        return OptimizationResult(customerIntegration, optimizedConfig,
+                                  originalIndices, self.strict)
+
+    @staticmethod
+    def __optimizeIntegration(integration):
+        orPredicates = []
+        andTriggers = []
+        for trigger in integration.triggers:
+            predicates = ConfigOptimizer.optimizeTriggerParts(
+                trigger.isOrOperator,
+                [Predicate.create(triggerPart)
+                 for triggerPart in trigger.triggerParts])
+            if (predicates is True):
+                return [{"LogicalOperator": "And", "TriggerParts": []}], True
+            if (predicates is False):
+                continue
+            # The triggers of an integration are or'ed, so every Or trigger
+            # and every single part trigger can be folded into one Or trigger.
+            if (trigger.isOrOperator or len(predicates) == 1):
+                orPredicates.extend(predicates)
+            else:
+                andTriggers.append(predicates)
+
+        triggers = []
+        orKeys = frozenset()
+        if (len(orPredicates) > 0):
+            orPredicates = ConfigOptimizer.optimizeTriggerParts(
+                True, orPredicates)
+            if (orPredicates is True):
+                return [{"LogicalOperator": "And", "TriggerParts": []}], True
+            orKeys = frozenset(predicate.getKey()
+                               for predicate in orPredicates)
+            triggers.append({
+                "LogicalOperator": "Or" if len(orPredicates) > 1 else "And",
+                "TriggerParts": [predicate.toConfig()
+                                 for predicate in orPredicates]
+            })
+
+        # An And trigger that shares a part with the Or trigger, or that has
+        # all the parts of another And trigger, never adds a match.
+        keptKeys = []
+        for predicates in sorted(andTriggers, key=len):
+            keys = frozenset(predicate.getKey() for predicate in predicates)
+            if (not keys.isdisjoint(orKeys) or any(
+                    otherKeys <= keys for otherKeys in keptKeys)):
+                continue
+            keptKeys.append(keys)
+            triggers.append({
+                "LogicalOperator": "And",
+                "TriggerParts": [predicate.toConfig()
+                                 for predicate in predicates]
+            })
+        return triggers, False
+
+    @staticmethod
+    def optimizeTriggerParts(isOrOperator, predicates):
+        # Non-negated parts of an Or trigger on the same input are merged
+        # into one EqualsAny or ContainsAny part, and so are negated parts of
+        # an And trigger: not a and not b is not (a or b).
+        mergedPredicates = []
+        mergeTargets = {}
+        for predicate in predicates:
+            if (predicate is True or predicate is False):
+                if (predicate == isOrOperator):
+                    return isOrOperator
+                continue
+            if (predicate.isNegative == isOrOperator):
+                mergedPredicates.append(predicate)
+                continue
+            mergeKey = predicate.getMergeKey()
+            mergeTarget = mergeTargets.get(mergeKey)
+            if (mergeTarget is None):
+                mergeTarget = predicate.copy()
+                mergeTargets[mergeKey] = mergeTarget
+                mergedPredicates.append(mergeTarget)
+            else:
+                mergeTarget.addValues(predicate.values.values())
+
+        optimizedPredicates = []
+        keys = set()
+        for predicate in mergedPredicates:
+            constant = predicate.simplify()
+            if (constant is not None):
+                if (constant == isOrOperator):
+                    return isOrOperator
+                continue
+            key = predicate.getKey()
+            if (key in keys):
+                continue
+            if (predicate.getKey(not predicate.isNegative) in keys):
+                # A part and its negation: an And trigger can never match and
+                # an Or trigger always does.
+                return isOrOperator
+            keys.add(key)
+            optimizedPredicates.append(predicate)
+
+        if (len(optimizedPredicates) == 0):
+            return not isOrOperator
+        return optimizedPredicates
+
+    @staticmethod
+    def createSampleRequests(configNode, count, seed=0):
+        import random
+        rnd = random.Random(seed)
+        valuesByInput = {}
+        for triggerPart in configNode.getTriggerParts():
+            if (triggerPart.validatorType == URL_VALIDATOR):
+                urlPart = triggerPart.urlPart
+                inputKey = (URL_VALIDATOR,
+                            urlPart if isinstance(urlPart, str) else None)
+            elif (triggerPart.validatorType == USER_AGENT_VALIDATOR):
+                inputKey = (HTTP_HEADER_VALIDATOR, "user-agent")
+            else:
+                inputKey = (triggerPart.validatorType, triggerPart.inputName)
+            values = valuesByInput.setdefault(inputKey, [])
+            if (triggerPart.operator in ("Equals", "Contains")):
+                values.append(triggerPart.valueToCompare)
+            else:
+                values.extend(triggerPart.valuesToCompare)
+
+        def getValue(values):
+            value = rnd.choice(values) if values else ""
+            mutation = rnd.randint(0, 5)
+            if (mutation == 1):
+                return value.upper()
+            if (mutation == 2):
+                return value.lower()
+            if (mutation == 3):
+                return value + "x"
+            if (mutation == 4):
+                return "x" + value
+            if (mutation == 5):
+                return ""
+            return value
+
+        for _ in range(count):
+            pageUrls = valuesByInput.get((URL_VALIDATOR, "PageUrl"))
+            if (pageUrls and rnd.random() < 0.3):
+                currentPageUrl = getValue(pageUrls)
+            else:
+                path = getValue(valuesByInput.get((URL_VALIDATOR, "PagePath")))
+                if (not path.startswith("/")):
+                    path = "/" + path
+                currentPageUrl = "https://" + getValue(valuesByInput.get(
+                    (URL_VALIDATOR, "HostName"), ["www.example.com"])) + path
+
+            cookies = {}
+            headers = {}
+            for (validatorType, name), values in valuesByInput.items():
+                if (validatorType == URL_VALIDATOR or rnd.random() < 0.3):
+                    continue
+                if (validatorType == COOKIE_VALIDATOR):
+                    cookies[name] = getValue(values)
+                else:
+                    headers[name] = getValue(values)
+            yield currentPageUrl, RequestInputs(cookies, headers)
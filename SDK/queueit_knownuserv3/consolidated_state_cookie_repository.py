@@ -0,0 +1,312 @@
+from .models import Utils
+from .queueit_helpers import QueueitHelpers
+from .user_in_queue_state_cookie_repository import StateInfo, UserInQueueStateCookieRepository
+from .validated_token_cache import ValidatedTokenCache
+
+
+class ConsolidatedStateCookieRepository:
+    QUEUEIT_DATA_KEY = "QueueITAccepted-SDFrts345E-V3M"
+    COOKIE_PREFIX = "m~"
+    HASH_PREFIX = "~h_"
+    HASH_BYTES = 16
+    ISSUE_TIME_BYTES = 4
+    MAX_EVENTS = 8
+    VERIFIED_COOKIE_CACHE_SIZE = 1024
+
+    def __init__(self, httpContextProvider, maxEvents=None,
+                 verifiedCookieCache=None, useCompactCookie=False):
+        if (maxEvents is None):
+            maxEvents = ConsolidatedStateCookieRepository.MAX_EVENTS
+        self.httpContextProvider = httpContextProvider
+        self.maxEvents = maxEvents
+        self.verifiedCookieCache = verifiedCookieCache
+        self.eventCookieRepository = UserInQueueStateCookieRepository(
+            httpContextProvider, useCompactCookie)
+        self.__entries = None
+        self.__cookieDomain = None
+        self.__secretKey = None
+        self.__isCookieTampered = False
+
+    @staticmethod
+    def __isStorable(*values):
+        for value in values:
+            if ("." in value or "~" in value):
+                return False
+        return True
+
+    @staticmethod
+    def __generateHash(cookieBody, secretKey):
+        return QueueitHelpers.hmacSha256Base64UrlEncode(
+            "vm~" + cookieBody, secretKey,
+            ConsolidatedStateCookieRepository.HASH_BYTES)
+
+    @staticmethod
+    def __getCookieDomain(cookieDomain):
+        if (cookieDomain is None):
+            return ""
+        return cookieDomain
+
+    @staticmethod
+    def __createCookieValue(cookieDomain, entries, secretKey):
+        cookieBody = "~".join(
+            [cookieDomain] + [entry.toCookiePart() for entry in entries])
+        return (ConsolidatedStateCookieRepository.COOKIE_PREFIX + cookieBody +
+                ConsolidatedStateCookieRepository.HASH_PREFIX +
+                ConsolidatedStateCookieRepository.__generateHash(
+                    cookieBody, secretKey))
+
+    @staticmethod
+    def parseCookieValue(cookieValue, secretKey):
+        if (not cookieValue.startswith(
+                ConsolidatedStateCookieRepository.COOKIE_PREFIX)):
+            return None
+        hashIndex = cookieValue.rfind(
+            ConsolidatedStateCookieRepository.HASH_PREFIX)
+        if (hashIndex < len(ConsolidatedStateCookieRepository.COOKIE_PREFIX)):
+            return None
+
+        cookieBody = cookieValue[
+            len(ConsolidatedStateCookieRepository.COOKIE_PREFIX):hashIndex]
+        hashValue = cookieValue[
+            hashIndex + len(ConsolidatedStateCookieRepository.HASH_PREFIX):]
+        if (hashValue != ConsolidatedStateCookieRepository.__generateHash(
+                cookieBody, secretKey)):
+            return None
+
+        # The first part is the domain the cookie was written with.
+        cookieParts = cookieBody.split("~")
+        entries = []
+        for cookiePart in cookieParts[1:]:
+            entry = ConsolidatedStateEntry.fromCookiePart(cookiePart)
+            if (entry is None):
+                return None
+            entries.append(entry)
+        if (len(entries) == 0):
+            return None
+        return cookieParts[0], tuple(entries)
+
+    @staticmethod
+    def __parseCookieDomain(cookieValue):
+        # Only used to delete a cookie that can not be verified.
+        cookieParts = cookieValue[
+            len(ConsolidatedStateCookieRepository.COOKIE_PREFIX):].split("~")
+        if (len(cookieParts) < 2):
+            return ""
+        return cookieParts[0]
+
+    def __getEntries(self, secretKey):
+        if (self.__entries is not None):
+            return self.__entries
+
+        self.__entries = {}
+        self.__secretKey = secretKey
+        cookieValue = self.httpContextProvider.getCookie(
+            ConsolidatedStateCookieRepository.QUEUEIT_DATA_KEY)
+        if (cookieValue is None):
+            return self.__entries
+
+        cacheKey = None
+        cookie = None
+        if (self.verifiedCookieCache is not None):
+            cacheKey = (cookieValue,
+                        ValidatedTokenCache.getSecretKeyFingerprint(secretKey))
+            cookie = self.verifiedCookieCache.get(cacheKey)
+        if (cookie is None):
+            cookie = ConsolidatedStateCookieRepository.parseCookieValue(
+                cookieValue, secretKey)
+            if (cookie is None):
+                self.__isCookieTampered = True
+                self.__cookieDomain = \
+                    ConsolidatedStateCookieRepository.__parseCookieDomain(
+                        cookieValue)
+                return self.__entries
+            if (cacheKey is not None):
+                self.verifiedCookieCache.put(cacheKey, cookie)
+
+        self.__cookieDomain, entries = cookie
+        for entry in entries:
+            self.__entries[entry.eventId.upper()] = entry
+        return self.__entries
+
+    def __writeCookie(self):
+        if (len(self.__entries) == 0):
+            self.httpContextProvider.setCookie(
+                ConsolidatedStateCookieRepository.QUEUEIT_DATA_KEY, None, -1,
+                self.__cookieDomain)
+            self.__cookieDomain = None
+            return
+
+        self.httpContextProvider.setCookie(
+            ConsolidatedStateCookieRepository.QUEUEIT_DATA_KEY,
+            ConsolidatedStateCookieRepository.__createCookieValue(
+                self.__cookieDomain, self.__entries.values(),
+                self.__secretKey),
+            QueueitHelpers.getCookieExpirationDate(), self.__cookieDomain)
+
+    def __isOtherCookieDomain(self, cookieDomain, secretKey):
+        # A browser keeps one cookie per name and domain, so only events with
+        # the domain of the consolidated cookie can be stored in it.
+        if (len(self.__getEntries(secretKey)) == 0):
+            return "~" in cookieDomain
+        return cookieDomain != self.__cookieDomain
+
+    def __putEntry(self, entry, cookieDomain, secretKey):
+        entries = self.__getEntries(secretKey)
+        entries.pop(entry.eventId.upper(), None)
+        entries[entry.eventId.upper()] = entry
+        while (len(entries) > self.maxEvents):
+            del entries[next(iter(entries))]
+        if (self.__isCookieTampered and self.__cookieDomain != cookieDomain):
+            self.httpContextProvider.setCookie(
+                ConsolidatedStateCookieRepository.QUEUEIT_DATA_KEY, None, -1,
+                self.__cookieDomain)
+        self.__isCookieTampered = False
+        self.__cookieDomain = cookieDomain
+        self.__writeCookie()
+
+    def __removeEntry(self, eventId, secretKey):
+        if (self.__getEntries(secretKey).pop(eventId.upper(), None)
+                is not None):
+            self.__writeCookie()
+
+    def store(self, eventId, queueId, fixedCookieValidityMinutes, cookieDomain,
+              redirectType, secretKey):
+        fixedCookieValidityMinutes = Utils.toString(fixedCookieValidityMinutes)
+        cookieDomain = ConsolidatedStateCookieRepository.__getCookieDomain(
+            cookieDomain)
+        if (not ConsolidatedStateCookieRepository.__isStorable(
+                eventId, queueId, fixedCookieValidityMinutes, redirectType)
+                or self.__isOtherCookieDomain(cookieDomain, secretKey)):
+            self.eventCookieRepository.store(
+                eventId, queueId, fixedCookieValidityMinutes, cookieDomain,
+                redirectType, secretKey)
+            self.__removeEntry(eventId, secretKey)
+            return
+
+        self.__putEntry(
+            ConsolidatedStateEntry(eventId, queueId, fixedCookieValidityMinutes,
+                                   redirectType,
+                                   QueueitHelpers.getCurrentTime()),
+            cookieDomain, secretKey)
+        if (self.httpContextProvider.getCookie(
+                UserInQueueStateCookieRepository.getCookieKey(eventId))
+                is not None):
+            self.eventCookieRepository.cancelQueueCookie(eventId, cookieDomain)
+
+    def getState(self, eventId, cookieValidityMinutes, secretKey,
+                 validateTime):
+        entry = self.__getEntries(secretKey).get(eventId.upper())
+        if (entry is None):
+            state = self.eventCookieRepository.getState(
+                eventId, cookieValidityMinutes, secretKey, validateTime)
+            if (not state.isFound and self.__isCookieTampered):
+                return StateInfo(True, False, None, None, None)
+            return state
+
+        if (validateTime and
+                entry.isExpired(cookieValidityMinutes,
+                                QueueitHelpers.getCurrentTime())):
+            return StateInfo(True, False, None, None, None)
+
+        return StateInfo(True, True, entry.queueId,
+                         entry.getFixedCookieValidityMinutes(),
+                         entry.redirectType)
+
+    def cancelQueueCookie(self, eventId, cookieDomain):
+        if (self.httpContextProvider.getCookie(
+                UserInQueueStateCookieRepository.getCookieKey(eventId))
+                is not None):
+            self.eventCookieRepository.cancelQueueCookie(eventId, cookieDomain)
+
+        if (self.__entries is None):
+            cookieValue = self.httpContextProvider.getCookie(
+                ConsolidatedStateCookieRepository.QUEUEIT_DATA_KEY)
+            if (cookieValue is None):
+                return
+            # Without a secret key the remaining entries can not be re-signed.
+            self.__entries = {}
+            self.__cookieDomain = \
+                ConsolidatedStateCookieRepository.__parseCookieDomain(
+                    cookieValue)
+            self.__writeCookie()
+            return
+
+        if (self.__entries.pop(eventId.upper(), None) is not None
+                or self.__isCookieTampered):
+            self.__isCookieTampered = False
+            self.__writeCookie()
+
+    def reissueQueueCookie(self, eventId, cookieValidityMinutes, cookieDomain,
+                           secretKey):
+        entry = self.__getEntries(secretKey).get(eventId.upper())
+        if (entry is None):
+            self.eventCookieRepository.reissueQueueCookie(
+                eventId, cookieValidityMinutes, cookieDomain, secretKey)
+            return
+
+        if (entry.isExpired(cookieValidityMinutes,
+                            QueueitHelpers.getCurrentTime())):
+            return
+
+        cookieDomain = ConsolidatedStateCookieRepository.__getCookieDomain(
+            cookieDomain)
+        if (self.__isOtherCookieDomain(cookieDomain, secretKey)):
+            self.store(entry.eventId, entry.queueId,
+                       entry.fixedCookieValidityMinutes, cookieDomain,
+                       entry.redirectType, secretKey)
+            return
+
+        self.__putEntry(
+            ConsolidatedStateEntry(entry.eventId, entry.queueId,
+                                   entry.fixedCookieValidityMinutes,
+                                   entry.redirectType,
+                                   QueueitHelpers.getCurrentTime()),
+            cookieDomain, secretKey)
+
+
+class ConsolidatedStateEntry:
+    def __init__(self, eventId, queueId, fixedCookieValidityMinutes,
+                 redirectType, issueTime):
+        self.eventId = eventId
+        self.queueId = queueId
+        self.fixedCookieValidityMinutes = fixedCookieValidityMinutes
+        self.redirectType = redirectType
+        self.issueTime = issueTime
+
+    @staticmethod
+    def fromCookiePart(cookiePart):
+        fields = cookiePart.split(".")
+        if (len(fields) != 5 or fields[0] == "" or fields[1] == ""):
+            return None
+        fixedCookieValidityMinutes = fields[2]
+        if (fixedCookieValidityMinutes != ""
+                and not fixedCookieValidityMinutes.isdigit()):
+            return None
+        try:
+            issueTime = QueueitHelpers.base64UrlDecode(fields[4])
+        except:
+            return None
+        if (len(issueTime) != ConsolidatedStateCookieRepository.ISSUE_TIME_BYTES):
+            return None
+        return ConsolidatedStateEntry(fields[0], fields[1],
+                                      fixedCookieValidityMinutes, fields[3],
+                                      int.from_bytes(issueTime, "big"))
+
+    def toCookiePart(self):
+        return ".".join([
+            self.eventId, self.queueId, self.fixedCookieValidityMinutes,
+            self.redirectType,
+            QueueitHelpers.base64UrlEncode(self.issueTime.to_bytes(
+                ConsolidatedStateCookieRepository.ISSUE_TIME_BYTES, "big"))
+        ])
+
+    def getFixedCookieValidityMinutes(self):
+        if (Utils.isNilOrEmpty(self.fixedCookieValidityMinutes)):
+            return None
+        return int(self.fixedCookieValidityMinutes)
+
+    def isExpired(self, cookieValidityMinutes, currentTime):
+        validity = self.getFixedCookieValidityMinutes()
+        if (validity is None):
+            validity = cookieValidityMinutes
+        return self.issueTime + validity * 60 < currentTime
@@ -0,0 +1,320 @@
+import collections
+import re
+
+from .compiled_integration_config import CompiledIntegrationConfig
+from .integration_config_loader import IntegrationConfigLoader, URL_VALIDATOR
+from .models import KnownUserError
+from .request_inputs import RequestInputs
+
+JSONL_FORMAT = "jsonl"
+COMBINED_FORMAT = "combined"
+AUTO_FORMAT = "auto"
+LOG_FORMATS = (AUTO_FORMAT, JSONL_FORMAT, COMBINED_FORMAT)
+COMBINED_LOG_PATTERN = re.compile(
+    r'^\S+ \S+ \S+ \[[^\]]*\] "(?:[A-Za-z]+ )?(\S+)(?: [^"]*)?" \S+ \S+'
+    r'(?: "(?:[^"\\]|\\.)*" "((?:[^"\\]|\\.)*)")?')
+
+
+class LogParser:
+    def __init__(self, logFormat=AUTO_FORMAT, host=None, scheme="https"):
+        if (logFormat not in LOG_FORMATS):
+            raise KnownUserError("logFormat must be one of " +
+                                 ", ".join(LOG_FORMATS) + ".")
+        self.logFormat = logFormat
+        self.host = host
+        self.scheme = scheme
+
+    def parseLine(self, line):
+        line = line.strip()
+        if (not line):
+            return None
+        if (self.logFormat == JSONL_FORMAT or
+                (self.logFormat == AUTO_FORMAT and line.startswith("{"))):
+            return self.parseJsonLine(line)
+        return self.parseCombinedLine(line)
+
+    def __getUrl(self, target, host):
+        if (target.startswith("http://") or target.startswith("https://")):
+            return target
+        host = host or self.host
+        if (not host):
+            return None
+        if (not target.startswith("/")):
+            target = "/" + target
+        return self.scheme + "://" + host + target
+
+    def parseJsonLine(self, line):
+        import json
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        if (not isinstance(record, dict)):
+            return None
+
+        url = record.get("url")
+        if (not isinstance(url, str)):
+            path = record.get("path")
+            url = self.__getUrl(path if isinstance(path, str) else "/",
+                                record.get("host"))
+        if (url is None):
+            return None
+
+        headers = record.get("headers")
+        headers = dict(headers) if isinstance(headers, dict) else {}
+        userAgent = record.get("userAgent", record.get("user_agent"))
+        if (isinstance(userAgent, str)):
+            headers["user-agent"] = userAgent
+        cookies = record.get("cookies")
+        if (not isinstance(cookies, dict)):
+            cookies = LogParser.parseCookieHeader(
+                RequestInputs(headers=headers).getHeader("cookie"))
+        return url, RequestInputs(cookies, headers)
+
+    def parseCombinedLine(self, line):
+        match = COMBINED_LOG_PATTERN.match(line)
+        if (match is None):
+            return None
+        url = self.__getUrl(match.group(1), None)
+        if (url is None):
+            return None
+        headers = {}
+        if (match.group(2) is not None and match.group(2) != "-"):
+            headers["user-agent"] = match.group(2).replace('\\"', '"')
+        return url, RequestInputs(None, headers)
+
+    @staticmethod
+    def parseCookieHeader(cookieHeader):
+        cookies = {}
+        if (not isinstance(cookieHeader, str)):
+            return cookies
+        for cookie in cookieHeader.split(";"):
+            name, separator, value = cookie.strip().partition("=")
+            if (separator):
+                cookies[name] = value
+        return cookies
+
+
+class CoverageReport:
+    def __init__(self, integrationCount, triggerPartCount):
+        self.lineCount = 0
+        self.parseErrorCount = 0
+        self.unmatchedCount = 0
+        self.matchCounts = [0] * integrationCount
+        self.triggerPartPassCounts = [0] * triggerPartCount
+
+    def getRequestCount(self):
+        return self.lineCount - self.parseErrorCount
+
+    def merge(self, report):
+        self.lineCount += report.lineCount
+        self.parseErrorCount += report.parseErrorCount
+        self.unmatchedCount += report.unmatchedCount
+        for index, count in enumerate(report.matchCounts):
+            self.matchCounts[index] += count
+        for index, count in enumerate(report.triggerPartPassCounts):
+            self.triggerPartPassCounts[index] += count
+        return self
+
+
+class CoverageAnalyzer:
+    CHUNK_SIZE = 10000
+
+    def __init__(self, customerIntegration, logParser=None):
+        self.customerIntegration = customerIntegration
+        self.compiledConfig = CompiledIntegrationConfig(customerIntegration)
+        self.logParser = logParser or LogParser()
+        integrationConfigs = None
+        if (isinstance(customerIntegration, dict)):
+            integrationConfigs = customerIntegration.get("Integrations")
+        if (not isinstance(integrationConfigs, list)):
+            integrationConfigs = []
+        indicesById = dict((id(integrationConfig), index)
+                           for index, integrationConfig in
+                           enumerate(integrationConfigs))
+
+        # The labels use the indices in the config, not the positions left
+        # after malformed triggers and trigger parts were dropped.
+        loader = IntegrationConfigLoader(False)
+        configNode = loader.loadConfig(customerIntegration)
+
+        self.integrations = []
+        self.triggerParts = []
+        self.__integrationIndicesById = {}
+        for integration, triggerIndices in zip(configNode.integrations,
+                                               loader.triggerIndices):
+            integrationIndex = indicesById[id(integration.config)]
+            self.__integrationIndicesById[id(integration.config)] = len(
+                self.integrations)
+            self.integrations.append((integrationIndex,
+                                      integration.config.get("Name")))
+            for trigger, (triggerIndex, partIndices) in zip(
+                    integration.triggers, triggerIndices):
+                for triggerPart, partIndex in zip(trigger.triggerParts,
+                                                  partIndices):
+                    self.triggerParts.append((
+                        "Integrations[{}].Triggers[{}].TriggerParts[{}]".format(
+                            integrationIndex, triggerIndex, partIndex),
+                        triggerPart))
+
+    @staticmethod
+    def loads(integrationsConfigString, logParser=None):
+        return CoverageAnalyzer(
+            IntegrationConfigLoader.parseJson(integrationsConfigString),
+            logParser)
+
+    def createReport(self):
+        return CoverageReport(len(self.integrations), len(self.triggerParts))
+
+    def analyzeLines(self, lines):
+        report = self.createReport()
+        for line in lines:
+            request = self.logParser.parseLine(line)
+            if (request is None):
+                if (line.strip()):
+                    report.lineCount += 1
+                    report.parseErrorCount += 1
+                continue
+            report.lineCount += 1
+            self.__analyzeRequest(report, request[0], request[1])
+        return report
+
+    def __analyzeRequest(self, report, url, requestInputs):
+        matchedConfig = self.compiledConfig.getMatchedIntegrationConfig(
+            url, requestInputs)
+        if (matchedConfig):
+            report.matchCounts[self.__integrationIndicesById[id(
+                matchedConfig)]] += 1
+        else:
+            report.unmatchedCount += 1
+
+        passCounts = report.triggerPartPassCounts
+        for index, (_, triggerPart) in enumerate(self.triggerParts):
+            if (CompiledIntegrationConfig.evaluateTriggerPart(
+                    triggerPart, url, requestInputs)):
+                passCounts[index] += 1
+
+    def analyzeStream(self, lines, processes=1, chunkSize=None):
+        chunkSize = chunkSize or CoverageAnalyzer.CHUNK_SIZE
+        report = self.createReport()
+        if (processes <= 1):
+            for chunk in CoverageAnalyzer.__getChunks(lines, chunkSize):
+                report.merge(self.analyzeLines(chunk))
+            return report
+
+        import multiprocessing
+        pool = multiprocessing.Pool(
+            processes, _initWorker,
+            (self.customerIntegration, self.logParser.logFormat,
+             self.logParser.host, self.logParser.scheme))
+        try:
+            # At most two chunks per process are read ahead, so memory use
+            # does not depend on the size of the log.
+            pending = collections.deque()
+            for chunk in CoverageAnalyzer.__getChunks(lines, chunkSize):
+                if (len(pending) >= processes * 2):
+                    report.merge(pending.popleft().get())
+                pending.append(pool.apply_async(_analyzeChunk, (chunk, )))
+            while (pending):
+                report.merge(pending.popleft().get())
+        finally:
+            pool.terminate()
+            pool.join()
+        return report
+
+    @staticmethod
+    def __getChunks(lines, chunkSize):
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if (len(chunk) >= chunkSize):
+                yield chunk
+                chunk = []
+        if (chunk):
+            yield chunk
+
+    def toDict(self, report):
+        requestCount = report.getRequestCount()
+        return {
+            "lines": report.lineCount,
+            "parseErrors": report.parseErrorCount,
+            "requests": requestCount,
+            "unmatched": report.unmatchedCount,
+            "unmatchedShare": CoverageAnalyzer.__getShare(
+                report.unmatchedCount, requestCount),
+            "integrations": [{
+                "index": integrationIndex,
+                "name": name,
+                "hits": hits,
+                "share": CoverageAnalyzer.__getShare(hits, requestCount)
+            } for (integrationIndex, name), hits in zip(
+                self.integrations, report.matchCounts)],
+            "triggerParts": [{
+                "path": path,
+                "description": CoverageAnalyzer.describeTriggerPart(
+                    triggerPart),
+                "passes": passes,
+                "passRate": CoverageAnalyzer.__getShare(passes, requestCount)
+            } for (path, triggerPart), passes in zip(
+                self.triggerParts, report.triggerPartPassCounts)]
+        }
+
+    def formatReport(self, report):
+        result = self.toDict(report)
+        lines = [
+            "Lines: {} (parse errors: {})".format(result["lines"],
+                                                  result["parseErrors"]),
+            "Requests: {}, unmatched: {} ({:.2%})".format(
+                result["requests"], result["unmatched"],
+                result["unmatchedShare"]),
+            "",
+            "Integrations:"
+        ]
+        for integration in result["integrations"]:
+            lines.append("  [{}] {:<40}{:>12}{:>10.2%}".format(
+                integration["index"], str(integration["name"]),
+                integration["hits"], integration["share"]))
+        lines.append("")
+        lines.append("Trigger part pass rates:")
+        for triggerPart in result["triggerParts"]:
+            lines.append("  {:<48}{:>10.2%}  {}".format(
+                triggerPart["path"], triggerPart["passRate"],
+                triggerPart["description"]))
+        return "\n".join(lines)
+
+    @staticmethod
+    def describeTriggerPart(triggerPart):
+        if (triggerPart.validatorType == URL_VALIDATOR):
+            subject = "{} {}".format(triggerPart.validatorType,
+                                     triggerPart.urlPart)
+        elif (triggerPart.inputName is not None):
+            subject = "{} {}".format(triggerPart.validatorType,
+                                     triggerPart.inputName)
+        else:
+            subject = triggerPart.validatorType
+        if (triggerPart.operator in ("EqualsAny", "ContainsAny")):
+            value = list(triggerPart.valuesToCompare)
+        else:
+            value = triggerPart.valueToCompare
+        return "{} {}{} {!r}".format(
+            subject, "not " if triggerPart.isNegative else "",
+            triggerPart.operator, value)
+
+    @staticmethod
+    def __getShare(count, total):
+        if (total == 0):
+            return 0.0
+        return float(count) / total
+
+
+_workerAnalyzer = None
+
+
+def _initWorker(customerIntegration, logFormat, host, scheme):
+    global _workerAnalyzer
+    _workerAnalyzer = CoverageAnalyzer(customerIntegration,
+                                       LogParser(logFormat, host, scheme))
+
+
+def _analyzeChunk(lines):
+    return _workerAnalyzer.analyzeLines(lines)
@@ -1,3 +1,4 @@
+from .lazy_cookie_jar import LazyCookieJar
 from .queueit_helpers import QueueitHelpers
 
 
@@ -22,6 +23,9 @@ class HttpContextProvider:
     def getOriginalRequestUrl(self):
         raise NotImplementedError(self.ERROR_MSG)
 
+    def getRequestMethod(self):
+        raise NotImplementedError(self.ERROR_MSG)
+
 
 class Django_1_8_Provider(HttpContextProvider):
     def __init__(self, request, response):
@@ -66,3 +70,161 @@ class Django_1_8_Provider(HttpContextProvider):
 
     def getOriginalRequestUrl(self):
         return self.request.build_absolute_uri()
+
+    def getRequestMethod(self):
+        return self.request.method
+
+
+class RawHttpContextProvider(HttpContextProvider):
+    COOKIE_EXPIRES_FORMAT = "%a, %d %b %Y %H:%M:%S GMT"
+    EXPIRED_COOKIE_DATE = "Thu, 01 Jan 1970 00:00:00 GMT"
+
+    def __init__(self):
+        self.cookieJar = None
+        self.responseHeaders = []
+
+    def getCookieHeader(self):
+        raise NotImplementedError(self.ERROR_MSG)
+
+    def getCookie(self, name):
+        if (self.cookieJar is None):
+            self.cookieJar = LazyCookieJar(self.getCookieHeader())
+        return self.cookieJar.get(name)
+
+    @staticmethod
+    def createSetCookieHeader(name, value, expire, domain):
+        if (value is None):
+            value = ""
+        cookie = name + "=" + QueueitHelpers.urlEncode(value)
+        if (hasattr(expire, "strftime")):
+            cookie += "; Expires=" + expire.strftime(
+                RawHttpContextProvider.COOKIE_EXPIRES_FORMAT)
+        elif (expire is not None and expire < 0):
+            cookie += "; Max-Age=0; Expires=" + \
+                RawHttpContextProvider.EXPIRED_COOKIE_DATE
+        if (domain is not None and str(domain) != ""):
+            cookie += "; Domain=" + str(domain)
+        return cookie + "; Path=/"
+
+
+class Wsgi_Provider(RawHttpContextProvider):
+    def __init__(self, environ):
+        RawHttpContextProvider.__init__(self)
+        self.environ = environ
+
+    def getProviderName(self):
+        return "wsgi"
+
+    def setCookie(self, name, value, expire, domain):
+        self.responseHeaders.append(
+            ("Set-Cookie",
+             RawHttpContextProvider.createSetCookieHeader(
+                 name, value, expire, domain)))
+
+    def getCookieHeader(self):
+        return self.environ.get("HTTP_COOKIE")
+
+    def getHeader(self, name):
+        if (name is None or name == ""):
+            return None
+
+        key = name.replace("-", "_").upper()
+        if (key != "CONTENT_TYPE" and key != "CONTENT_LENGTH"):
+            key = "HTTP_" + key
+        return self.environ.get(key)
+
+    def getRequestIp(self):
+        return self.environ.get("REMOTE_ADDR")
+
+    def getOriginalRequestUrl(self):
+        from urllib.parse import quote
+        environ = self.environ
+        scheme = environ.get("wsgi.url_scheme", "http")
+        host = environ.get("HTTP_HOST")
+        if (not host):
+            host = environ.get("SERVER_NAME", "")
+            port = environ.get("SERVER_PORT")
+            if (port and port != ("443" if scheme == "https" else "80")):
+                host += ":" + port
+        url = scheme + "://" + host + quote(
+            environ.get("SCRIPT_NAME", "") + environ.get("PATH_INFO", ""),
+            safe="/;=,~!$&'()*+:@")
+        if (environ.get("QUERY_STRING")):
+            url += "?" + environ["QUERY_STRING"]
+        return url
+
+    def getRequestMethod(self):
+        return self.environ.get("REQUEST_METHOD")
+
+
+class Asgi_Provider(RawHttpContextProvider):
+    def __init__(self, scope):
+        RawHttpContextProvider.__init__(self)
+        self.scope = scope
+        self.__headers = None
+
+    def getProviderName(self):
+        return "asgi"
+
+    def setCookie(self, name, value, expire, domain):
+        self.responseHeaders.append(
+            (b"set-cookie",
+             RawHttpContextProvider.createSetCookieHeader(
+                 name, value, expire, domain).encode("latin-1")))
+
+    def getCookieHeader(self):
+        # HTTP/2 clients may send the cookies in several cookie headers.
+        cookieHeaders = [value for name, value in self.scope.get("headers", ())
+                         if name == b"cookie"]
+        if (len(cookieHeaders) == 0):
+            return None
+        return b"; ".join(cookieHeaders).decode("latin-1")
+
+    def getHeader(self, name):
+        if (name is None or name == ""):
+            return None
+
+        if (self.__headers is None):
+            headers = {}
+            for headerName, value in self.scope.get("headers", ()):
+                headerName = headerName.decode("latin-1").lower()
+                value = value.decode("latin-1")
+                if (headerName in headers):
+                    value = headers[headerName] + ", " + value
+                headers[headerName] = value
+            self.__headers = headers
+        return self.__headers.get(name.lower())
+
+    def getRequestIp(self):
+        client = self.scope.get("client")
+        if (not client):
+            return None
+        return client[0]
+
+    def getOriginalRequestUrl(self):
+        from urllib.parse import quote
+        scope = self.scope
+        scheme = scope.get("scheme", "http")
+        host = self.getHeader("host")
+        if (not host):
+            server = scope.get("server")
+            host = ""
+            if (server):
+                host = server[0]
+                if (server[1] is not None and server[1] != (
+                        443 if scheme in ("https", "wss") else 80)):
+                    host += ":" + str(server[1])
+        rawPath = scope.get("raw_path")
+        if (rawPath):
+            path = rawPath.decode("latin-1")
+        else:
+            path = quote(scope.get("root_path", "") + scope.get("path", ""),
+                         safe="/;=,~!$&'()*+:@")
+        url = scheme + "://" + host + path
+        queryString = scope.get("query_string")
+        if (queryString):
+            url += "?" + queryString.decode("latin-1")
+        return url
+
+    def getRequestMethod(self):
+        return self.scope.get("method")
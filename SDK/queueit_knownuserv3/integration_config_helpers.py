@@ -1,4 +1,4 @@
-from .queueit_helpers import QueueitHelpers
+from .request_url import RequestUrl
 
 
 class IntegrationEvaluator:
@@ -92,14 +92,14 @@ class UrlValidatorHelper:
     @staticmethod
     def getUrlPart(urlPart, url):
         try:
-            uri = QueueitHelpers.urlParse(url)
+            hostName, path = RequestUrl.getHostNameAndPath(url)
 
             if (urlPart == "PagePath"):
-                return uri.path
+                return path
             if (urlPart == "PageUrl"):
                 return url
             if (urlPart == "HostName"):
-                return uri.hostname
+                return hostName
             return ''
         except:
             return ''
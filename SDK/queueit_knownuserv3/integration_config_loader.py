@@ -0,0 +1,430 @@
+import sys
+
+from .integration_config_helpers import ComparisonOperatorHelper
+from .models import KnownUserError
+
+URL_VALIDATOR = "UrlValidator"
+COOKIE_VALIDATOR = "CookieValidator"
+USER_AGENT_VALIDATOR = "UserAgentValidator"
+HTTP_HEADER_VALIDATOR = "HttpHeaderValidator"
+VALIDATOR_TYPES = frozenset([URL_VALIDATOR, COOKIE_VALIDATOR,
+                             USER_AGENT_VALIDATOR, HTTP_HEADER_VALIDATOR])
+VALUE_OPERATORS = frozenset(["Equals", "Contains"])
+VALUES_OPERATORS = frozenset(["EqualsAny", "ContainsAny"])
+URL_PARTS = frozenset(["PagePath", "PageUrl", "HostName"])
+LOGICAL_OPERATORS = frozenset(["And", "Or"])
+
+
+class IntegrationConfigError(KnownUserError):
+    def __init__(self, path, message):
+        KnownUserError.__init__(self, path + " " + message)
+        self.path = path
+
+
+class IntegrationConfigNode:
+    __slots__ = ("customerIntegration", "version", "integrations",
+                 "noMatchResult", "droppedParts")
+
+    def __init__(self, customerIntegration, version, integrations,
+                 noMatchResult, droppedParts):
+        self.customerIntegration = customerIntegration
+        self.version = version
+        self.integrations = integrations
+        self.noMatchResult = noMatchResult
+        self.droppedParts = droppedParts
+
+    def __reduce__(self):
+        return (IntegrationConfigNode,
+                (self.customerIntegration, self.version, self.integrations,
+                 self.noMatchResult, self.droppedParts))
+
+    def getTriggerParts(self):
+        for integration in self.integrations:
+            for trigger in integration.triggers:
+                for triggerPart in trigger.triggerParts:
+                    yield triggerPart
+
+
+class IntegrationNode:
+    __slots__ = ("config", "triggers")
+
+    def __init__(self, config, triggers):
+        self.config = config
+        self.triggers = triggers
+
+    def __reduce__(self):
+        return (IntegrationNode, (self.config, self.triggers))
+
+
+class TriggerNode:
+    __slots__ = ("isOrOperator", "triggerParts")
+
+    def __init__(self, isOrOperator, triggerParts):
+        self.isOrOperator = isOrOperator
+        self.triggerParts = triggerParts
+
+    def __reduce__(self):
+        return (TriggerNode, (self.isOrOperator, self.triggerParts))
+
+
+class TriggerPartNode:
+    __slots__ = ("validatorType", "operator", "isNegative", "isIgnoreCase",
+                 "urlPart", "inputName", "valueToCompare", "valuesToCompare")
+
+    def __init__(self, validatorType, operator, isNegative, isIgnoreCase,
+                 urlPart, inputName, valueToCompare, valuesToCompare):
+        self.validatorType = validatorType
+        self.operator = operator
+        self.isNegative = isNegative
+        self.isIgnoreCase = isIgnoreCase
+        self.urlPart = urlPart
+        self.inputName = inputName
+        self.valueToCompare = valueToCompare
+        self.valuesToCompare = valuesToCompare
+
+    def __reduce__(self):
+        return (TriggerPartNode,
+                (self.validatorType, self.operator, self.isNegative,
+                 self.isIgnoreCase, self.urlPart, self.inputName,
+                 self.valueToCompare, self.valuesToCompare))
+
+
+class ConfigInterner:
+    def __init__(self):
+        self.__values = {}
+
+    def internConfig(self, customerIntegration):
+        if (not isinstance(customerIntegration, dict) or not isinstance(
+                customerIntegration.get("Integrations"), list)):
+            return customerIntegration
+        # Integrations keep their own object, so that a matched integration
+        # can still be told apart from an identical one.
+        integrations = [self.__internDict(integrationConfig)
+                        if isinstance(integrationConfig, dict) else
+                        self.intern(integrationConfig)
+                        for integrationConfig in
+                        customerIntegration["Integrations"]]
+        customerIntegration = self.__internDict(customerIntegration)
+        customerIntegration["Integrations"] = integrations
+        return customerIntegration
+
+    def __internDict(self, value):
+        return dict((sys.intern(key) if isinstance(key, str) else key,
+                     self.intern(item)) for key, item in value.items())
+
+    def intern(self, value):
+        return self.__intern(value)[0]
+
+    def __intern(self, value):
+        if (isinstance(value, str)):
+            value = sys.intern(value)
+            return value, value
+        if (isinstance(value, dict)):
+            items = []
+            keys = []
+            for key, item in value.items():
+                if (isinstance(key, str)):
+                    key = sys.intern(key)
+                item, itemKey = self.__intern(item)
+                items.append((key, item))
+                keys.append((key, itemKey))
+            valueKey = (dict, tuple(keys))
+            internedValue = self.__values.get(valueKey)
+            if (internedValue is None):
+                internedValue = dict(items)
+                self.__values[valueKey] = internedValue
+            return internedValue, valueKey
+        if (isinstance(value, list)):
+            items = []
+            keys = []
+            for item in value:
+                item, itemKey = self.__intern(item)
+                items.append(item)
+                keys.append(itemKey)
+            valueKey = (list, tuple(keys))
+            internedValue = self.__values.get(valueKey)
+            if (internedValue is None):
+                internedValue = items
+                self.__values[valueKey] = internedValue
+            return internedValue, valueKey
+        # True == 1 and 1 == 1.0, so the type is part of the key.
+        return value, (type(value), value)
+
+
+class IntegrationConfigLoader:
+    def __init__(self, strict=True):
+        self.strict = strict
+        self.droppedParts = []
+        # For each loaded integration, the config indices of its loaded
+        # triggers and of their trigger parts.
+        self.triggerIndices = []
+        self.__nodes = {}
+
+    @staticmethod
+    def parseJson(integrationsConfigString):
+        import json
+        try:
+            return json.loads(integrationsConfigString)
+        except ValueError as e:
+            raise IntegrationConfigError("$", "is not valid JSON: " + str(e))
+
+    @staticmethod
+    def loads(integrationsConfigString, strict=True):
+        return IntegrationConfigLoader.load(
+            IntegrationConfigLoader.parseJson(integrationsConfigString), strict)
+
+    @staticmethod
+    def load(customerIntegration, strict=True):
+        return IntegrationConfigLoader(strict).loadConfig(customerIntegration)
+
+    def loadConfig(self, customerIntegration):
+        return self.__loadConfig(customerIntegration)
+
+    def __reject(self, path, message):
+        if (self.strict):
+            raise IntegrationConfigError(path, message)
+        self.droppedParts.append(path)
+
+    def __loadConfig(self, customerIntegration):
+        integrations = []
+        noMatchResult = None
+        version = None
+        if (not isinstance(customerIntegration, dict)):
+            self.__reject("$", "must be an object.")
+        else:
+            version = customerIntegration.get("Version")
+            if (self.strict and not version):
+                self.__reject("Version", "is missing.")
+            integrationConfigs = customerIntegration.get("Integrations")
+            if (not isinstance(integrationConfigs, list)):
+                self.__reject("Integrations", "must be a list.")
+                integrationConfigs = []
+
+            for index, integrationConfig in enumerate(integrationConfigs):
+                path = "Integrations[" + str(index) + "]"
+                integration, isTerminated = self.__loadIntegration(
+                    integrationConfig, path)
+                if (integration is not None):
+                    integrations.append(integration)
+                if (isTerminated):
+                    noMatchResult = False
+                    for droppedIndex in range(index + 1, len(integrationConfigs)):
+                        self.droppedParts.append(
+                            "Integrations[" + str(droppedIndex) + "]")
+                    break
+
+        return IntegrationConfigNode(customerIntegration, version,
+                                     tuple(integrations), noMatchResult,
+                                     tuple(self.droppedParts))
+
+    def __loadIntegration(self, integrationConfig, path):
+        if (not isinstance(integrationConfig, dict)):
+            self.__reject(path, "must be an object.")
+            return None, False
+        triggerConfigs = integrationConfig.get("Triggers")
+        if (not isinstance(triggerConfigs, list)):
+            self.__reject(path + ".Triggers", "must be a list.")
+            return None, False
+
+        triggers = []
+        triggerIndices = []
+        for index, triggerConfig in enumerate(triggerConfigs):
+            triggerPath = path + ".Triggers[" + str(index) + "]"
+            if (not isinstance(triggerConfig, dict)):
+                # The evaluator stops looking at any later trigger or
+                # integration when it reaches a trigger that is not an object.
+                self.__reject(triggerPath, "must be an object.")
+                self.triggerIndices.append(tuple(triggerIndices))
+                return IntegrationNode(integrationConfig, tuple(triggers)), True
+            partIndices = []
+            trigger = self.__loadTrigger(triggerConfig, triggerPath,
+                                         partIndices)
+            if (trigger is not None):
+                triggers.append(trigger)
+                triggerIndices.append((index, tuple(partIndices)))
+
+        if (len(triggers) == 0):
+            return None, False
+        self.triggerIndices.append(tuple(triggerIndices))
+        return IntegrationNode(integrationConfig, tuple(triggers)), False
+
+    def __loadTrigger(self, triggerConfig, path, partIndices):
+        logicalOperator = triggerConfig.get("LogicalOperator")
+        if (logicalOperator is None or (
+                self.strict and not IntegrationConfigLoader.__isOneOf(
+                    logicalOperator, LOGICAL_OPERATORS))):
+            self.__reject(path + ".LogicalOperator", "must be 'And' or 'Or'.")
+            return None
+        triggerPartConfigs = triggerConfig.get("TriggerParts")
+        if (not isinstance(triggerPartConfigs, list)):
+            self.__reject(path + ".TriggerParts", "must be a list.")
+            return None
+
+        isOrOperator = logicalOperator == "Or"
+        triggerParts = []
+        for index, triggerPartConfig in enumerate(triggerPartConfigs):
+            partPath = path + ".TriggerParts[" + str(index) + "]"
+            if (not isinstance(triggerPartConfig, dict)):
+                self.__reject(partPath, "must be an object.")
+                if (not isOrOperator):
+                    return None
+                break
+            triggerPart = self.__loadTriggerPart(triggerPartConfig, partPath)
+            if (triggerPart is not None):
+                triggerParts.append(triggerPart)
+                partIndices.append(index)
+            elif (not isOrOperator):
+                return None
+
+        if (isOrOperator and len(triggerParts) == 0):
+            return None
+        return self.__share(TriggerNode, (isOrOperator, tuple(triggerParts)),
+                            (isOrOperator, tuple(triggerParts)))
+
+    def __loadTriggerPart(self, triggerPartConfig, path):
+        validatorType = triggerPartConfig.get("ValidatorType")
+        if (not IntegrationConfigLoader.__isOneOf(validatorType,
+                                                  VALIDATOR_TYPES)):
+            self.__reject(path + ".ValidatorType",
+                          "must be one of " + ", ".join(sorted(VALIDATOR_TYPES)) + ".")
+            return None
+
+        for key in ["Operator", "IsNegative", "IsIgnoreCase"]:
+            if (key not in triggerPartConfig):
+                self.__reject(path + "." + key, "is missing.")
+                return None
+
+        urlPart = None
+        inputName = None
+        if (validatorType == URL_VALIDATOR):
+            if ("UrlPart" not in triggerPartConfig):
+                self.__reject(path + ".UrlPart", "is missing.")
+                return None
+            urlPart = triggerPartConfig["UrlPart"]
+            if (self.strict and not IntegrationConfigLoader.__isOneOf(
+                    urlPart, URL_PARTS)):
+                self.__reject(path + ".UrlPart",
+                              "must be one of " + ", ".join(sorted(URL_PARTS)) + ".")
+        elif (validatorType == COOKIE_VALIDATOR):
+            inputName = self.__getName(triggerPartConfig, "CookieName", path)
+            if (inputName is None):
+                return None
+        elif (validatorType == HTTP_HEADER_VALIDATOR):
+            inputName = self.__getName(triggerPartConfig, "HttpHeaderName", path)
+            if (inputName is None):
+                return None
+
+        isNegative = triggerPartConfig["IsNegative"]
+        isIgnoreCase = triggerPartConfig["IsIgnoreCase"]
+        if (self.strict):
+            if (not isinstance(isNegative, bool)):
+                self.__reject(path + ".IsNegative", "must be a boolean.")
+            if (not isinstance(isIgnoreCase, bool)):
+                self.__reject(path + ".IsIgnoreCase", "must be a boolean.")
+
+        operator = triggerPartConfig["Operator"]
+        valueToCompare = ""
+        valuesToCompare = ()
+        if (IntegrationConfigLoader.__isOneOf(operator, VALUE_OPERATORS)):
+            valueToCompare = triggerPartConfig.get("ValueToCompare")
+            if (valueToCompare is None):
+                valueToCompare = ""
+            elif (not isinstance(valueToCompare, str)):
+                if (self.strict):
+                    raise IntegrationConfigError(path + ".ValueToCompare",
+                                                 "must be a string.")
+                # A string value never equals or contains anything else, so
+                # the evaluator gives the same result for every request.
+                try:
+                    evaluation = ComparisonOperatorHelper.evaluate(
+                        operator, isNegative, isIgnoreCase, "", valueToCompare,
+                        None)
+                except:
+                    evaluation = False
+                return self.__loadConstantPart(validatorType, urlPart,
+                                               inputName, evaluation)
+        elif (IntegrationConfigLoader.__isOneOf(operator, VALUES_OPERATORS)):
+            valuesToCompare = triggerPartConfig.get("ValuesToCompare")
+            if (valuesToCompare is None):
+                valuesToCompare = ()
+            elif (not isinstance(valuesToCompare, list) or not all(
+                    isinstance(value, str) for value in valuesToCompare)):
+                if (self.strict):
+                    raise IntegrationConfigError(path + ".ValuesToCompare",
+                                                 "must be a list of strings.")
+                valuesToCompare, isTruncated = \
+                    IntegrationConfigLoader.__getComparableValues(
+                        valuesToCompare, operator, isIgnoreCase)
+                if (valuesToCompare is None or (isTruncated and isNegative)):
+                    # The evaluator stops without a match when it cannot
+                    # compare a value, even for a negated part.
+                    return self.__loadConstantPart(validatorType, urlPart,
+                                                   inputName, False)
+            valuesToCompare = tuple(valuesToCompare)
+        else:
+            self.__reject(path + ".Operator", "must be one of " + ", ".join(
+                sorted(VALUE_OPERATORS | VALUES_OPERATORS)) + ".")
+            return None
+
+        if (isinstance(urlPart, str)):
+            urlPart = sys.intern(urlPart)
+        arguments = (sys.intern(validatorType), sys.intern(operator),
+                     bool(isNegative), bool(isIgnoreCase), urlPart,
+                     None if inputName is None else sys.intern(inputName),
+                     sys.intern(valueToCompare),
+                     tuple(sys.intern(value) for value in valuesToCompare))
+        return self.__share(TriggerPartNode, arguments,
+                            arguments + (type(urlPart), ))
+
+    def __loadConstantPart(self, validatorType, urlPart, inputName,
+                           evaluation):
+        # Contains "" is true for every value, and false when negated.
+        if (isinstance(urlPart, str)):
+            urlPart = sys.intern(urlPart)
+        arguments = (sys.intern(validatorType), "Contains", not evaluation,
+                     False, urlPart,
+                     None if inputName is None else sys.intern(inputName), "",
+                     ())
+        return self.__share(TriggerPartNode, arguments,
+                            arguments + (type(urlPart), ))
+
+    @staticmethod
+    def __getComparableValues(valuesToCompare, operator, isIgnoreCase):
+        # The evaluator iterates any value it is given and skips values that
+        # are not strings, unless comparing one raises, which ends the part.
+        try:
+            valuesToCompare = list(valuesToCompare)
+        except TypeError:
+            return None, False
+        comparableValues = []
+        for value in valuesToCompare:
+            if (isinstance(value, str)):
+                comparableValues.append(value)
+            elif (operator == "ContainsAny" or isIgnoreCase):
+                return comparableValues, True
+        return comparableValues, False
+
+    def __share(self, nodeType, arguments, key):
+        # Identical nodes are immutable, so one instance serves all of them.
+        try:
+            node = self.__nodes.get(key)
+        except TypeError:
+            return nodeType(*arguments)
+        if (node is None):
+            node = nodeType(*arguments)
+            self.__nodes[key] = node
+        return node
+
+    @staticmethod
+    def __isOneOf(value, values):
+        return isinstance(value, str) and value in values
+
+    def __getName(self, triggerPartConfig, key, path):
+        if (key not in triggerPartConfig):
+            self.__reject(path + "." + key, "is missing.")
+            return None
+        name = triggerPartConfig[key]
+        if (not isinstance(name, str)):
+            self.__reject(path + "." + key, "must be a string.")
+            return None
+        return name
@@ -4,24 +4,37 @@ from .queueit_helpers import QueueitHelpers
 from .models import Utils, KnownUserError, ActionTypes, RequestValidationResult, QueueEventConfig, CancelEventConfig
 from .integration_config_helpers import IntegrationEvaluator
 from .queue_url_params import QueueUrlParams
-from .connector_diagnostics import ConnectorDiagnostics
-import json
 import sys
 
+
+class DisabledConnectorDiagnostics:
+    isEnabled = False
+    hasError = False
+    validationResult = None
+
+
+DISABLED_CONNECTOR_DIAGNOSTICS = DisabledConnectorDiagnostics()
+
+
 class KnownUser:
     QUEUEIT_TOKEN_KEY = "queueittoken"
     QUEUEIT_DEBUG_KEY = "queueitdebug"
     QUEUEIT_AJAX_HEADER_KEY = "x-queueit-ajaxpageurl"
+    QUEUEIT_DEBUG_TOKEN_PART = "rt_debug"
 
     userInQueueService = None
 
     @staticmethod
-    def __getUserInQueueService(httpContextProvider):
-        if KnownUser.userInQueueService is None:
+    def __getUserInQueueService(httpContextProvider,
+                                userInQueueServiceFactory=None):
+        userInQueueService = KnownUser.userInQueueService
+        if userInQueueService is None:
+            if userInQueueServiceFactory is not None:
+                return userInQueueServiceFactory(httpContextProvider)
             return UserInQueueService(
                 httpContextProvider,
                 UserInQueueStateCookieRepository(httpContextProvider))
-        return KnownUser.userInQueueService
+        return userInQueueService
 
     @staticmethod
     def __isQueueAjaxCall(httpContextProvider):
@@ -63,20 +76,28 @@ class KnownUser:
             return
 
         cookieValue = ''
-        for k, v in debugEntries.iteritems():
+        for k, v in debugEntries.items():
             cookieValue += (k + '=' + str(v) + '|')
 
         cookieValue = cookieValue.strip('|')
         httpContextProvider.setCookie(KnownUser.QUEUEIT_DEBUG_KEY, cookieValue,
                                       None, None)
     @staticmethod
+    def __verifyConnectorDiagnostics(customerId, secretKey, queueitToken):
+        if (not queueitToken or KnownUser.QUEUEIT_DEBUG_TOKEN_PART not in queueitToken):
+            return DISABLED_CONNECTOR_DIAGNOSTICS
+        from .connector_diagnostics import ConnectorDiagnostics
+        return ConnectorDiagnostics.verify(customerId, secretKey, queueitToken)
+
+    @staticmethod
     def __getRunTime():
         return sys.version
 
     @staticmethod
     def __resolveQueueRequestByLocalConfig(targetUrl, queueitToken,
                                            queueConfig, customerId, secretKey,
-                                           httpContextProvider, debugEntries, isDebug):
+                                           httpContextProvider, debugEntries, isDebug,
+                                           userInQueueServiceFactory=None):
         if (isDebug):
             debugEntries["SdkVersion"] = UserInQueueService.SDK_VERSION
             debugEntries["Connector"] = httpContextProvider.getProviderName()
@@ -121,7 +142,7 @@ class KnownUser:
                 "queueConfig.extendCookieValidity should be valid boolean.")
 
         userInQueueService = KnownUser.__getUserInQueueService(
-            httpContextProvider)
+            httpContextProvider, userInQueueServiceFactory)
         result = userInQueueService.validateQueueRequest(
             targetUrl, queueitToken, queueConfig, customerId, secretKey)
         result.isAjaxResult = KnownUser.__isQueueAjaxCall(httpContextProvider)
@@ -130,7 +151,8 @@ class KnownUser:
     @staticmethod
     def __cancelRequestByLocalConfig(targetUrl, queueitToken, cancelConfig,
                                      customerId, secretKey,
-                                     httpContextProvider, debugEntries, isDebug):
+                                     httpContextProvider, debugEntries, isDebug,
+                                     userInQueueServiceFactory=None):
         targetUrl = KnownUser.__generateTargetUrl(targetUrl, httpContextProvider)
 
         if (isDebug):
@@ -169,7 +191,7 @@ class KnownUser:
                 "cancelConfig.queueDomain can not be none or empty.")
 
         userInQueueService = KnownUser.__getUserInQueueService(
-            httpContextProvider)
+            httpContextProvider, userInQueueServiceFactory)
         result = userInQueueService.validateCancelRequest(
             targetUrl, cancelConfig, customerId, secretKey)
         result.isAjaxResult = KnownUser.__isQueueAjaxCall(httpContextProvider)
@@ -179,7 +201,8 @@ class KnownUser:
     @staticmethod
     def __handleQueueAction(currentUrlWithoutQueueITToken, queueitToken,
                             customerIntegration, customerId, secretKey,
-                            matchedConfig, httpContextProvider, debugEntries, isDebug):
+                            matchedConfig, httpContextProvider, debugEntries, isDebug,
+                            userInQueueServiceFactory=None):
         queueConfig = QueueEventConfig()
         queueConfig.eventId = matchedConfig["EventId"]
         queueConfig.queueDomain = matchedConfig["QueueDomain"]
@@ -205,12 +228,14 @@ class KnownUser:
 
         return KnownUser.__resolveQueueRequestByLocalConfig(
             targetUrl, queueitToken, queueConfig, customerId, secretKey,
-            httpContextProvider, debugEntries, isDebug)
+            httpContextProvider, debugEntries, isDebug,
+            userInQueueServiceFactory)
 
     @staticmethod
     def __handleCancelAction(currentUrlWithoutQueueITToken, queueitToken,
                              customerIntegration, customerId, secretKey,
-                             matchedConfig, httpContextProvider, debugEntries, isDebug):
+                             matchedConfig, httpContextProvider, debugEntries, isDebug,
+                             userInQueueServiceFactory=None):
         cancelConfig = CancelEventConfig()
         cancelConfig.eventId = matchedConfig["EventId"]
         cancelConfig.queueDomain = matchedConfig["QueueDomain"]
@@ -220,11 +245,20 @@ class KnownUser:
 
         return KnownUser.__cancelRequestByLocalConfig(
             currentUrlWithoutQueueITToken, queueitToken, cancelConfig,
-            customerId, secretKey, httpContextProvider, debugEntries, isDebug)
+            customerId, secretKey, httpContextProvider, debugEntries, isDebug,
+            userInQueueServiceFactory)
 
     @staticmethod
     def extendQueueCookie(eventId, cookieValidityMinute, cookieDomain,
                           secretKey, httpContextProvider):
+        KnownUser._extendQueueCookie(eventId, cookieValidityMinute,
+                                     cookieDomain, secretKey,
+                                     httpContextProvider, None)
+
+    @staticmethod
+    def _extendQueueCookie(eventId, cookieValidityMinute, cookieDomain,
+                           secretKey, httpContextProvider,
+                           userInQueueServiceFactory):
         if (Utils.isNilOrEmpty(eventId)):
             raise KnownUserError("eventId can not be none or empty.")
 
@@ -237,7 +271,7 @@ class KnownUser:
                 "cookieValidityMinute should be integer greater than 0.")
 
         userInQueueService = KnownUser.__getUserInQueueService(
-            httpContextProvider)
+            httpContextProvider, userInQueueServiceFactory)
         userInQueueService.extendQueueCookie(eventId, cookieValidityMinute,
                                              cookieDomain, secretKey)
 
@@ -245,8 +279,18 @@ class KnownUser:
     def resolveQueueRequestByLocalConfig(targetUrl, queueitToken, queueConfig,
                                          customerId, secretKey,
                                          httpContextProvider):
+        return KnownUser._resolveQueueRequestByLocalConfig(
+            targetUrl, queueitToken, queueConfig, customerId, secretKey,
+            httpContextProvider, None)
+
+    @staticmethod
+    def _resolveQueueRequestByLocalConfig(targetUrl, queueitToken, queueConfig,
+                                          customerId, secretKey,
+                                          httpContextProvider,
+                                          userInQueueServiceFactory):
         debugEntries = {}
-        connectorDiagnostics = ConnectorDiagnostics.verify(customerId, secretKey, queueitToken)
+        connectorDiagnostics = KnownUser.__verifyConnectorDiagnostics(
+            customerId, secretKey, queueitToken)
         if (connectorDiagnostics.hasError):
             return connectorDiagnostics.validationResult
         try:
@@ -254,10 +298,11 @@ class KnownUser:
                                                       httpContextProvider)
             return KnownUser.__resolveQueueRequestByLocalConfig(
                 targetUrl, queueitToken, queueConfig, customerId, secretKey,
-                httpContextProvider, debugEntries, connectorDiagnostics.isEnabled)
+                httpContextProvider, debugEntries, connectorDiagnostics.isEnabled,
+                userInQueueServiceFactory)
         except Exception as e:
             if (connectorDiagnostics.isEnabled):
-                debugEntries["Exception"] = e.message
+                debugEntries["Exception"] = str(e)
             raise e
         finally:
             KnownUser.__setDebugCookie(debugEntries, httpContextProvider)
@@ -267,10 +312,21 @@ class KnownUser:
             currentUrlWithoutQueueITToken, queueitToken,
             integrationsConfigString, customerId, secretKey,
             httpContextProvider):
+        return KnownUser._validateRequestByIntegrationConfig(
+            currentUrlWithoutQueueITToken, queueitToken,
+            integrationsConfigString, None, customerId, secretKey,
+            httpContextProvider, None)
+
+    @staticmethod
+    def _validateRequestByIntegrationConfig(
+            currentUrlWithoutQueueITToken, queueitToken,
+            integrationsConfigString, compiledConfig, customerId, secretKey,
+            httpContextProvider, userInQueueServiceFactory):
 
         debugEntries = {}
         customerIntegration = None
-        connectorDiagnostics = ConnectorDiagnostics.verify(customerId, secretKey, queueitToken)
+        connectorDiagnostics = KnownUser.__verifyConnectorDiagnostics(
+            customerId, secretKey, queueitToken)
         if (connectorDiagnostics.hasError):
             return connectorDiagnostics.validationResult
         try:
@@ -283,7 +339,11 @@ class KnownUser:
                 debugEntries["OriginalUrl"] = httpContextProvider.getOriginalRequestUrl()
                 KnownUser.__logMoreRequestDetails(debugEntries, httpContextProvider)
 
-            customerIntegration = json.loads(integrationsConfigString)
+            if (compiledConfig is None):
+                import json
+                customerIntegration = json.loads(integrationsConfigString)
+            else:
+                customerIntegration = compiledConfig.customerIntegration
             if (connectorDiagnostics.isEnabled):
                 debugEntries["ConfigVersion"] = customerIntegration["Version"] if customerIntegration and \
                                                                               customerIntegration["Version"] else "NULL"
@@ -294,9 +354,13 @@ class KnownUser:
             if (not customerIntegration or not customerIntegration["Version"]):
                 raise KnownUserError(
                     "integrationsConfigString can not be none or empty.")
-            matchedConfig = IntegrationEvaluator().getMatchedIntegrationConfig(
-                customerIntegration, currentUrlWithoutQueueITToken,
-                httpContextProvider)
+            if (compiledConfig is None):
+                matchedConfig = IntegrationEvaluator().getMatchedIntegrationConfig(
+                    customerIntegration, currentUrlWithoutQueueITToken,
+                    httpContextProvider)
+            else:
+                matchedConfig = compiledConfig.getMatchedIntegrationConfig(
+                    currentUrlWithoutQueueITToken, httpContextProvider)
 
             if (connectorDiagnostics.isEnabled):
                 if (matchedConfig == None):
@@ -311,22 +375,24 @@ class KnownUser:
                 return KnownUser.__handleQueueAction(
                     currentUrlWithoutQueueITToken, queueitToken,
                     customerIntegration, customerId, secretKey, matchedConfig,
-                    httpContextProvider, debugEntries, connectorDiagnostics.isEnabled)
+                    httpContextProvider, debugEntries, connectorDiagnostics.isEnabled,
+                    userInQueueServiceFactory)
             elif (matchedConfig["ActionType"] == ActionTypes.CANCEL):
                 return KnownUser.__handleCancelAction(
                     currentUrlWithoutQueueITToken, queueitToken,
                     customerIntegration, customerId, secretKey, matchedConfig,
-                    httpContextProvider, debugEntries, connectorDiagnostics.isEnabled)
+                    httpContextProvider, debugEntries, connectorDiagnostics.isEnabled,
+                    userInQueueServiceFactory)
             else:  # for all unknown types default to 'Ignore'
                 userInQueueService = KnownUser.__getUserInQueueService(
-                    httpContextProvider) 
+                    httpContextProvider, userInQueueServiceFactory)
                 result = userInQueueService.getIgnoreActionResult(matchedConfig['Name'])
                 result.isAjaxResult = KnownUser.__isQueueAjaxCall(
                     httpContextProvider)
                 return result
         except Exception as e:
             if (connectorDiagnostics.isEnabled):
-                debugEntries["Exception"] = e.message
+                debugEntries["Exception"] = str(e)
             raise e
         finally:
             KnownUser.__setDebugCookie(debugEntries, httpContextProvider)
@@ -335,17 +401,27 @@ class KnownUser:
     @staticmethod
     def cancelRequestByLocalConfig(targetUrl, queueitToken, cancelConfig,
                                    customerId, secretKey, httpContextProvider):
+        return KnownUser._cancelRequestByLocalConfig(
+            targetUrl, queueitToken, cancelConfig, customerId, secretKey,
+            httpContextProvider, None)
+
+    @staticmethod
+    def _cancelRequestByLocalConfig(targetUrl, queueitToken, cancelConfig,
+                                    customerId, secretKey, httpContextProvider,
+                                    userInQueueServiceFactory):
         debugEntries = {}
-        connectorDiagnostics = ConnectorDiagnostics.verify(customerId, secretKey, queueitToken)
+        connectorDiagnostics = KnownUser.__verifyConnectorDiagnostics(
+            customerId, secretKey, queueitToken)
         if (connectorDiagnostics.hasError):
             return connectorDiagnostics.validationResult
         try:
             return KnownUser.__cancelRequestByLocalConfig(
                 targetUrl, queueitToken, cancelConfig, customerId, secretKey,
-                httpContextProvider, debugEntries, connectorDiagnostics.isEnabled)
+                httpContextProvider, debugEntries, connectorDiagnostics.isEnabled,
+                userInQueueServiceFactory)
         except Exception as e:
             if (connectorDiagnostics.isEnabled):
-                debugEntries["Exception"] = e.message
+                debugEntries["Exception"] = str(e)
             raise e
         finally:
             KnownUser.__setDebugCookie(debugEntries, httpContextProvider)
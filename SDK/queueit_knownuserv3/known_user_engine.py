@@ -0,0 +1,142 @@
+from .known_user import KnownUser
+from .compiled_integration_config import CompiledIntegrationConfig
+from .consolidated_state_cookie_repository import ConsolidatedStateCookieRepository
+from .lru_cache import LruCache
+from .models import KnownUserError, RequestValidationResult, Utils
+from .queueit_helpers import QueueitHelpers
+from .user_in_queue_service import UserInQueueService
+from .user_in_queue_state_cookie_repository import UserInQueueStateCookieRepository
+from .validated_token_cache import ValidatedTokenCache
+
+
+class KnownUserEngine:
+    def __init__(self, customerId, secretKey, integrationsConfigString=None,
+                 bypassRules=None, validatedTokenCache=None,
+                 cacheBudget=None, cacheOwner=None, useCompactCookie=False,
+                 useConsolidatedCookie=False, strictConfig=False,
+                 adaptiveTriggerOrdering=False, useUrlDecisionTable=False,
+                 optimizeConfig=False, requestCapture=None):
+        self.customerId = customerId
+        self.secretKey = secretKey
+        self.bypassRules = bypassRules
+        self.cacheBudget = cacheBudget
+        self.cacheOwner = cacheOwner
+        self.useCompactCookie = useCompactCookie
+        self.strictConfig = strictConfig
+        self.adaptiveTriggerOrdering = adaptiveTriggerOrdering
+        self.useUrlDecisionTable = useUrlDecisionTable
+        self.optimizeConfig = optimizeConfig
+        self.requestCapture = requestCapture
+        self.verifiedCookieCache = None
+        if (useConsolidatedCookie):
+            self.verifiedCookieCache = LruCache(
+                ConsolidatedStateCookieRepository.VERIFIED_COOKIE_CACHE_SIZE,
+                cacheBudget, cacheOwner)
+        if (validatedTokenCache is None):
+            validatedTokenCache = ValidatedTokenCache(
+                cacheBudget=cacheBudget, cacheOwner=cacheOwner)
+        self.validatedTokenCache = validatedTokenCache
+        self.compiledConfig = None
+        if (integrationsConfigString is not None):
+            self.updateIntegrationConfig(integrationsConfigString)
+
+    def updateIntegrationConfig(self, integrationsConfigString):
+        self.__setCompiledConfig(CompiledIntegrationConfig.compile(
+            integrationsConfigString, None, self.cacheBudget, self.cacheOwner,
+            self.strictConfig, self.adaptiveTriggerOrdering,
+            self.useUrlDecisionTable, self.optimizeConfig))
+
+    def loadIntegrationConfigFile(self, configPath):
+        from .compiled_config_cache import CompiledConfigCache
+        self.__setCompiledConfig(CompiledConfigCache.loadOrCompile(
+            configPath, self.secretKey, self.strictConfig, None,
+            self.cacheBudget, self.cacheOwner, self.adaptiveTriggerOrdering,
+            self.useUrlDecisionTable, self.optimizeConfig))
+
+    def __setCompiledConfig(self, compiledConfig):
+        previousConfig = self.compiledConfig
+        self.compiledConfig = compiledConfig
+        if (previousConfig is not None):
+            previousConfig.clearCaches()
+
+    def clearCaches(self):
+        self.validatedTokenCache.clear()
+        if (self.verifiedCookieCache is not None):
+            self.verifiedCookieCache.clear()
+        if (self.compiledConfig is not None):
+            self.compiledConfig.clearCaches()
+
+    def createStateCookieRepository(self, httpContextProvider):
+        if (self.verifiedCookieCache is not None):
+            return ConsolidatedStateCookieRepository(
+                httpContextProvider, None, self.verifiedCookieCache,
+                self.useCompactCookie)
+        return UserInQueueStateCookieRepository(httpContextProvider,
+                                                self.useCompactCookie)
+
+    def createUserInQueueService(self, httpContextProvider):
+        return UserInQueueService(
+            httpContextProvider,
+            self.createStateCookieRepository(httpContextProvider),
+            self.validatedTokenCache)
+
+    def isBypassed(self, url, httpContextProvider):
+        if (self.bypassRules is None or Utils.isNilOrEmpty(url)):
+            return False
+
+        method = None
+        if (self.bypassRules.usesMethod()):
+            method = httpContextProvider.getRequestMethod()
+
+        return self.bypassRules.isBypassed(
+            QueueitHelpers.urlSplit(url).path, method)
+
+    def validateRequestByIntegrationConfig(self, currentUrlWithoutQueueITToken,
+                                           queueitToken, httpContextProvider):
+        if (self.isBypassed(currentUrlWithoutQueueITToken,
+                            httpContextProvider)):
+            return RequestValidationResult(None, None, None, None, None, None)
+
+        if (self.compiledConfig is None):
+            raise KnownUserError(
+                "integrationsConfigString can not be none or empty.")
+
+        requestCapture = self.requestCapture
+        if (requestCapture is not None and requestCapture.isSampled()):
+            return requestCapture.capture(
+                self.__validateRequestByIntegrationConfig,
+                currentUrlWithoutQueueITToken, queueitToken,
+                httpContextProvider)
+        return self.__validateRequestByIntegrationConfig(
+            currentUrlWithoutQueueITToken, queueitToken, httpContextProvider)
+
+    def __validateRequestByIntegrationConfig(self,
+                                             currentUrlWithoutQueueITToken,
+                                             queueitToken,
+                                             httpContextProvider):
+        return KnownUser._validateRequestByIntegrationConfig(
+            currentUrlWithoutQueueITToken, queueitToken, None,
+            self.compiledConfig, self.customerId, self.secretKey,
+            httpContextProvider, self.createUserInQueueService)
+
+    def resolveQueueRequestByLocalConfig(self, targetUrl, queueitToken,
+                                         queueConfig, httpContextProvider):
+        if (self.isBypassed(targetUrl, httpContextProvider)):
+            return RequestValidationResult(None, None, None, None, None, None)
+
+        return KnownUser._resolveQueueRequestByLocalConfig(
+            targetUrl, queueitToken, queueConfig, self.customerId,
+            self.secretKey, httpContextProvider, self.createUserInQueueService)
+
+    def cancelRequestByLocalConfig(self, targetUrl, queueitToken, cancelConfig,
+                                   httpContextProvider):
+        return KnownUser._cancelRequestByLocalConfig(
+            targetUrl, queueitToken, cancelConfig, self.customerId,
+            self.secretKey, httpContextProvider, self.createUserInQueueService)
+
+    def extendQueueCookie(self, eventId, cookieValidityMinute, cookieDomain,
+                          httpContextProvider):
+        KnownUser._extendQueueCookie(eventId, cookieValidityMinute,
+                                     cookieDomain, self.secretKey,
+                                     httpContextProvider,
+                                     self.createUserInQueueService)
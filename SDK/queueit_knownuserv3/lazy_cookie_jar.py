@@ -0,0 +1,52 @@
+from .queueit_helpers import QueueitHelpers
+
+COOKIE_WHITESPACE = " \t"
+
+
+class LazyCookieJar:
+    def __init__(self, cookieHeader):
+        self.cookieHeader = cookieHeader or ""
+        self.__rawValues = {}
+        self.__values = {}
+
+    def __find(self, name):
+        cookieHeader = self.cookieHeader
+        index = cookieHeader.find(name)
+        while (index >= 0):
+            start = index
+            while (start > 0 and cookieHeader[start - 1] in COOKIE_WHITESPACE):
+                start -= 1
+            end = index + len(name)
+            while (end < len(cookieHeader)
+                   and cookieHeader[end] in COOKIE_WHITESPACE):
+                end += 1
+            # The name must be a whole cookie name: at the start of the header
+            # or after a ';', and followed by '='.
+            if ((start == 0 or cookieHeader[start - 1] == ";")
+                    and cookieHeader.startswith("=", end)):
+                valueEnd = cookieHeader.find(";", end)
+                if (valueEnd < 0):
+                    valueEnd = len(cookieHeader)
+                return cookieHeader[end + 1:valueEnd].strip()
+            index = cookieHeader.find(name, index + 1)
+        return None
+
+    def getRaw(self, name):
+        rawValues = self.__rawValues
+        if (name in rawValues):
+            return rawValues[name]
+        value = None
+        if (name):
+            value = self.__find(name)
+        rawValues[name] = value
+        return value
+
+    def get(self, name):
+        values = self.__values
+        if (name in values):
+            return values[name]
+        value = self.getRaw(name)
+        if (value is not None):
+            value = QueueitHelpers.urlDecode(value)
+        values[name] = value
+        return value
@@ -0,0 +1,164 @@
+import hashlib
+import hmac
+import ipaddress
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+
+from .models import KnownUserError
+from .queue_url_params import QueueUrlParams
+from .queueit_helpers import QueueitHelpers
+
+
+class LocalTokenIssuer:
+    def __init__(self, secretKey, validitySeconds=180,
+                 cookieValidityMinutes=None, extendableCookie=True,
+                 redirectType="queue"):
+        if (isinstance(secretKey, str)):
+            secretKey = secretKey.encode("utf-8")
+        self.validitySeconds = validitySeconds
+        self.cookieValidityMinutes = cookieValidityMinutes
+        self.extendableCookie = extendableCookie
+        self.redirectType = redirectType
+        self.issuedCount = 0
+        # Copying a keyed HMAC skips hashing the key again for each token.
+        self.__hmac = hmac.new(secretKey, digestmod=hashlib.sha256)
+
+    def createToken(self, eventId, queueId=None, timeStamp=None):
+        if (queueId is None):
+            queueId = str(uuid.uuid4())
+        if (timeStamp is None):
+            timeStamp = QueueitHelpers.getCurrentTime() + self.validitySeconds
+        parameters = [
+            (QueueUrlParams.EVENT_ID_KEY, eventId),
+            (QueueUrlParams.QUEUE_ID_KEY, queueId),
+            (QueueUrlParams.TIMESTAMP_KEY, str(timeStamp)),
+            (QueueUrlParams.EXTENDABLE_COOKIE_KEY,
+             "true" if self.extendableCookie else "false")
+        ]
+        if (self.cookieValidityMinutes is not None):
+            parameters.append((QueueUrlParams.COOKIE_VALIDITY_MINUTES_KEY,
+                               str(self.cookieValidityMinutes)))
+        if (self.redirectType is not None):
+            parameters.append((QueueUrlParams.REDIRECT_TYPE_KEY,
+                               self.redirectType))
+        tokenWithoutHash = QueueUrlParams.KEY_VALUE_SEPARATOR_GROUP_CHAR.join(
+            key + QueueUrlParams.KEY_VALUE_SEPARATOR_CHAR + value
+            for key, value in parameters)
+
+        tokenHmac = self.__hmac.copy()
+        tokenHmac.update(tokenWithoutHash.encode("utf-8"))
+        self.issuedCount += 1
+        return (tokenWithoutHash + QueueUrlParams.KEY_VALUE_SEPARATOR_GROUP_CHAR +
+                QueueUrlParams.HASH_KEY + QueueUrlParams.KEY_VALUE_SEPARATOR_CHAR +
+                tokenHmac.hexdigest())
+
+    def createTokens(self, eventId, count):
+        # All tokens of one batch share the expiry time.
+        timeStamp = QueueitHelpers.getCurrentTime() + self.validitySeconds
+        for _ in range(count):
+            yield self.createToken(eventId, None, timeStamp)
+
+    @staticmethod
+    def addToken(targetUrl, queueitToken):
+        fragmentStart = targetUrl.find("#")
+        fragment = ""
+        if (fragmentStart >= 0):
+            targetUrl, fragment = targetUrl[:fragmentStart], \
+                targetUrl[fragmentStart:]
+        separator = "&" if "?" in targetUrl else "?"
+        return (targetUrl + separator + "queueittoken=" +
+                QueueitHelpers.urlEncode(queueitToken) + fragment)
+
+
+class LocalQueueRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        eventId = query.get("e", [None])[0]
+        targetUrl = query.get("t", [None])[0]
+        if (not eventId or not targetUrl
+                or not self.server.isTargetAllowed(targetUrl)):
+            self.__respond(400, None)
+            return
+        queueitToken = self.server.tokenIssuer.createToken(eventId)
+        self.__respond(302, LocalTokenIssuer.addToken(targetUrl, queueitToken))
+
+    def __respond(self, status, location):
+        self.send_response(status)
+        if (location is not None):
+            self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.send_header("Cache-Control", "no-cache, no-store")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalQueueServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, tokenIssuer, host="127.0.0.1", port=0,
+                 allowRemote=False, targetHosts=None):
+        # Any client can get a valid token and a redirect to any target, so
+        # the server only listens on loopback unless told otherwise.
+        if (not allowRemote and not LocalQueueServer.isLoopbackHost(host)):
+            raise KnownUserError(
+                "The local queue only listens on a loopback address unless "
+                "allowRemote is set.")
+        HTTPServer.__init__(self, (host, port), LocalQueueRequestHandler)
+        self.tokenIssuer = tokenIssuer
+        self.targetHosts = None
+        if (targetHosts is not None):
+            self.targetHosts = frozenset(
+                targetHost.lower() for targetHost in targetHosts)
+        self.__thread = None
+
+    @staticmethod
+    def isLoopbackHost(host):
+        if (host == "localhost"):
+            return True
+        try:
+            return ipaddress.ip_address(host).is_loopback
+        except ValueError:
+            return False
+
+    def isTargetAllowed(self, targetUrl):
+        try:
+            targetUrl = urlsplit(targetUrl)
+        except ValueError:
+            return False
+        if (targetUrl.scheme not in ("http", "https")):
+            return False
+        return (self.targetHosts is None
+                or (targetUrl.hostname or "") in self.targetHosts)
+
+    def getQueueDomain(self):
+        host, port = self.server_address[:2]
+        return "{}:{}".format(host, port)
+
+    @staticmethod
+    def getLocalUrl(redirectUrl):
+        # The SDK always redirects to https, the stand-in only serves http.
+        if (redirectUrl.startswith("https://")):
+            return "http://" + redirectUrl[len("https://"):]
+        return redirectUrl
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.serve_forever,
+                                         name="queueit-local-queue")
+        self.__thread.daemon = True
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if (self.__thread is not None):
+            self.__thread.join()
+            self.__thread = None
@@ -0,0 +1,185 @@
+import threading
+import weakref
+
+VALUE_INDEX = 0
+REFERENCED_INDEX = 1
+
+
+class LruCache:
+    def __init__(self, maxSize, cacheBudget=None, cacheOwner=None):
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self.__entries = {}
+        self.__lock = threading.Lock()
+        self.cacheBudget = cacheBudget
+        self.cacheOwner = cacheOwner
+        if (cacheBudget is not None):
+            cacheBudget.register(cacheOwner, self)
+            weakref.finalize(self, CacheBudget.releaseEntries, cacheBudget,
+                             cacheOwner, self.__entries)
+
+    def get(self, key, default=None):
+        entry = self.__entries.get(key)
+        if (entry is None):
+            self.misses += 1
+            return default
+
+        entry[REFERENCED_INDEX] = True
+        self.hits += 1
+        return entry[VALUE_INDEX]
+
+    def put(self, key, value):
+        entry = self.__entries.get(key)
+        if (entry is not None):
+            entry[VALUE_INDEX] = value
+            entry[REFERENCED_INDEX] = True
+            return
+
+        if (self.cacheBudget is not None):
+            self.cacheBudget.admit(self.cacheOwner)
+        with self.__lock:
+            isAdded = key not in self.__entries
+            self.__entries[key] = [value, False]
+            evictedCount = 0
+            while (len(self.__entries) > self.maxSize):
+                if (self.__evictOldest()):
+                    evictedCount += 1
+        if (not isAdded):
+            evictedCount += 1
+        self.__release(evictedCount)
+
+    def evictOldest(self):
+        with self.__lock:
+            isEvicted = self.__evictOldest()
+        if (isEvicted):
+            self.__release(1)
+        return isEvicted
+
+    def clear(self):
+        with self.__lock:
+            count = len(self.__entries)
+            self.__entries.clear()
+            self.hits = 0
+            self.misses = 0
+        self.__release(count)
+
+    def __evictOldest(self):
+        while (len(self.__entries) > 0):
+            key = next(iter(self.__entries))
+            entry = self.__entries.pop(key)
+            if (not entry[REFERENCED_INDEX]):
+                return True
+            entry[REFERENCED_INDEX] = False
+            self.__entries[key] = entry
+        return False
+
+    def __release(self, count):
+        if (self.cacheBudget is not None and count > 0):
+            self.cacheBudget.release(self.cacheOwner, count)
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, key):
+        return key in self.__entries
+
+
+class CacheOwnerUsage:
+    __slots__ = ("caches", "usage", "evictions", "lock")
+
+    def __init__(self):
+        self.caches = weakref.WeakSet()
+        self.usage = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def add(self, count):
+        with self.lock:
+            self.usage += count
+
+
+class CacheBudget:
+    def __init__(self, maxEntries):
+        self.maxEntries = maxEntries
+        # Each owner counts its own entries under its own lock, so inserts of
+        # different owners never wait for each other. The map is replaced,
+        # never changed, so it can be read without a lock.
+        self.__owners = {}
+        self.__lock = threading.Lock()
+
+    @property
+    def totalUsage(self):
+        # Exact when no insert is in progress. Concurrent inserts of different
+        # owners can each pass the check in admit, so the total can exceed
+        # maxEntries by at most one entry per inserting thread until the next
+        # insert evicts again.
+        return sum(ownerUsage.usage for ownerUsage in self.__owners.values())
+
+    @property
+    def evictions(self):
+        return sum(ownerUsage.evictions
+                   for ownerUsage in self.__owners.values())
+
+    def register(self, cacheOwner, cache):
+        with self.__lock:
+            ownerUsage = self.__owners.get(cacheOwner)
+            if (ownerUsage is None):
+                ownerUsage = CacheOwnerUsage()
+                owners = dict(self.__owners)
+                owners[cacheOwner] = ownerUsage
+                self.__owners = owners
+            caches = weakref.WeakSet(ownerUsage.caches)
+            caches.add(cache)
+            ownerUsage.caches = caches
+
+    def unregisterOwner(self, cacheOwner):
+        with self.__lock:
+            ownerUsage = self.__owners.get(cacheOwner)
+            if (ownerUsage is None):
+                return
+            owners = dict(self.__owners)
+            del owners[cacheOwner]
+            self.__owners = owners
+        for cache in list(ownerUsage.caches):
+            cache.clear()
+
+    def getUsage(self, cacheOwner):
+        ownerUsage = self.__owners.get(cacheOwner)
+        if (ownerUsage is None):
+            return 0
+        return ownerUsage.usage
+
+    def getFairShare(self):
+        return self.maxEntries / max(1, len(self.__owners))
+
+    def admit(self, cacheOwner):
+        ownerUsage = self.__owners.get(cacheOwner)
+        if (ownerUsage is None):
+            return
+        while (self.totalUsage >= self.maxEntries):
+            victimUsage = ownerUsage
+            if (ownerUsage.usage < self.getFairShare()):
+                victimUsage = max(self.__owners.values(),
+                                  key=lambda usage: usage.usage)
+            if (not CacheBudget.__evictFrom(victimUsage)):
+                break
+        ownerUsage.add(1)
+
+    @staticmethod
+    def releaseEntries(cacheBudget, cacheOwner, entries):
+        cacheBudget.release(cacheOwner, len(entries))
+
+    def release(self, cacheOwner, count):
+        ownerUsage = self.__owners.get(cacheOwner)
+        if (ownerUsage is not None):
+            ownerUsage.add(-count)
+
+    @staticmethod
+    def __evictFrom(ownerUsage):
+        for cache in sorted(list(ownerUsage.caches), key=len, reverse=True):
+            if (cache.evictOldest()):
+                with ownerUsage.lock:
+                    ownerUsage.evictions += 1
+                return True
+        return False
@@ -83,7 +83,9 @@ class RequestValidationResult:
 
 
 class KnownUserError(Exception):
-    pass
+    def __init__(self, message):
+        super(KnownUserError, self).__init__(message)
+        self.message = message
 
 
 class ActionTypes:
@@ -0,0 +1,157 @@
+import threading
+
+from .known_user_engine import KnownUserEngine
+from .lru_cache import CacheBudget
+from .models import KnownUserError, Utils
+from .queueit_helpers import QueueitHelpers
+
+
+class MultiTenantKnownUserEngine:
+    MAX_CACHE_ENTRIES = 65536
+
+    def __init__(self, maxCacheEntries=None):
+        if (maxCacheEntries is None):
+            maxCacheEntries = MultiTenantKnownUserEngine.MAX_CACHE_ENTRIES
+        self.cacheBudget = CacheBudget(maxCacheEntries)
+        # The tenants and the host mappings are replaced together with a
+        # single assignment, so a request never sees one without the other.
+        self.__routes = ({}, {})
+        self.__writeLock = threading.RLock()
+
+    def addTenant(self, tenantId, customerId, secretKey,
+                  integrationsConfigString=None, hosts=None, bypassRules=None,
+                  useCompactCookie=False, useConsolidatedCookie=False,
+                  **engineOptions):
+        # engineOptions are passed on to KnownUserEngine, e.g. strictConfig,
+        # optimizeConfig or requestCapture.
+        with self.__writeLock:
+            return self.__addTenant(tenantId, customerId, secretKey,
+                                    integrationsConfigString, hosts,
+                                    bypassRules, useCompactCookie,
+                                    useConsolidatedCookie, engineOptions)
+
+    def __addTenant(self, tenantId, customerId, secretKey,
+                    integrationsConfigString, hosts, bypassRules,
+                    useCompactCookie, useConsolidatedCookie, engineOptions):
+        if (Utils.isNilOrEmpty(tenantId)):
+            raise KnownUserError("tenantId can not be none or empty.")
+        if (Utils.isNilOrEmpty(customerId)):
+            raise KnownUserError("customerId can not be none or empty.")
+        if (Utils.isNilOrEmpty(secretKey)):
+            raise KnownUserError("secretKey can not be none or empty.")
+
+        tenants, tenantIdsByHost = self.__routes
+        hosts = [host.lower() for host in (hosts or [])]
+        for host in hosts:
+            ownerTenantId = tenantIdsByHost.get(host)
+            if (ownerTenantId is not None and ownerTenantId != tenantId):
+                raise KnownUserError("host '" + host +
+                                     "' is already mapped to tenant '" +
+                                     ownerTenantId + "'.")
+
+        # The current engine keeps serving the tenant until the new one is
+        # built, and stays in place when the new config can not be compiled.
+        try:
+            engine = KnownUserEngine(
+                customerId, secretKey, integrationsConfigString, bypassRules,
+                cacheBudget=self.cacheBudget, cacheOwner=tenantId,
+                useCompactCookie=useCompactCookie,
+                useConsolidatedCookie=useConsolidatedCookie, **engineOptions)
+        except Exception:
+            if (tenantId not in tenants):
+                self.cacheBudget.unregisterOwner(tenantId)
+            raise
+
+        previousEngine = tenants.get(tenantId)
+        tenants = dict(tenants)
+        tenants[tenantId] = engine
+        tenantIdsByHost = dict(
+            (host, ownerTenantId)
+            for host, ownerTenantId in tenantIdsByHost.items()
+            if ownerTenantId != tenantId)
+        for host in hosts:
+            tenantIdsByHost[host] = tenantId
+        self.__routes = (tenants, tenantIdsByHost)
+        if (previousEngine is not None):
+            # Gives the budget share of the old caches back to the tenant.
+            previousEngine.clearCaches()
+        return engine
+
+    def removeTenant(self, tenantId):
+        with self.__writeLock:
+            return self.__removeTenant(tenantId)
+
+    def __removeTenant(self, tenantId):
+        tenants, tenantIdsByHost = self.__routes
+        if (tenantId not in tenants):
+            return False
+
+        tenants = dict(tenants)
+        del tenants[tenantId]
+        tenantIdsByHost = dict(
+            (host, ownerTenantId)
+            for host, ownerTenantId in tenantIdsByHost.items()
+            if ownerTenantId != tenantId)
+        self.__routes = (tenants, tenantIdsByHost)
+        self.cacheBudget.unregisterOwner(tenantId)
+        return True
+
+    def getTenantIds(self):
+        return list(self.__routes[0].keys())
+
+    def getTenant(self, tenantId):
+        return self.__routes[0].get(tenantId)
+
+    def getTenantByHost(self, host):
+        if (Utils.isNilOrEmpty(host)):
+            return None
+        tenants, tenantIdsByHost = self.__routes
+        tenantId = tenantIdsByHost.get(host.lower())
+        if (tenantId is None):
+            return None
+        return tenants.get(tenantId)
+
+    def resolveTenant(self, url, tenantId=None):
+        if (tenantId is not None):
+            engine = self.getTenant(tenantId)
+            if (engine is None):
+                raise KnownUserError("Unknown tenant '" + str(tenantId) + "'.")
+            return engine
+
+        host = None
+        if (not Utils.isNilOrEmpty(url)):
+            try:
+                host = QueueitHelpers.urlSplit(url).hostname
+            except ValueError:
+                # A malformed URL (e.g. an invalid port or IPv6 host) can not
+                # be mapped to a tenant.
+                host = None
+        engine = self.getTenantByHost(host)
+        if (engine is None):
+            raise KnownUserError("No tenant is mapped to host '" + str(host) +
+                                 "'.")
+        return engine
+
+    def updateIntegrationConfig(self, tenantId, integrationsConfigString):
+        self.resolveTenant(None, tenantId).updateIntegrationConfig(
+            integrationsConfigString)
+
+    def validateRequestByIntegrationConfig(self, currentUrlWithoutQueueITToken,
+                                           queueitToken, httpContextProvider,
+                                           tenantId=None):
+        engine = self.resolveTenant(currentUrlWithoutQueueITToken, tenantId)
+        return engine.validateRequestByIntegrationConfig(
+            currentUrlWithoutQueueITToken, queueitToken, httpContextProvider)
+
+    def resolveQueueRequestByLocalConfig(self, targetUrl, queueitToken,
+                                         queueConfig, httpContextProvider,
+                                         tenantId=None):
+        engine = self.resolveTenant(targetUrl, tenantId)
+        return engine.resolveQueueRequestByLocalConfig(
+            targetUrl, queueitToken, queueConfig, httpContextProvider)
+
+    def cancelRequestByLocalConfig(self, targetUrl, queueitToken, cancelConfig,
+                                   httpContextProvider, tenantId=None):
+        engine = self.resolveTenant(targetUrl, tenantId)
+        return engine.cancelRequestByLocalConfig(
+            targetUrl, queueitToken, cancelConfig, httpContextProvider)
@@ -1,39 +1,97 @@
+import binascii
 import hmac
 import hashlib
-import urllib
 import time
-from urllib.parse import urlparse
+from functools import lru_cache
+from urllib.parse import urlparse, urlsplit, unquote
 from datetime import datetime, timedelta
 
+URL_ENCODE_SAFE_CHARS = ("ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+                         "abcdefghijklmnopqrstuvwxyz"
+                         "0123456789_.-~")
+URL_ENCODE_TABLE = tuple(
+    chr(b) if chr(b) in URL_ENCODE_SAFE_CHARS else "%{:02X}".format(b)
+    for b in range(256))
+URL_ENCODE_ASCII_TABLE = URL_ENCODE_TABLE[:128]
+URL_CODEC_CACHE_SIZE = 1024
+BASE64_TO_URL_SAFE = bytes.maketrans(b"+/", b"-_")
+URL_SAFE_TO_BASE64 = bytes.maketrans(b"-_", b"+/")
+
+
+@lru_cache(maxsize=URL_CODEC_CACHE_SIZE)
+def _urlEncode(v):
+    if (not v.rstrip(URL_ENCODE_SAFE_CHARS)):
+        return v
+    if (max(v) < "\x80"):
+        return v.translate(URL_ENCODE_ASCII_TABLE)
+    return "".join(map(URL_ENCODE_TABLE.__getitem__, v.encode("utf-8")))
+
+
+@lru_cache(maxsize=URL_CODEC_CACHE_SIZE)
+def _urlDecode(v):
+    return unquote(v)
+
 
 class QueueitHelpers:
     @staticmethod
     def hmacSha256Encode(value, key):
+        if (isinstance(key, str)):
+            key = key.encode("utf-8")
+        if (isinstance(value, str)):
+            value = value.encode("utf-8")
         digest = hmac.new(key, msg=value, digestmod=hashlib.sha256).hexdigest()
         return digest
 
+    @staticmethod
+    def hmacSha256Base64UrlEncode(value, key, byteLength):
+        if (isinstance(key, str)):
+            key = key.encode("utf-8")
+        if (isinstance(value, str)):
+            value = value.encode("utf-8")
+        digest = hmac.new(key, msg=value, digestmod=hashlib.sha256).digest()
+        return QueueitHelpers.base64UrlEncode(digest[:byteLength])
+
+    @staticmethod
+    def base64UrlEncode(value):
+        return binascii.b2a_base64(value, newline=False).translate(
+            BASE64_TO_URL_SAFE).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def base64UrlDecode(value):
+        value = (value + "=" * (-len(value) % 4)).encode("ascii")
+        return binascii.a2b_base64(value.translate(URL_SAFE_TO_BASE64))
+
     @staticmethod
     def getCurrentTime():
         return int(time.time())
 
     @staticmethod
     def urlEncode(v):
-        return urllib.quote(v, safe='~')
+        return _urlEncode(v)
 
     @staticmethod
     def urlDecode(v):
-        return urllib.unquote(v)
+        return _urlDecode(v)
+
+    @staticmethod
+    def clearUrlCodecCache():
+        _urlEncode.cache_clear()
+        _urlDecode.cache_clear()
 
     @staticmethod
     def urlParse(url_string):
         return urlparse(url_string)
 
+    @staticmethod
+    def urlSplit(url_string):
+        return urlsplit(url_string)
+
     @staticmethod
     def getCookieExpirationDate():
         return datetime.utcnow() + timedelta(days=1)
 
     @staticmethod
-    def getCurrentTimeAsIso8601Str():        
+    def getCurrentTimeAsIso8601Str():
         return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
 
     @staticmethod
@@ -0,0 +1,392 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from .http_context_providers import HttpContextProvider
+from .models import KnownUserError
+from .queueit_helpers import QueueitHelpers
+from .request_inputs import RequestInputs
+
+CAPTURE_FORMAT_VERSION = 1
+
+
+class CapturingHttpContextProvider(HttpContextProvider):
+    def __init__(self, httpContextProvider):
+        self.httpContextProvider = httpContextProvider
+        self.cookies = {}
+        self.headers = {}
+        self.method = None
+        self.originalUrl = None
+
+    def getProviderName(self):
+        return self.httpContextProvider.getProviderName()
+
+    def setCookie(self, name, value, expire, domain):
+        self.httpContextProvider.setCookie(name, value, expire, domain)
+
+    def getCookie(self, name):
+        value = self.httpContextProvider.getCookie(name)
+        self.cookies[name] = value
+        return value
+
+    def getHeader(self, name):
+        value = self.httpContextProvider.getHeader(name)
+        if (name is not None):
+            self.headers[name.lower()] = value
+        return value
+
+    def getRequestIp(self):
+        return self.httpContextProvider.getRequestIp()
+
+    def getOriginalRequestUrl(self):
+        self.originalUrl = self.httpContextProvider.getOriginalRequestUrl()
+        return self.originalUrl
+
+    def getRequestMethod(self):
+        self.method = self.httpContextProvider.getRequestMethod()
+        return self.method
+
+
+class CapturedRequest(HttpContextProvider):
+    def __init__(self, record):
+        self.record = record
+        self.cookies = record.get("c") or {}
+        self.headers = record.get("h") or {}
+        self.setCookies = {}
+
+    def getProviderName(self):
+        return self.record.get("p") or "replay"
+
+    def setCookie(self, name, value, expire, domain):
+        self.setCookies[name] = value
+
+    def getCookie(self, name):
+        return self.cookies.get(name)
+
+    def getHeader(self, name):
+        if (name is None):
+            return None
+        return self.headers.get(name.lower())
+
+    def getRequestIp(self):
+        return None
+
+    def getOriginalRequestUrl(self):
+        return self.record.get("o")
+
+    def getRequestMethod(self):
+        return self.record.get("m")
+
+
+class RequestCaptureWriter:
+    BUFFER_SIZE = 10000
+    BATCH_SIZE = 500
+
+    def __init__(self, capturePath, maxBytes=64 * 1024 * 1024, backupCount=5,
+                 bufferSize=None):
+        self.capturePath = capturePath
+        self.maxBytes = maxBytes
+        self.backupCount = backupCount
+        self.writtenCount = 0
+        self.droppedCount = 0
+        self.error = None
+        self.__records = queue.Queue(bufferSize or
+                                     RequestCaptureWriter.BUFFER_SIZE)
+        self.__lock = threading.Lock()
+        self.__thread = None
+        self.__isClosed = False
+
+    def write(self, record):
+        # Called on the request path: a full buffer, a failed file or a closed
+        # capture drops the record instead of waiting or raising.
+        if (self.error is not None or self.__isClosed):
+            self.droppedCount += 1
+            return
+        if (self.__thread is None and not self.__start()):
+            self.droppedCount += 1
+            return
+        try:
+            self.__records.put_nowait(record)
+        except queue.Full:
+            self.droppedCount += 1
+
+    def __start(self):
+        with self.__lock:
+            if (self.__isClosed):
+                return False
+            if (self.__thread is not None):
+                return True
+            self.__thread = threading.Thread(
+                target=self.__run, name="queueit-request-capture")
+            self.__thread.daemon = True
+            self.__thread.start()
+            return True
+
+    def __run(self):
+        captureFile = None
+        try:
+            captureFile = open(self.capturePath, "ab")
+            size = captureFile.tell()
+            isClosing = False
+            while (not isClosing):
+                records = [self.__records.get()]
+                while (len(records) < RequestCaptureWriter.BATCH_SIZE
+                       and not self.__records.empty()):
+                    records.append(self.__records.get_nowait())
+                if (records[-1] is None):
+                    isClosing = True
+                    records.pop()
+                if (len(records) == 0):
+                    continue
+                lines = []
+                for record in records:
+                    line = (json.dumps(record, separators=(",", ":")) +
+                            "\n").encode("utf-8")
+                    if (size > 0 and size + len(line) > self.maxBytes):
+                        captureFile.write(b"".join(lines))
+                        captureFile.close()
+                        self.__rotate()
+                        captureFile = open(self.capturePath, "ab")
+                        lines = []
+                        size = 0
+                    lines.append(line)
+                    size += len(line)
+                captureFile.write(b"".join(lines))
+                captureFile.flush()
+                self.writtenCount += len(records)
+        except Exception as error:
+            # Later records are dropped by write() and the error is raised
+            # from close().
+            self.error = error
+        finally:
+            if (captureFile is not None):
+                captureFile.close()
+
+    def __rotate(self):
+        for index in range(self.backupCount - 1, 0, -1):
+            path = self.capturePath + "." + str(index)
+            if (os.path.exists(path)):
+                os.replace(path, self.capturePath + "." + str(index + 1))
+        if (self.backupCount > 0):
+            os.replace(self.capturePath, self.capturePath + ".1")
+        else:
+            os.remove(self.capturePath)
+
+    def close(self):
+        with self.__lock:
+            self.__isClosed = True
+            thread = self.__thread
+        if (thread is not None and thread.is_alive()):
+            self.__records.put(None)
+            thread.join()
+        if (self.error is not None):
+            raise KnownUserError("The request capture could not be written: " +
+                                 str(self.error))
+
+    @staticmethod
+    def getCaptureFiles(capturePath):
+        # The oldest rotated file has the highest number.
+        paths = []
+        index = 1
+        while (os.path.exists(capturePath + "." + str(index))):
+            paths.insert(0, capturePath + "." + str(index))
+            index += 1
+        if (os.path.exists(capturePath)):
+            paths.append(capturePath)
+        return paths
+
+    @staticmethod
+    def readRecords(capturePath):
+        for path in RequestCaptureWriter.getCaptureFiles(capturePath):
+            with open(path, "rb") as captureFile:
+                for line in captureFile:
+                    try:
+                        record = json.loads(line.decode("utf-8"))
+                    except ValueError:
+                        # The last line is cut short when the process stopped
+                        # during a write.
+                        continue
+                    if (isinstance(record, dict)
+                            and record.get("v") == CAPTURE_FORMAT_VERSION):
+                        yield record
+
+
+class RequestCapture:
+    def __init__(self, capturePath, sampleRate=1.0, maxBytes=64 * 1024 * 1024,
+                 backupCount=5, bufferSize=None):
+        if (not 0.0 <= sampleRate <= 1.0):
+            raise KnownUserError("sampleRate must be between 0 and 1.")
+        self.sampleRate = sampleRate
+        self.writer = RequestCaptureWriter(capturePath, maxBytes, backupCount,
+                                           bufferSize)
+        self.__random = random.Random()
+
+    def isSampled(self):
+        return self.sampleRate >= 1.0 or (
+            self.__random.random() < self.sampleRate)
+
+    def capture(self, validate, currentUrlWithoutQueueITToken, queueitToken,
+                httpContextProvider):
+        if (isinstance(httpContextProvider, RequestInputs)):
+            # Prefetched request inputs keep their fast path, so a sampled
+            # request is measured the same way as the others.
+            capturingProvider = httpContextProvider
+        else:
+            capturingProvider = CapturingHttpContextProvider(
+                httpContextProvider)
+        currentTime = QueueitHelpers.getCurrentTime()
+        start = time.perf_counter()
+        result = None
+        try:
+            result = validate(currentUrlWithoutQueueITToken, queueitToken,
+                              capturingProvider)
+            return result
+        finally:
+            latency = int((time.perf_counter() - start) * 1e6)
+            if (capturingProvider is httpContextProvider):
+                method = originalUrl = None
+            else:
+                method = capturingProvider.method
+                originalUrl = capturingProvider.originalUrl
+            self.writer.write({
+                "v": CAPTURE_FORMAT_VERSION,
+                "t": currentTime,
+                "l": latency,
+                "u": currentUrlWithoutQueueITToken,
+                "k": queueitToken,
+                "c": dict(capturingProvider.cookies),
+                "h": dict(capturingProvider.headers),
+                "m": method,
+                "o": originalUrl,
+                "p": httpContextProvider.getProviderName(),
+                "d": RequestCapture.getDecision(result)
+            })
+
+    @staticmethod
+    def getDecision(result):
+        if (result is None):
+            return None
+        return [result.actionType, result.eventId, result.queueId,
+                result.redirectUrl, result.redirectType, result.actionName,
+                result.isAjaxResult]
+
+    def close(self):
+        self.writer.close()
+
+
+class RecordedClock:
+    def __init__(self):
+        self.currentTime = 0
+        self.__originalMethods = None
+
+    def __enter__(self):
+        self.__originalMethods = (QueueitHelpers.getCurrentTime,
+                                  QueueitHelpers.getCookieExpirationDate,
+                                  QueueitHelpers.getCurrentTimeAsIso8601Str)
+        QueueitHelpers.getCurrentTime = staticmethod(lambda: self.currentTime)
+        QueueitHelpers.getCookieExpirationDate = staticmethod(
+            lambda: self.__getDateTime() + timedelta(days=1))
+        QueueitHelpers.getCurrentTimeAsIso8601Str = staticmethod(
+            lambda: self.__getDateTime().strftime("%Y-%m-%dT%H:%M:%SZ"))
+        return self
+
+    def __getDateTime(self):
+        return datetime.utcfromtimestamp(self.currentTime)
+
+    def __exit__(self, excType, excValue, traceback):
+        getCurrentTime, getCookieExpirationDate, getCurrentTimeAsIso8601Str = \
+            self.__originalMethods
+        QueueitHelpers.getCurrentTime = staticmethod(getCurrentTime)
+        QueueitHelpers.getCookieExpirationDate = staticmethod(
+            getCookieExpirationDate)
+        QueueitHelpers.getCurrentTimeAsIso8601Str = staticmethod(
+            getCurrentTimeAsIso8601Str)
+
+
+class ReplayReport:
+    def __init__(self):
+        self.requestCount = 0
+        self.errorCount = 0
+        self.mismatchCount = 0
+        self.mismatches = []
+        self.latencies = []
+        self.recordedLatencies = []
+        self.actionCounts = {}
+
+    def getLatencySummary(self, latencies):
+        if (len(latencies) == 0):
+            return 0.0, 0.0, 0.0
+        latencies = sorted(latencies)
+        return (float(sum(latencies)) / len(latencies),
+                latencies[len(latencies) // 2],
+                latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))])
+
+    def formatReport(self):
+        lines = ["Requests: {}, errors: {}, decision mismatches: {}".format(
+            self.requestCount, self.errorCount, self.mismatchCount)]
+        for actionType, count in sorted(self.actionCounts.items(),
+                                        key=lambda item: str(item[0])):
+            lines.append("  {:<12}{:>10}".format(str(actionType), count))
+        for label, latencies in (("replayed", self.latencies),
+                                 ("recorded", self.recordedLatencies)):
+            lines.append("Latency {} (us): mean {:.1f}, p50 {:.1f}, "
+                         "p99 {:.1f}".format(
+                             label, *self.getLatencySummary(latencies)))
+        for currentUrl, recordedDecision, decision in self.mismatches:
+            lines.append("  {}: recorded {} replayed {}".format(
+                currentUrl, recordedDecision, decision))
+        return "\n".join(lines)
+
+
+class RequestReplayer:
+    MAX_REPORTED_MISMATCHES = 10
+
+    def __init__(self, integrationsConfigString, customerId, secretKey,
+                 engine=None):
+        self.integrationsConfigString = integrationsConfigString
+        self.customerId = customerId
+        self.secretKey = secretKey
+        self.engine = engine
+
+    def __validate(self, record, capturedRequest):
+        if (self.engine is not None):
+            return self.engine.validateRequestByIntegrationConfig(
+                record.get("u"), record.get("k"), capturedRequest)
+        from .known_user import KnownUser
+        return KnownUser.validateRequestByIntegrationConfig(
+            record.get("u"), record.get("k"), self.integrationsConfigString,
+            self.customerId, self.secretKey, capturedRequest)
+
+    def replay(self, records):
+        report = ReplayReport()
+        with RecordedClock() as clock:
+            for record in records:
+                clock.currentTime = record.get("t") or 0
+                capturedRequest = CapturedRequest(record)
+                report.requestCount += 1
+                start = time.perf_counter()
+                try:
+                    result = self.__validate(record, capturedRequest)
+                except Exception:
+                    result = None
+                    report.errorCount += 1
+                report.latencies.append(
+                    (time.perf_counter() - start) * 1e6)
+                if (record.get("l") is not None):
+                    report.recordedLatencies.append(record["l"])
+
+                decision = RequestCapture.getDecision(result)
+                actionType = decision[0] if decision is not None else None
+                report.actionCounts[actionType] = report.actionCounts.get(
+                    actionType, 0) + 1
+                if ("d" in record and decision != record["d"]):
+                    report.mismatchCount += 1
+                    if (len(report.mismatches) <
+                            RequestReplayer.MAX_REPORTED_MISMATCHES):
+                        report.mismatches.append(
+                            (record.get("u"), record["d"], decision))
+        return report
@@ -0,0 +1,68 @@
+from .http_context_providers import HttpContextProvider
+
+
+class ConfigDependencies:
+    USER_AGENT_HEADER_NAME = "user-agent"
+    COOKIE_INPUT = "cookie"
+    HEADER_INPUT = "header"
+
+    def __init__(self, urlParts, cookieNames, usesUserAgent, headerNames):
+        self.urlParts = frozenset(urlParts)
+        self.cookieNames = frozenset(cookieNames)
+        self.usesUserAgent = usesUserAgent
+        self.headerNames = frozenset(headerNames)
+
+    def isUrlOnly(self):
+        return (len(self.cookieNames) == 0 and not self.usesUserAgent
+                and len(self.headerNames) == 0)
+
+    def getInputKeys(self):
+        inputKeys = [(ConfigDependencies.COOKIE_INPUT, name)
+                     for name in self.cookieNames]
+        inputKeys.extend((ConfigDependencies.HEADER_INPUT, name)
+                         for name in self.headerNames)
+        if (self.usesUserAgent):
+            inputKeys.append((ConfigDependencies.HEADER_INPUT,
+                              ConfigDependencies.USER_AGENT_HEADER_NAME))
+        return tuple(sorted(set(inputKeys)))
+
+    def extract(self, httpContextProvider):
+        return RequestInputs.fetch(self.getInputKeys(), httpContextProvider)
+
+
+class RequestInputs(HttpContextProvider):
+    def __init__(self, cookies=None, headers=None):
+        self.cookies = dict(cookies or {})
+        self.headers = {}
+        for name, value in (headers or {}).items():
+            self.headers[name.lower()] = value
+
+    @staticmethod
+    def fetch(inputKeys, httpContextProvider):
+        requestInputs = RequestInputs()
+        for inputType, name in inputKeys:
+            if (inputType == ConfigDependencies.COOKIE_INPUT):
+                requestInputs.cookies[name] = httpContextProvider.getCookie(name)
+            else:
+                requestInputs.headers[name.lower()] = httpContextProvider.getHeader(name)
+        return requestInputs
+
+    def getValues(self, inputKeys):
+        values = []
+        for inputType, name in inputKeys:
+            if (inputType == ConfigDependencies.COOKIE_INPUT):
+                values.append(self.cookies.get(name))
+            else:
+                values.append(self.headers.get(name.lower()))
+        return tuple(values)
+
+    def getProviderName(self):
+        return "request-inputs"
+
+    def getCookie(self, name):
+        return self.cookies.get(name)
+
+    def getHeader(self, name):
+        if (name is None):
+            return None
+        return self.headers.get(name.lower())
@@ -0,0 +1,68 @@
+import re
+
+from .queueit_helpers import QueueitHelpers
+
+QUEUEIT_TOKEN_KEY = "queueittoken"
+# An http(s) URL with a plain host name and no path parameters, which urlparse
+# would split the same way. Anything else (user info, IPv6 and non-ASCII host
+# names, tabs and newlines that urlparse removes) goes through urlparse.
+SIMPLE_URL_PATTERN = re.compile(
+    r"https?://([A-Za-z0-9._:-]*)((?:/[^?#;\t\r\n]*)?)(?:[?#][^\t\r\n]*)?\Z")
+
+
+class RequestUrl(str):
+    def __new__(cls, url, queueitToken=None, originalUrl=None):
+        requestUrl = str.__new__(cls, url)
+        requestUrl.queueitToken = queueitToken
+        requestUrl.originalUrl = url if originalUrl is None else originalUrl
+        try:
+            requestUrl.hostName, requestUrl.path = RequestUrl.splitUrl(url)
+            requestUrl.isValid = True
+        except ValueError:
+            requestUrl.hostName = None
+            requestUrl.path = ""
+            requestUrl.isValid = False
+        return requestUrl
+
+    @staticmethod
+    def parse(requestUrl):
+        queryStart = requestUrl.find("?")
+        fragmentStart = requestUrl.find("#")
+        if (queryStart < 0 or 0 <= fragmentStart < queryStart
+                or requestUrl.lower().find(QUEUEIT_TOKEN_KEY, queryStart) < 0):
+            return RequestUrl(requestUrl)
+
+        if (fragmentStart < 0):
+            fragmentStart = len(requestUrl)
+        queueitToken = None
+        parameters = []
+        for parameter in requestUrl[queryStart + 1:fragmentStart].split("&"):
+            name, separator, value = parameter.partition("=")
+            if (len(name) == len(QUEUEIT_TOKEN_KEY)
+                    and name.lower() == QUEUEIT_TOKEN_KEY):
+                if (queueitToken is None):
+                    queueitToken = QueueitHelpers.urlDecode(value)
+                continue
+            parameters.append(parameter)
+
+        url = requestUrl[:queryStart]
+        if (len(parameters) > 0):
+            url += "?" + "&".join(parameters)
+        return RequestUrl(url + requestUrl[fragmentStart:], queueitToken,
+                          requestUrl)
+
+    @staticmethod
+    def splitUrl(url):
+        match = SIMPLE_URL_PATTERN.match(url)
+        if (match is None):
+            uri = QueueitHelpers.urlParse(url)
+            return uri.hostname, uri.path
+        return match.group(1).partition(":")[0].lower() or None, match.group(2)
+
+    @staticmethod
+    def getHostNameAndPath(url):
+        if (isinstance(url, RequestUrl)):
+            if (not url.isValid):
+                raise ValueError("Invalid URL")
+            return url.hostName, url.path
+        return RequestUrl.splitUrl(url)
@@ -0,0 +1,278 @@
+from .integration_config_loader import URL_PARTS
+from .lru_cache import LruCache
+from .request_url import RequestUrl
+
+EQUALS_ATOM = "equals"
+CONTAINS_ATOM = "contains"
+NON_EMPTY_ATOM = "nonEmpty"
+ALWAYS_TRUE = (frozenset(), True, False)
+
+
+class AhoCorasickAutomaton:
+    MAX_TRANSITIONS_PER_STATE = 256
+
+    def __init__(self, patterns):
+        self.__goto = [{}]
+        self.__fail = [0]
+        outputs = [[]]
+        for pattern, output in patterns.items():
+            state = 0
+            for character in pattern:
+                nextState = self.__goto[state].get(character)
+                if (nextState is None):
+                    nextState = len(self.__goto)
+                    self.__goto[state][character] = nextState
+                    self.__goto.append({})
+                    self.__fail.append(0)
+                    outputs.append([])
+                state = nextState
+            outputs[state].append(output)
+
+        queue = list(self.__goto[0].values())
+        for state in queue:
+            for character, nextState in self.__goto[state].items():
+                queue.append(nextState)
+                if (state != 0):
+                    self.__fail[nextState] = self.__getNextState(
+                        self.__fail[state], character, self.__goto)
+                outputs[nextState].extend(outputs[self.__fail[nextState]])
+
+        self.__outputs = tuple(tuple(output) for output in outputs)
+        self.__transitions = [dict(transitions) for transitions in self.__goto]
+
+    def __getstate__(self):
+        # Transitions added while matching are rebuilt from the goto table.
+        return (self.__goto, self.__fail, self.__outputs)
+
+    def __setstate__(self, state):
+        self.__goto, self.__fail, self.__outputs = state
+        self.__transitions = [dict(transitions) for transitions in self.__goto]
+
+    def __getNextState(self, state, character, transitions):
+        while (True):
+            nextState = transitions[state].get(character)
+            if (nextState is not None):
+                return nextState
+            if (state == 0):
+                return 0
+            state = self.__fail[state]
+
+    def findAll(self, text, found):
+        transitions = self.__transitions
+        outputs = self.__outputs
+        state = 0
+        for character in text:
+            nextState = transitions[state].get(character)
+            if (nextState is None):
+                nextState = self.__getNextState(state, character, self.__goto)
+                if (len(transitions[state]) <
+                        AhoCorasickAutomaton.MAX_TRANSITIONS_PER_STATE):
+                    transitions[state][character] = nextState
+            state = nextState
+            if (outputs[state]):
+                found.update(outputs[state])
+        return found
+
+
+class UrlDecisionTable:
+    def __init__(self, compiledIntegrations, tableSize=0, cacheBudget=None,
+                 cacheOwner=None):
+        self.__atomIds = {}
+        self.__equalsAtoms = {}
+        self.__containsPatterns = {}
+        self.__nonEmptyAtoms = {}
+        self.__predicates = {}
+        self.__integrationConfigs = []
+        self.__triggers = []
+        atomReferences = {}
+        for integrationIndex, (integrationConfig, compiledTriggers) in \
+                enumerate(compiledIntegrations):
+            self.__integrationConfigs.append(integrationConfig)
+            for compiledTrigger in compiledTriggers:
+                self.__triggers.append((integrationIndex, compiledTrigger))
+                predicates = tuple(self.__compilePredicate(triggerPart)
+                                   for triggerPart in compiledTrigger.urlParts)
+                self.__predicates[compiledTrigger] = predicates
+                for atomIds, _, _ in predicates:
+                    for atomId in atomIds:
+                        atomReferences[atomId] = atomReferences.get(atomId, 0) + 1
+
+        self.__triggerPositionsByAtom = {}
+        alwaysPositions = []
+        for position, (_, compiledTrigger) in enumerate(self.__triggers):
+            # A trigger that is not false when none of its atoms is true has
+            # to be looked at for every URL. Any other trigger is indexed by
+            # the atoms that can make it true: for an And trigger, the atoms
+            # of its least referenced part that is false by default.
+            if (self.evaluateUrlParts(compiledTrigger, frozenset())
+                    is not False):
+                alwaysPositions.append(position)
+                continue
+            predicates = self.__predicates[compiledTrigger]
+            if (compiledTrigger.isOrOperator):
+                atomIds = set()
+                for predicateAtomIds, _, _ in predicates:
+                    atomIds.update(predicateAtomIds)
+            else:
+                atomIds = min(
+                    (predicateAtomIds
+                     for predicateAtomIds, isTrue, isNegative in predicates
+                     if isTrue == isNegative),
+                    key=lambda predicateAtomIds: sum(
+                        atomReferences[atomId] for atomId in predicateAtomIds))
+            for atomId in atomIds:
+                self.__triggerPositionsByAtom.setdefault(atomId,
+                                                         []).append(position)
+        self.__alwaysPositions = tuple(alwaysPositions)
+
+        self.__automatons = tuple(
+            (urlPart, isIgnoreCase, AhoCorasickAutomaton(patterns))
+            for (urlPart, isIgnoreCase), patterns in
+            self.__containsPatterns.items())
+        self.__equalsAtoms = tuple(
+            (urlPart, isIgnoreCase, values)
+            for (urlPart, isIgnoreCase), values in self.__equalsAtoms.items())
+        self.__nonEmptyAtoms = tuple(self.__nonEmptyAtoms.items())
+        self.createTable(tableSize, cacheBudget, cacheOwner)
+
+    def createTable(self, tableSize=0, cacheBudget=None, cacheOwner=None):
+        self.table = None
+        if (tableSize > 0):
+            self.table = LruCache(tableSize, cacheBudget, cacheOwner)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["table"] = None
+        return state
+
+    def getAtomCount(self):
+        return len(self.__atomIds)
+
+    def __getAtomId(self, atom):
+        atomId = self.__atomIds.get(atom)
+        if (atomId is None):
+            atomId = len(self.__atomIds)
+            self.__atomIds[atom] = atomId
+        return atomId
+
+    def __getEqualsAtom(self, urlPart, isIgnoreCase, value):
+        if (isIgnoreCase):
+            value = value.upper()
+        atomId = self.__getAtomId((EQUALS_ATOM, urlPart, isIgnoreCase, value))
+        self.__equalsAtoms.setdefault((urlPart, isIgnoreCase), {})[value] = atomId
+        return atomId
+
+    def __getContainsAtom(self, urlPart, isIgnoreCase, value):
+        if (value == "*"):
+            atomId = self.__getAtomId((NON_EMPTY_ATOM, urlPart))
+            self.__nonEmptyAtoms[urlPart] = atomId
+            return atomId
+        if (isIgnoreCase):
+            value = value.upper()
+        atomId = self.__getAtomId((CONTAINS_ATOM, urlPart, isIgnoreCase, value))
+        self.__containsPatterns.setdefault((urlPart, isIgnoreCase),
+                                           {})[value] = atomId
+        return atomId
+
+    def __compilePredicate(self, triggerPart):
+        urlPart = triggerPart.urlPart
+        if (not isinstance(urlPart, str) or urlPart not in URL_PARTS):
+            urlPart = None
+        isIgnoreCase = triggerPart.isIgnoreCase
+        isNegative = triggerPart.isNegative
+        operator = triggerPart.operator
+        if (operator == "Equals"):
+            return (frozenset([self.__getEqualsAtom(
+                urlPart, isIgnoreCase, triggerPart.valueToCompare)]), False,
+                isNegative)
+        if (operator == "EqualsAny"):
+            return (frozenset(
+                self.__getEqualsAtom(urlPart, isIgnoreCase, value)
+                for value in triggerPart.valuesToCompare), False, isNegative)
+
+        if (operator == "Contains"):
+            values = [triggerPart.valueToCompare]
+            if (values[0] == "*" and isNegative):
+                # A non-empty value always contains "*", even when negated.
+                return ALWAYS_TRUE
+        else:
+            values = triggerPart.valuesToCompare
+        if ("" in values):
+            return (frozenset(), True, isNegative)
+        return (frozenset(self.__getContainsAtom(urlPart, isIgnoreCase, value)
+                          for value in values), False, isNegative)
+
+    @staticmethod
+    def __getUrlPartValues(currentPageUrl):
+        try:
+            hostName, path = RequestUrl.getHostNameAndPath(currentPageUrl)
+            return {
+                "PagePath": path,
+                "PageUrl": currentPageUrl,
+                "HostName": hostName
+            }
+        except:
+            return {}
+
+    def getTrueAtoms(self, currentPageUrl):
+        urlPartValues = UrlDecisionTable.__getUrlPartValues(currentPageUrl)
+        trueAtoms = set()
+        for urlPart, isIgnoreCase, values in self.__equalsAtoms:
+            value = urlPartValues.get(urlPart) or ""
+            if (isIgnoreCase):
+                value = value.upper()
+            atomId = values.get(value)
+            if (atomId is not None):
+                trueAtoms.add(atomId)
+        for urlPart, isIgnoreCase, automaton in self.__automatons:
+            value = urlPartValues.get(urlPart) or ""
+            if (isIgnoreCase):
+                value = value.upper()
+            automaton.findAll(value, trueAtoms)
+        for urlPart, atomId in self.__nonEmptyAtoms:
+            if (urlPartValues.get(urlPart)):
+                trueAtoms.add(atomId)
+        return frozenset(trueAtoms)
+
+    def evaluateUrlParts(self, compiledTrigger, trueAtoms):
+        isOrOperator = compiledTrigger.isOrOperator
+        for atomIds, isTrue, isNegative in self.__predicates[compiledTrigger]:
+            evaluation = (isTrue or not atomIds.isdisjoint(trueAtoms)) != isNegative
+            if (evaluation == isOrOperator):
+                return evaluation
+
+        if (len(compiledTrigger.requestParts) == 0):
+            return not isOrOperator
+        return None
+
+    def getCandidateIntegrations(self, trueAtoms):
+        positions = set(self.__alwaysPositions)
+        for atomId in trueAtoms:
+            triggerPositions = self.__triggerPositionsByAtom.get(atomId)
+            if (triggerPositions is not None):
+                positions.update(triggerPositions)
+
+        candidates = []
+        lastIntegrationIndex = None
+        for position in sorted(positions):
+            integrationIndex, compiledTrigger = self.__triggers[position]
+            if (integrationIndex != lastIntegrationIndex):
+                candidates.append(
+                    (self.__integrationConfigs[integrationIndex], []))
+                lastIntegrationIndex = integrationIndex
+            candidates[-1][1].append(compiledTrigger)
+        return candidates
+
+    def getUrlMatch(self, currentPageUrl, createUrlMatch):
+        trueAtoms = self.getTrueAtoms(currentPageUrl)
+        if (self.table is None):
+            return createUrlMatch(trueAtoms)
+        urlMatch = self.table.get(trueAtoms)
+        if (urlMatch is None):
+            urlMatch = createUrlMatch(trueAtoms)
+            self.table.put(trueAtoms, urlMatch)
+        return urlMatch
+
+    def clear(self):
+        if (self.table is not None):
+            self.table.clear()
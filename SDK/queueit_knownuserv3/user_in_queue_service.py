@@ -7,9 +7,11 @@ from .queueit_helpers import QueueitHelpers
 class UserInQueueService:
     SDK_VERSION = "v3-python-" + "3.6.1"
 
-    def __init__(self, httpContextProvider, userInQueueStateRepository):
+    def __init__(self, httpContextProvider, userInQueueStateRepository,
+                 validatedTokenCache=None):
         self.httpContextProvider = httpContextProvider
         self.userInQueueStateRepository = userInQueueStateRepository
+        self.validatedTokenCache = validatedTokenCache
 
     def __getValidTokenResult(self, config, queueParams, secretKey):
 
@@ -75,11 +77,33 @@ class UserInQueueService:
 
         return "&".join(queryStringList)
 
-    def __validateToken(self, config, queueParams, secretKey):
+    @staticmethod
+    def __isHashValid(queueParams, secretKey):
         calculatedHash = QueueitHelpers.hmacSha256Encode(
             queueParams.queueITTokenWithoutHash, secretKey)
+        return calculatedHash.upper() == queueParams.hashCode.upper()
 
-        if (calculatedHash.upper() != queueParams.hashCode.upper()):
+    def __extractQueueParams(self, queueitToken, secretKey):
+        if (self.validatedTokenCache is None):
+            queueParams = QueueUrlParams.extractQueueParams(queueitToken)
+            if (queueParams is None):
+                return None, False
+            return queueParams, UserInQueueService.__isHashValid(queueParams, secretKey)
+
+        validatedToken = self.validatedTokenCache.get(queueitToken, secretKey)
+        if (validatedToken is not None):
+            return validatedToken.queueParams, validatedToken.isHashValid
+
+        queueParams = QueueUrlParams.extractQueueParams(queueitToken)
+        if (queueParams is None):
+            return None, False
+        isHashValid = UserInQueueService.__isHashValid(queueParams, secretKey)
+        self.validatedTokenCache.put(queueitToken, secretKey, queueParams,
+                                     isHashValid)
+        return queueParams, isHashValid
+
+    def __validateToken(self, config, queueParams, isHashValid):
+        if (not isHashValid):
             return TokenValidationResult(False, "hash")
 
         if (queueParams.eventId.upper() != config.eventId.upper()):
@@ -106,12 +130,12 @@ class UserInQueueService:
                                              state.redirectType, config.actionName)
             return result
 
-        queueParams = QueueUrlParams.extractQueueParams(queueitToken)
+        queueParams, isHashValid = self.__extractQueueParams(queueitToken, secretKey)
         requestValidationResult = RequestValidationResult(None, None, None, None, None, None)
         isTokenValid = False
 
         if (queueParams is not None):
-            tokenValidationResult = self.__validateToken(config, queueParams, secretKey)
+            tokenValidationResult = self.__validateToken(config, queueParams, isHashValid)
             isTokenValid = tokenValidationResult.isValid
             if(isTokenValid):
                 requestValidationResult = self.__getValidTokenResult(config, queueParams, secretKey)
@@ -1,12 +1,19 @@
+import re
+
 from .queueit_helpers import QueueitHelpers
 from .models import Utils
 
 
 class UserInQueueStateCookieRepository:
     QUEUEIT_DATA_KEY = "QueueITAccepted-SDFrts345E-V3"
+    COMPACT_COOKIE_VERSION = "4"
+    COMPACT_COOKIE_PREFIX = "4~"
+    COMPACT_HASH_BYTES = 16
+    COMPACT_ISSUE_TIME_BYTES = 4
 
-    def __init__(self, httpContextProvider):
+    def __init__(self, httpContextProvider, useCompactCookie=False):
         self.httpContextProvider = httpContextProvider
+        self.useCompactCookie = useCompactCookie
 
     @staticmethod
     def getCookieKey(eventId):
@@ -14,14 +21,25 @@ class UserInQueueStateCookieRepository:
 
     @staticmethod
     def __generateHash(eventId, queueId, fixedCookieValidityMinutes,
-                       redirectType, issueTime, secretKey):
+                       redirectType, issueTime, secretKey, version=None):
+        if (version == UserInQueueStateCookieRepository.COMPACT_COOKIE_VERSION):
+            return QueueitHelpers.hmacSha256Base64UrlEncode(
+                "~".join(["v" + version, eventId, queueId,
+                          fixedCookieValidityMinutes, redirectType, issueTime]),
+                secretKey, UserInQueueStateCookieRepository.COMPACT_HASH_BYTES)
         return QueueitHelpers.hmacSha256Encode(
             eventId + queueId + fixedCookieValidityMinutes + redirectType +
             issueTime, secretKey)
 
     @staticmethod
     def __createCookieValue(eventId, queueId, fixedCookieValidityMinutes,
-                            redirectType, secretKey):
+                            redirectType, secretKey, useCompactCookie=False):
+        if (useCompactCookie and "~" not in eventId + queueId +
+                fixedCookieValidityMinutes + redirectType):
+            return UserInQueueStateCookieRepository.__createCompactCookieValue(
+                eventId, queueId, fixedCookieValidityMinutes, redirectType,
+                secretKey)
+
         issueTime = Utils.toString(
             QueueitHelpers.getCurrentTime())
         hashValue = UserInQueueStateCookieRepository.__generateHash(
@@ -36,71 +54,62 @@ class UserInQueueStateCookieRepository:
         return cookieValue
 
     @staticmethod
-    def __getCookieNameValueMap(cookieValue):
-        result = {}
-        cookieNameValues = cookieValue.split("&")
-        for item in cookieNameValues:
-            arr = item.split("=")
-            if (len(arr) == 2):
-                result[arr[0]] = arr[1]
-        return result
+    def __createCompactCookieValue(eventId, queueId,
+                                   fixedCookieValidityMinutes, redirectType,
+                                   secretKey):
+        issueTime = QueueitHelpers.getCurrentTime()
+        hashValue = UserInQueueStateCookieRepository.__generateHash(
+            eventId, queueId, fixedCookieValidityMinutes, redirectType,
+            Utils.toString(issueTime), secretKey,
+            UserInQueueStateCookieRepository.COMPACT_COOKIE_VERSION)
+
+        cookieParts = [UserInQueueStateCookieRepository.COMPACT_COOKIE_VERSION,
+                       "e_" + eventId, "q_" + queueId]
+        if (not Utils.isNilOrEmpty(fixedCookieValidityMinutes)):
+            cookieParts.append("f_" + fixedCookieValidityMinutes)
+        cookieParts.append("r_" + redirectType)
+        cookieParts.append("i_" + QueueitHelpers.base64UrlEncode(
+            issueTime.to_bytes(
+                UserInQueueStateCookieRepository.COMPACT_ISSUE_TIME_BYTES,
+                "big")))
+        cookieParts.append("h_" + hashValue)
+        return "~".join(cookieParts)
 
     @staticmethod
-    def __isCookieValid(secretKey, cookieNameValueMap, eventId,
+    def __isCookieValid(secretKey, stateCookie, eventId,
                         cookieValidityMinutes, validateTime):
-        try:
-            if ("EventId" not in cookieNameValueMap):
-                return False
-
-            if ("QueueId" not in cookieNameValueMap):
-                return False
-
-            if ("RedirectType" not in cookieNameValueMap):
-                return False
-
-            if ("IssueTime" not in cookieNameValueMap):
-                return False
+        if (stateCookie is None or not stateCookie.isComplete()):
+            return False
 
-            if ("Hash" not in cookieNameValueMap):
-                return False
+        hashValue = UserInQueueStateCookieRepository.__generateHash(
+            stateCookie.eventId, stateCookie.queueId,
+            stateCookie.fixedCookieValidityMinutes, stateCookie.redirectType,
+            stateCookie.issueTime, secretKey, stateCookie.version)
 
-            fixedCookieValidityMinutes = ""
-            if ("FixedValidityMins" in cookieNameValueMap):
-                fixedCookieValidityMinutes = cookieNameValueMap[
-                    "FixedValidityMins"]
+        if (hashValue != stateCookie.hashValue):
+            return False
 
-            hashValue = UserInQueueStateCookieRepository.__generateHash(
-                cookieNameValueMap["EventId"], cookieNameValueMap["QueueId"],
-                fixedCookieValidityMinutes, cookieNameValueMap["RedirectType"],
-                cookieNameValueMap["IssueTime"], secretKey)
+        if (eventId.upper() != stateCookie.eventId.upper()):
+            return False
 
-            if (hashValue != cookieNameValueMap["Hash"]):
-                return False
+        if (validateTime):
+            validity = cookieValidityMinutes
+            if (stateCookie.fixedCookieValidityMinutes != ""):
+                validity = int(stateCookie.fixedCookieValidityMinutes)
 
-            if (eventId.upper() != cookieNameValueMap["EventId"].upper()):
+            expirationTime = int(stateCookie.issueTime) + (validity * 60)
+            if (expirationTime <
+                    QueueitHelpers.getCurrentTime()):
                 return False
 
-            if (validateTime):
-                validity = cookieValidityMinutes
-                if (not Utils.isNilOrEmpty(fixedCookieValidityMinutes)):
-                    validity = int(fixedCookieValidityMinutes)
-
-                expirationTime = int(
-                    cookieNameValueMap["IssueTime"]) + (validity * 60)
-                if (expirationTime <
-                        QueueitHelpers.getCurrentTime()):
-                    return False
-
-            return True
-        except:
-            return False
+        return True
 
     def store(self, eventId, queueId, fixedCookieValidityMinutes, cookieDomain,
               redirectType, secretKey):
         cookieKey = UserInQueueStateCookieRepository.getCookieKey(eventId)
         cookieValue = UserInQueueStateCookieRepository.__createCookieValue(
             eventId, queueId, Utils.toString(fixedCookieValidityMinutes),
-            redirectType, secretKey)
+            redirectType, secretKey, self.useCompactCookie)
         self.httpContextProvider.setCookie(
             cookieKey, cookieValue,
             QueueitHelpers.getCookieExpirationDate(),
@@ -110,25 +119,25 @@ class UserInQueueStateCookieRepository:
                  validateTime):
         try:
             cookieKey = UserInQueueStateCookieRepository.getCookieKey(eventId)
+            cookieValue = self.httpContextProvider.getCookie(cookieKey)
 
-            if (self.httpContextProvider.getCookie(cookieKey) is None):
+            if (cookieValue is None):
                 return StateInfo(False, False, None, None, None)
 
-            cookieNameValueMap = UserInQueueStateCookieRepository.__getCookieNameValueMap(
-                self.httpContextProvider.getCookie(cookieKey))
+            stateCookie = QueueStateCookie.parse(cookieValue)
             if (not UserInQueueStateCookieRepository.__isCookieValid(
-                    secretKey, cookieNameValueMap, eventId, cookieValidityMinutes,
+                    secretKey, stateCookie, eventId, cookieValidityMinutes,
                     validateTime)):
                 return StateInfo(True, False, None, None, None)
 
             fixedCookieValidityMinutes = None
-            if ("FixedValidityMins" in cookieNameValueMap):
+            if (stateCookie.fixedCookieValidityMinutes != ""):
                 fixedCookieValidityMinutes = int(
-                    cookieNameValueMap["FixedValidityMins"])
+                    stateCookie.fixedCookieValidityMinutes)
 
-            return StateInfo(True, True, cookieNameValueMap["QueueId"],
+            return StateInfo(True, True, stateCookie.queueId,
                              fixedCookieValidityMinutes,
-                             cookieNameValueMap["RedirectType"])
+                             stateCookie.redirectType)
         except:
             return StateInfo(True, False, None, None, None)
 
@@ -143,21 +152,16 @@ class UserInQueueStateCookieRepository:
         if (cookieValue == None):
             return
 
-        cookieNameValueMap = UserInQueueStateCookieRepository.__getCookieNameValueMap(
-            cookieValue)
+        stateCookie = QueueStateCookie.parse(cookieValue)
         if (not UserInQueueStateCookieRepository.__isCookieValid(
-                secretKey, cookieNameValueMap, eventId, cookieValidityMinutes,
+                secretKey, stateCookie, eventId, cookieValidityMinutes,
                 True)):
             return
 
-        fixedCookieValidityMinutes = ""
-        if ("FixedValidityMins" in cookieNameValueMap):
-            fixedCookieValidityMinutes = cookieNameValueMap[
-                "FixedValidityMins"]
-
         cookieValue = UserInQueueStateCookieRepository.__createCookieValue(
-            eventId, cookieNameValueMap["QueueId"], fixedCookieValidityMinutes,
-            cookieNameValueMap["RedirectType"], secretKey)
+            eventId, stateCookie.queueId,
+            stateCookie.fixedCookieValidityMinutes, stateCookie.redirectType,
+            secretKey, self.useCompactCookie)
 
         self.httpContextProvider.setCookie(
             cookieKey, cookieValue,
@@ -177,3 +181,96 @@ class StateInfo:
     def isStateExtendable(self):
         return self.isValid and Utils.isNilOrEmpty(
             self.fixedCookieValidityMinutes)
+
+
+class QueueStateCookie:
+    __slots__ = ("eventId", "queueId", "fixedCookieValidityMinutes",
+                 "redirectType", "issueTime", "hashValue", "version")
+
+    COOKIE_PATTERN = re.compile(
+        "EventId=([^&=]*)&QueueId=([^&=]*)(?:&FixedValidityMins=([0-9]*))?"
+        "&RedirectType=([^&=]*)&IssueTime=([0-9]+)&Hash=([^&=]*)")
+    COMPACT_COOKIE_PATTERN = re.compile(
+        "4~e_([^~]*)~q_([^~]*)(?:~f_([0-9]*))?~r_([^~]*)"
+        "~i_([A-Za-z0-9_-]{6})~h_([^~]*)")
+    FIELD_NAMES = {
+        "EventId": "eventId",
+        "QueueId": "queueId",
+        "FixedValidityMins": "fixedCookieValidityMinutes",
+        "RedirectType": "redirectType",
+        "IssueTime": "issueTime",
+        "Hash": "hashValue"
+    }
+    DIGITS = "0123456789"
+
+    def __init__(self, eventId, queueId, fixedCookieValidityMinutes,
+                 redirectType, issueTime, hashValue, version=None):
+        self.eventId = eventId
+        self.queueId = queueId
+        self.fixedCookieValidityMinutes = fixedCookieValidityMinutes
+        self.redirectType = redirectType
+        self.issueTime = issueTime
+        self.hashValue = hashValue
+        self.version = version
+
+    @staticmethod
+    def parse(cookieValue):
+        match = QueueStateCookie.COOKIE_PATTERN.fullmatch(cookieValue)
+        if (match is not None):
+            eventId, queueId, fixedCookieValidityMinutes, redirectType, \
+                issueTime, hashValue = match.groups()
+            return QueueStateCookie(eventId, queueId,
+                                    fixedCookieValidityMinutes or "",
+                                    redirectType, issueTime, hashValue)
+
+        if (cookieValue.startswith(
+                UserInQueueStateCookieRepository.COMPACT_COOKIE_PREFIX)):
+            return QueueStateCookie.__parseCompact(cookieValue)
+        return QueueStateCookie.__parseUnordered(cookieValue)
+
+    @staticmethod
+    def __parseCompact(cookieValue):
+        match = QueueStateCookie.COMPACT_COOKIE_PATTERN.fullmatch(cookieValue)
+        if (match is None):
+            return None
+        eventId, queueId, fixedCookieValidityMinutes, redirectType, \
+            issueTime, hashValue = match.groups()
+        issueTime = Utils.toString(int.from_bytes(
+            QueueitHelpers.base64UrlDecode(issueTime), "big"))
+        return QueueStateCookie(
+            eventId, queueId, fixedCookieValidityMinutes or "", redirectType,
+            issueTime, hashValue,
+            UserInQueueStateCookieRepository.COMPACT_COOKIE_VERSION)
+
+    @staticmethod
+    def __parseUnordered(cookieValue):
+        fields = {}
+        fieldNames = QueueStateCookie.FIELD_NAMES
+        length = len(cookieValue)
+        start = 0
+        while (start <= length):
+            end = cookieValue.find("&", start)
+            if (end < 0):
+                end = length
+            separator = cookieValue.find("=", start, end)
+            if (separator >= 0 and cookieValue.find("=", separator + 1, end) < 0):
+                fieldName = fieldNames.get(cookieValue[start:separator])
+                if (fieldName is not None):
+                    fields[fieldName] = cookieValue[separator + 1:end]
+            start = end + 1
+
+        issueTime = fields.get("issueTime")
+        fixedCookieValidityMinutes = fields.get("fixedCookieValidityMinutes", "")
+        if (len(fields) < 5 or issueTime is None or issueTime == ""
+                or issueTime.strip(QueueStateCookie.DIGITS)
+                or fixedCookieValidityMinutes.strip(QueueStateCookie.DIGITS)):
+            return None
+        return QueueStateCookie(fields.get("eventId"), fields.get("queueId"),
+                                fixedCookieValidityMinutes,
+                                fields.get("redirectType"), issueTime,
+                                fields.get("hashValue"))
+
+    def isComplete(self):
+        return (self.eventId is not None and self.queueId is not None
+                and self.redirectType is not None
+                and self.issueTime is not None and self.hashValue is not None)
@@ -0,0 +1,69 @@
+import hashlib
+from functools import lru_cache
+
+from .lru_cache import LruCache
+from .queueit_helpers import QueueitHelpers
+
+
+@lru_cache(maxsize=64)
+def _getSecretKeyFingerprint(secretKey):
+    if (isinstance(secretKey, str)):
+        secretKey = secretKey.encode("utf-8")
+    return hashlib.sha256(secretKey).hexdigest()[:16]
+
+
+class ValidatedTokenCache:
+    MAX_SIZE = 1024
+    INVALID_MAX_SIZE = 64
+    TTL_SECONDS = 60
+
+    def __init__(self, maxSize=None, ttlSeconds=None, cacheBudget=None,
+                 cacheOwner=None, invalidMaxSize=None):
+        if (maxSize is None):
+            maxSize = ValidatedTokenCache.MAX_SIZE
+        if (ttlSeconds is None):
+            ttlSeconds = ValidatedTokenCache.TTL_SECONDS
+        if (invalidMaxSize is None):
+            invalidMaxSize = ValidatedTokenCache.INVALID_MAX_SIZE
+        self.ttlSeconds = ttlSeconds
+        self.entries = LruCache(maxSize, cacheBudget, cacheOwner)
+        # Tokens with an invalid hash get their own small cache, so a flood of
+        # forged tokens can not evict the valid ones.
+        self.invalidEntries = LruCache(invalidMaxSize, cacheBudget, cacheOwner)
+
+    @staticmethod
+    def getSecretKeyFingerprint(secretKey):
+        return _getSecretKeyFingerprint(secretKey)
+
+    def get(self, queueitToken, secretKey):
+        cacheKey = (queueitToken, _getSecretKeyFingerprint(secretKey))
+        validatedToken = self.entries.get(cacheKey)
+        if (validatedToken is None):
+            validatedToken = self.invalidEntries.get(cacheKey)
+        if (validatedToken is None):
+            return None
+        if (validatedToken.expiresAt < QueueitHelpers.getCurrentTime()):
+            return None
+        return validatedToken
+
+    def put(self, queueitToken, secretKey, queueParams, isHashValid):
+        currentTime = QueueitHelpers.getCurrentTime()
+        expiresAt = min(currentTime + self.ttlSeconds, queueParams.timeStamp)
+        if (expiresAt < currentTime):
+            return None
+        validatedToken = ValidatedToken(queueParams, isHashValid, expiresAt)
+        entries = self.entries if isHashValid else self.invalidEntries
+        entries.put((queueitToken, _getSecretKeyFingerprint(secretKey)),
+                    validatedToken)
+        return validatedToken
+
+    def clear(self):
+        self.entries.clear()
+        self.invalidEntries.clear()
+
+
+class ValidatedToken:
+    def __init__(self, queueParams, isHashValid, expiresAt):
+        self.queueParams = queueParams
+        self.isHashValid = isHashValid
+        self.expiresAt = expiresAt
@@ -0,0 +1,123 @@
+import unittest
+import json
+import random
+
+from queueit_knownuserv3.batch_evaluator import NO_MATCH, BatchUrlEvaluator
+from queueit_knownuserv3.integration_config_helpers import IntegrationEvaluator
+from queueit_knownuserv3.models import KnownUserError
+from test_compiled_integration_config import (HttpContextProviderMock,
+                                              corruptConfig,
+                                              createRandomConfig,
+                                              createUrlOnlyConfig)
+from test_url_decision_table import addSpecialValues, createSpecialRequest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def createRandomUrlConfig(rnd, integrationCount):
+    customerIntegration = createRandomConfig(rnd, integrationCount)
+    for integration in customerIntegration["Integrations"]:
+        for trigger in integration["Triggers"]:
+            for triggerPart in trigger["TriggerParts"]:
+                if (triggerPart["ValidatorType"] != "UrlValidator"):
+                    triggerPart["ValidatorType"] = "UrlValidator"
+                    triggerPart["UrlPart"] = rnd.choice(["HostName", "PagePath", "PageUrl"])
+    return customerIntegration
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestBatchUrlEvaluator(unittest.TestCase):
+    def test_evaluateUrls_equivalentToEvaluator(self):
+        rnd = random.Random(41)
+        evaluator = IntegrationEvaluator()
+        for i in range(60):
+            customerIntegration = createRandomUrlConfig(rnd, rnd.randint(1, 8))
+            addSpecialValues(rnd, customerIntegration)
+            if (i % 2 == 1):
+                corruptConfig(rnd, customerIntegration)
+            urls = [createSpecialRequest(rnd)[0] for _ in range(80)]
+            result = BatchUrlEvaluator(customerIntegration).evaluateUrls(urls)
+            integrations = customerIntegration["Integrations"]
+            for url, matchIndex in zip(urls, result.matchIndices):
+                matchedConfig = evaluator.getMatchedIntegrationConfig(
+                    customerIntegration, url, HttpContextProviderMock())
+                if (matchedConfig):
+                    assert (integrations[matchIndex] is matchedConfig), url
+                else:
+                    assert (matchIndex == NO_MATCH), url
+
+    def test_hitCounts(self):
+        customerIntegration = createUrlOnlyConfig()
+        customerIntegration["Integrations"].append({
+            "Name": "all",
+            "Triggers": [{"LogicalOperator": "Or", "TriggerParts": [{
+                "UrlPart": "PageUrl",
+                "ValidatorType": "UrlValidator",
+                "ValueToCompare": "*",
+                "Operator": "Contains",
+                "IsIgnoreCase": False,
+                "IsNegative": False
+            }]}]
+        })
+        result = BatchUrlEvaluator.loads(json.dumps(customerIntegration)).evaluate(
+            ["test.com", "TEST.COM", "other.com", ""],
+            ["/queue", "/queue/1", "/queue", ""],
+            ["http://test.com/queue", "http://TEST.COM/queue/1", "http://other.com/queue", ""])
+
+        assert (list(result.matchIndices) == [0, 0, 1, NO_MATCH])
+        assert (list(result.hitCounts) == [2, 1])
+        assert (result.getHitCountsByName() == {"queue": 2, "all": 1})
+        assert (result.getNoMatchCount() == 1)
+
+    def test_evaluate_inChunks(self):
+        chunkSize = BatchUrlEvaluator.CHUNK_SIZE
+        BatchUrlEvaluator.CHUNK_SIZE = 3
+        try:
+            urls = ["http://test.com/queue", "http://test.com/other"] * 5
+            result = BatchUrlEvaluator(createUrlOnlyConfig()).evaluateUrls(urls)
+        finally:
+            BatchUrlEvaluator.CHUNK_SIZE = chunkSize
+        assert (list(result.matchIndices) == [0, NO_MATCH] * 5)
+        assert (list(result.hitCounts) == [5])
+
+    def test_ignoreCase_nonAsciiValues(self):
+        customerIntegration = createUrlOnlyConfig()
+        triggerPart = customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"][1]
+        triggerPart.update({"ValueToCompare": "STRASSE", "IsIgnoreCase": True})
+        result = BatchUrlEvaluator(customerIntegration).evaluateUrls(
+            ["http://test.com/straße", "http://test.com/strase"])
+        assert (list(result.matchIndices) == [0, NO_MATCH])
+
+    def test_nulTerminatedValues_notStripped(self):
+        customerIntegration = createUrlOnlyConfig()
+        triggerPart = customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"][1]
+        triggerPart.update({"Operator": "Equals", "ValueToCompare": "/queue"})
+        evaluator = BatchUrlEvaluator(customerIntegration)
+        result = evaluator.evaluate(["test.com", "test.com", "test.com\x00"],
+                                    ["/queue", "/queue\x00", "/queue"],
+                                    ["", "", ""])
+        assert (list(result.matchIndices) == [0, NO_MATCH, NO_MATCH])
+
+        triggerPart["ValueToCompare"] = "/queue\x00"
+        result = BatchUrlEvaluator(customerIntegration).evaluateUrls(
+            ["http://test.com/queue", "http://test.com/queue\x00"])
+        assert (list(result.matchIndices) == [NO_MATCH, 0])
+
+    def test_requestValidators_notSupported(self):
+        customerIntegration = createUrlOnlyConfig()
+        customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"].append({
+            "CookieName": "c1",
+            "ValidatorType": "CookieValidator",
+            "ValueToCompare": "v1",
+            "Operator": "Equals",
+            "IsIgnoreCase": False,
+            "IsNegative": False
+        })
+        self.assertRaises(KnownUserError, BatchUrlEvaluator, customerIntegration)
+
+    def test_evaluate_columnLengthMismatch(self):
+        self.assertRaises(KnownUserError, BatchUrlEvaluator(createUrlOnlyConfig()).evaluate,
+                          ["test.com"], [], ["http://test.com/"])
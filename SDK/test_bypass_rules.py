@@ -0,0 +1,63 @@
+import unittest
+
+from queueit_knownuserv3.bypass_rules import BypassRules
+from queueit_knownuserv3.integration_config_helpers import UrlValidatorHelper
+
+
+class TestBypassRules(unittest.TestCase):
+    def test_isBypassed_noRules(self):
+        rules = BypassRules()
+        assert (not rules.isBypassed("/style.css", "GET"))
+        assert (rules.bypassedCount == 0)
+
+    def test_isBypassed_fileExtension(self):
+        rules = BypassRules(fileExtensions=[".css", "PNG"])
+        assert (rules.isBypassed("/static/site.css"))
+        assert (rules.isBypassed("/img/Logo.Png"))
+        assert (not rules.isBypassed("/products/shoes"))
+        assert (not rules.isBypassed("/folder.css/page"))
+        assert (not rules.isBypassed(""))
+        assert (rules.bypassedCount == 2)
+
+    def test_isBypassed_pathPrefix(self):
+        rules = BypassRules(pathPrefixes=["/static/", "/health"])
+        assert (rules.isBypassed("/static/app"))
+        assert (rules.isBypassed("/healthz"))
+        assert (not rules.isBypassed("/shop/static/app"))
+        assert (not rules.isBypassed("/Static/app"))
+        assert (rules.bypassedCount == 2)
+
+    def test_isBypassed_method(self):
+        rules = BypassRules(methods=["options", "HEAD"])
+        assert (rules.usesMethod())
+        assert (rules.isBypassed("/page", "OPTIONS"))
+        assert (rules.isBypassed("/page", "head"))
+        assert (not rules.isBypassed("/page", "GET"))
+        assert (not rules.isBypassed("/page"))
+        assert (rules.bypassedCount == 2)
+
+    def test_forStaticAssets(self):
+        rules = BypassRules.forStaticAssets(pathPrefixes=["/assets/"])
+        assert (not rules.usesMethod())
+        assert (rules.isBypassed("/a/b/c/font.woff2"))
+        assert (rules.isBypassed("/assets/bundle"))
+        assert (not rules.isBypassed("/checkout"))
+        assert (not rules.isBypassed("/api/cart.json"))
+        assert (not rules.isBypassed("/sitemap.xml"))
+        assert (not rules.isBypassed("/robots.txt"))
+        assert (not rules.isBypassed("/tickets/order.pdf"))
+        assert (rules.bypassedCount == 2)
+
+    def test_isBypassed_agreesWithUrlValidatorOnExtension(self):
+        rules = BypassRules(fileExtensions=["css"])
+        triggerPart = {
+            "UrlPart": "PagePath",
+            "ValidatorType": "UrlValidator",
+            "ValueToCompare": ".css",
+            "Operator": "Contains",
+            "IsIgnoreCase": True,
+            "IsNegative": False
+        }
+        url = "http://test.com/theme/site.css"
+        assert (UrlValidatorHelper.evaluate(triggerPart, url))
+        assert (rules.isBypassed(UrlValidatorHelper.getUrlPart("PagePath", url)))
@@ -0,0 +1,192 @@
+import unittest
+import json
+import os
+import pickle
+import random
+import shutil
+import tempfile
+
+from queueit_knownuserv3 import compiled_integration_config
+from queueit_knownuserv3.compiled_config_cache import CompiledConfigCache
+from queueit_knownuserv3.compiled_integration_config import CompiledIntegrationConfig
+from queueit_knownuserv3.lru_cache import CacheBudget
+from queueit_knownuserv3.user_in_queue_service import UserInQueueService
+from test_compiled_integration_config import (HttpContextProviderMock,
+                                              createRandomConfig,
+                                              createRandomRequest)
+
+
+class TestCompiledConfigCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.configPath = os.path.join(self.directory, "integrationconfig.json")
+        rnd = random.Random(37)
+        self.configString = json.dumps(createRandomConfig(rnd, 20))
+        with open(self.configPath, "w") as configFile:
+            configFile.write(self.configString)
+        self.cachePath = CompiledConfigCache.getCachePath(self.configPath)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_loadOrCompile_writesCacheFile(self):
+        compiledConfig = CompiledConfigCache.loadOrCompile(self.configPath, "secretkey")
+        assert (os.path.exists(self.cachePath))
+        assert (compiledConfig.customerIntegration == json.loads(self.configString))
+
+    def test_loadOrCompile_loadsFromCache(self):
+        CompiledConfigCache.loadOrCompile(self.configPath, "secretkey")
+        originalCompile = CompiledIntegrationConfig.compile
+        CompiledIntegrationConfig.compile = staticmethod(lambda *args: self.fail("recompiled"))
+        try:
+            compiledConfig = CompiledConfigCache.loadOrCompile(self.configPath, "secretkey")
+        finally:
+            CompiledIntegrationConfig.compile = originalCompile
+        assert (compiledConfig.matchCache is not None)
+
+    def test_loadedConfig_matchesCompiledConfig(self):
+        CompiledConfigCache.loadOrCompile(self.configPath, "secretkey")
+        loadedConfig = CompiledConfigCache.load(self.cachePath, self.configString, "secretkey")
+        compiledConfig = CompiledIntegrationConfig.compile(self.configString)
+        rnd = random.Random(1)
+        for _ in range(500):
+            url, cookies, headers = createRandomRequest(rnd)
+            provider = HttpContextProviderMock(cookies, headers)
+            assert (loadedConfig.getMatchedIntegrationConfig(url, provider) ==
+                    compiledConfig.getMatchedIntegrationConfig(url, provider))
+
+    def test_load_staleContent(self):
+        CompiledConfigCache.loadOrCompile(self.configPath, "secretkey")
+        assert (CompiledConfigCache.load(self.cachePath, self.configString, "secretkey" + " ") is None)
+
+    def test_load_otherSdkVersion(self):
+        CompiledConfigCache.loadOrCompile(self.configPath, "secretkey")
+        sdkVersion = UserInQueueService.SDK_VERSION
+        UserInQueueService.SDK_VERSION = "v3-python-0.0.0"
+        try:
+            assert (CompiledConfigCache.load(self.cachePath, self.configString, "secretkey") is None)
+        finally:
+            UserInQueueService.SDK_VERSION = sdkVersion
+
+    def test_load_otherStrictMode(self):
+        CompiledConfigCache.loadOrCompile(self.configPath, "secretkey")
+        assert (CompiledConfigCache.load(self.cachePath, self.configString, "secretkey", True) is None)
+
+    def test_load_otherOptimizeMode(self):
+        CompiledConfigCache.loadOrCompile(self.configPath, "secretkey", optimize=True)
+        assert (CompiledConfigCache.load(self.cachePath, self.configString, "secretkey") is None)
+        loadedConfig = CompiledConfigCache.load(self.cachePath, self.configString, "secretkey", optimize=True)
+        assert (loadedConfig is not None)
+
+    def test_load_missingOrCorruptFile(self):
+        assert (CompiledConfigCache.load(self.cachePath, self.configString, "secretkey") is None)
+        with open(self.cachePath, "wb") as cacheFile:
+            cacheFile.write(b"not a cache file")
+        assert (CompiledConfigCache.load(self.cachePath, self.configString, "secretkey") is None)
+
+        data = CompiledConfigCache.dumps(
+            CompiledIntegrationConfig.compile(self.configString), self.configString, "secretkey")
+        with open(self.cachePath, "wb") as cacheFile:
+            cacheFile.write(data[:-10])
+        assert (CompiledConfigCache.load(self.cachePath, self.configString, "secretkey") is None)
+
+    def test_load_otherSecretKeyOrTamperedPayload(self):
+        CompiledConfigCache.loadOrCompile(self.configPath, "secretkey")
+        originalLoads = pickle.loads
+        pickle.loads = lambda *args: self.fail("unpickled")
+        try:
+            assert (CompiledConfigCache.load(self.cachePath, self.configString, "othersecret") is None)
+            with open(self.cachePath, "rb") as cacheFile:
+                data = bytearray(cacheFile.read())
+            data[-40] ^= 1
+            with open(self.cachePath, "wb") as cacheFile:
+                cacheFile.write(data)
+            assert (CompiledConfigCache.load(self.cachePath, self.configString, "secretkey") is None)
+        finally:
+            pickle.loads = originalLoads
+
+    def test_loadOrCompile_saveFailureIsNotFatal(self):
+        originalDumps = pickle.dumps
+
+        def failingDumps(*args):
+            raise pickle.PicklingError("cannot pickle")
+        pickle.dumps = failingDumps
+        try:
+            compiledConfig = CompiledConfigCache.loadOrCompile(self.configPath, "secretkey")
+        finally:
+            pickle.dumps = originalDumps
+        assert (compiledConfig.customerIntegration == json.loads(self.configString))
+        assert (os.listdir(self.directory) == ["integrationconfig.json"])
+
+    def test_loadOrCompile_replacesStaleCache(self):
+        CompiledConfigCache.loadOrCompile(self.configPath, "secretkey")
+        configString = json.dumps({"Version": 2, "Integrations": []})
+        with open(self.configPath, "w") as configFile:
+            configFile.write(configString)
+        compiledConfig = CompiledConfigCache.loadOrCompile(self.configPath, "secretkey")
+        assert (compiledConfig.version == 2)
+        assert (CompiledConfigCache.load(self.cachePath, configString, "secretkey").version == 2)
+
+    def test_load_usesCacheBudget(self):
+        CompiledConfigCache.loadOrCompile(self.configPath, "secretkey")
+        budget = CacheBudget(100)
+        compiledConfig = CompiledConfigCache.load(self.cachePath, self.configString, "secretkey",
+                                                  False, 10, budget, "owner")
+        compiledConfig.getMatchedIntegrationConfig("http://test.com/", HttpContextProviderMock())
+        assert (budget.getUsage("owner") > 0)
+        assert (budget.getUsage("owner") ==
+                len(compiledConfig.matchCache) + len(compiledConfig.inputMatchCache))
+
+    def test_load_keepsStaticOrderAndSetsAdaptiveOrdering(self):
+        compiledConfig = CompiledConfigCache.loadOrCompile(self.configPath, "secretkey")
+        loadedConfig = CompiledConfigCache.load(self.cachePath, self.configString, "secretkey",
+                                                adaptiveOrdering=True)
+        assert (loadedConfig.adaptiveOrdering)
+        for (_, compiledTriggers), (_, loadedTriggers) in zip(
+                compiledConfig.compiledIntegrations, loadedConfig.compiledIntegrations):
+            for compiledTrigger, loadedTrigger in zip(compiledTriggers, loadedTriggers):
+                assert ([triggerPart.operator for triggerPart in loadedTrigger.requestParts] ==
+                        [triggerPart.operator for triggerPart in compiledTrigger.requestParts])
+                assert (set(loadedTrigger.statistics) == set(loadedTrigger.requestParts))
+
+    def test_load_reusesSerializedUrlDecisionTable(self):
+        compiledConfig = CompiledConfigCache.loadOrCompile(self.configPath, "secretkey",
+                                                           useUrlDecisionTable=True)
+        compiledConfig.getMatchedIntegrationConfig("http://test.com/queue", HttpContextProviderMock())
+        cacheBudget = CacheBudget(100)
+        originalUrlDecisionTable = compiled_integration_config.UrlDecisionTable
+        compiled_integration_config.UrlDecisionTable = lambda *args: self.fail("rebuilt")
+        try:
+            loadedConfig = CompiledConfigCache.load(self.cachePath, self.configString, "secretkey",
+                                                    matchCacheSize=10, cacheBudget=cacheBudget,
+                                                    cacheOwner="tenant", useUrlDecisionTable=True)
+        finally:
+            compiled_integration_config.UrlDecisionTable = originalUrlDecisionTable
+        urlDecisionTable = loadedConfig.urlDecisionTable
+        assert (urlDecisionTable.getAtomCount() == compiledConfig.urlDecisionTable.getAtomCount())
+        assert (len(urlDecisionTable.table) == 0)
+        assert (urlDecisionTable.table.maxSize == 10)
+
+        rnd = random.Random(3)
+        for _ in range(200):
+            url, cookies, headers = createRandomRequest(rnd)
+            provider = HttpContextProviderMock(cookies, headers)
+            assert (loadedConfig.getMatchedIntegrationConfig(url, provider) ==
+                    compiledConfig.getMatchedIntegrationConfig(url, provider))
+        assert (cacheBudget.getUsage("tenant") > 0)
+
+        loadedConfig = CompiledConfigCache.load(self.cachePath, self.configString, "secretkey")
+        assert (loadedConfig.urlDecisionTable is None)
+
+    def test_load_buildsUrlDecisionTable(self):
+        CompiledConfigCache.loadOrCompile(self.configPath, "secretkey")
+        loadedConfig = CompiledConfigCache.load(self.cachePath, self.configString, "secretkey",
+                                                useUrlDecisionTable=True)
+        compiledConfig = CompiledIntegrationConfig.compile(self.configString)
+        assert (loadedConfig.urlDecisionTable is not None)
+        rnd = random.Random(2)
+        for _ in range(200):
+            url, cookies, headers = createRandomRequest(rnd)
+            provider = HttpContextProviderMock(cookies, headers)
+            assert (loadedConfig.getMatchedIntegrationConfig(url, provider) ==
+                    compiledConfig.getMatchedIntegrationConfig(url, provider))
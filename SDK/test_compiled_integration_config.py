@@ -0,0 +1,558 @@
+import unittest
+import json
+import random
+
+from queueit_knownuserv3.compiled_integration_config import CompiledIntegrationConfig
+from queueit_knownuserv3.integration_config_helpers import IntegrationEvaluator
+from queueit_knownuserv3.request_inputs import RequestInputs
+from queueit_knownuserv3.http_context_providers import HttpContextProvider
+
+
+class HttpContextProviderMock(HttpContextProvider):
+    def __init__(self, cookies=None, headers=None):
+        self.headers = headers or {}
+        self.cookies = cookies or {}
+        self.cookieReads = 0
+        self.headerReads = 0
+
+    def getHeader(self, headerName):
+        self.headerReads += 1
+        return self.headers.get(headerName)
+
+    def getCookie(self, cookieName):
+        self.cookieReads += 1
+        return self.cookies.get(cookieName)
+
+
+HOSTS = ["test.com", "shop.test.com", "other.com"]
+PATHS = ["/", "/queue", "/checkout", "/Checkout/step1", "/img/a.png"]
+COOKIE_VALUES = [None, "v1", "V2", "x"]
+USER_AGENTS = [None, "googlebot", "Mozilla/5.0"]
+
+
+def createTriggerPart(rnd):
+    kind = rnd.choice(["UrlValidator"] * 4 + ["CookieValidator", "UserAgentValidator", "HttpHeaderValidator"])
+    operator = rnd.choice(["Equals", "Contains", "EqualsAny", "ContainsAny"])
+    if (kind == "UrlValidator"):
+        urlPart = rnd.choice(["HostName", "PagePath", "PageUrl"])
+        values = HOSTS if urlPart == "HostName" else PATHS
+        triggerPart = {"UrlPart": urlPart}
+    elif (kind == "CookieValidator"):
+        values = ["v1", "v2", "x"]
+        triggerPart = {"CookieName": rnd.choice(["c1", "c2"])}
+    elif (kind == "UserAgentValidator"):
+        values = ["bot", "mozilla"]
+        triggerPart = {}
+    else:
+        values = ["v1", "x"]
+        triggerPart = {"HttpHeaderName": "h1"}
+    triggerPart.update({
+        "ValidatorType": kind,
+        "Operator": operator,
+        "ValueToCompare": rnd.choice(values),
+        "ValuesToCompare": rnd.sample(values, 2),
+        "IsNegative": rnd.random() < 0.2,
+        "IsIgnoreCase": rnd.random() < 0.5
+    })
+    return triggerPart
+
+
+def createRandomConfig(rnd, integrationCount):
+    integrations = []
+    for i in range(integrationCount):
+        triggers = []
+        for _ in range(rnd.randint(1, 2)):
+            triggers.append({
+                "LogicalOperator": rnd.choice(["And", "Or"]),
+                "TriggerParts": [createTriggerPart(rnd) for _ in range(rnd.randint(1, 3))]
+            })
+        integrations.append({"Name": "integration" + str(i), "Triggers": triggers})
+    return {"Version": 1, "Integrations": integrations}
+
+
+def createRandomRequest(rnd):
+    url = "http://" + rnd.choice(HOSTS) + rnd.choice(PATHS) + rnd.choice(["", "?a=1", "?q=queue"])
+    cookies = {"c1": rnd.choice(COOKIE_VALUES), "c2": rnd.choice(COOKIE_VALUES)}
+    headers = {"user-agent": rnd.choice(USER_AGENTS), "h1": rnd.choice(COOKIE_VALUES)}
+    return url, cookies, headers
+
+
+def corruptConfig(rnd, customerIntegration):
+    integrations = customerIntegration["Integrations"]
+    triggerParts = [(integration["Triggers"], trigger, triggerPart)
+                    for integration in integrations
+                    for trigger in integration["Triggers"]
+                    for triggerPart in trigger["TriggerParts"]]
+    for _ in range(rnd.randint(1, 3)):
+        triggers, trigger, triggerPart = rnd.choice(triggerParts)
+        if (not isinstance(trigger["TriggerParts"], list)):
+            continue
+        corruption = rnd.randrange(11)
+        if (corruption == 0):
+            triggers.insert(rnd.randint(0, len(triggers)), "invalid")
+        elif (corruption == 1):
+            trigger["TriggerParts"].insert(
+                rnd.randint(0, len(trigger["TriggerParts"])), None)
+        elif (corruption == 2):
+            trigger["LogicalOperator"] = rnd.choice([None, "and", "OR"])
+        elif (corruption == 3):
+            triggerPart.pop(rnd.choice(["Operator", "IsNegative", "IsIgnoreCase"]), None)
+        elif (corruption == 4):
+            triggerPart["Operator"] = rnd.choice([None, "StartsWith", 1])
+        elif (corruption == 5):
+            triggerPart["ValidatorType"] = rnd.choice([None, "IpValidator"])
+        elif (corruption == 6):
+            triggerPart["UrlPart"] = rnd.choice([None, "Query", ["PagePath"]])
+        elif (corruption == 7):
+            triggerPart["ValueToCompare"] = None
+            triggerPart["ValuesToCompare"] = None
+        elif (corruption == 8):
+            triggerPart["ValueToCompare"] = rnd.choice([5, True, ["v1"]])
+            triggerPart["ValuesToCompare"] = rnd.choice(
+                [[None, "/queue"], ["v1", 3, "x"], "queue", 5, {"v1": 1}])
+        elif (corruption == 9):
+            integrations.insert(rnd.randint(0, len(integrations)),
+                                rnd.choice([None, {"Name": "noTriggers"}]))
+        else:
+            trigger["TriggerParts"] = rnd.choice([None, []])
+
+
+def createUrlOnlyConfig():
+    return {
+        "Version": 1,
+        "Integrations": [{
+            "Name": "queue",
+            "Triggers": [{
+                "LogicalOperator": "And",
+                "TriggerParts": [{
+                    "UrlPart": "HostName",
+                    "ValidatorType": "UrlValidator",
+                    "ValueToCompare": "test.com",
+                    "Operator": "Equals",
+                    "IsIgnoreCase": True,
+                    "IsNegative": False
+                }, {
+                    "UrlPart": "PagePath",
+                    "ValidatorType": "UrlValidator",
+                    "ValueToCompare": "/queue",
+                    "Operator": "Contains",
+                    "IsIgnoreCase": False,
+                    "IsNegative": False
+                }]
+            }]
+        }]
+    }
+
+
+class TestCompiledIntegrationConfig(unittest.TestCase):
+    def test_getMatchedIntegrationConfig_equivalentToEvaluator(self):
+        rnd = random.Random(28)
+        evaluator = IntegrationEvaluator()
+        for _ in range(40):
+            customerIntegration = createRandomConfig(rnd, rnd.randint(1, 6))
+            compiledConfig = CompiledIntegrationConfig(customerIntegration)
+            assert (compiledConfig.matchCache is not None)
+            for _ in range(60):
+                url, cookies, headers = createRandomRequest(rnd)
+                expected = evaluator.getMatchedIntegrationConfig(
+                    customerIntegration, url, HttpContextProviderMock(cookies, headers))
+                actual = compiledConfig.getMatchedIntegrationConfig(
+                    url, HttpContextProviderMock(cookies, headers))
+                assert (actual is expected)
+
+    def test_urlOnlyConfig_cachedByHostAndPath(self):
+        compiledConfig = CompiledIntegrationConfig(createUrlOnlyConfig())
+        assert (compiledConfig.isUrlOnly)
+        assert (not compiledConfig.usesFullUrl)
+
+        assert (compiledConfig.getMatchedIntegrationConfig(
+            "http://other.com/page?a=1", None) is None)
+        assert (compiledConfig.getMatchedIntegrationConfig(
+            "http://other.com/page?a=2", None) is None)
+        matched = compiledConfig.getMatchedIntegrationConfig(
+            "http://test.com/queue", None)
+
+        assert (matched["Name"] == "queue")
+        assert (compiledConfig.matchCache.hits == 1)
+        assert (compiledConfig.matchCache.misses == 2)
+
+    def test_pageUrlConfig_cachedByFullUrl(self):
+        customerIntegration = createUrlOnlyConfig()
+        customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"][1]["UrlPart"] = "PageUrl"
+        compiledConfig = CompiledIntegrationConfig(customerIntegration)
+        assert (compiledConfig.usesFullUrl)
+
+        compiledConfig.getMatchedIntegrationConfig("http://test.com/a?queue", None)
+        compiledConfig.getMatchedIntegrationConfig("http://test.com/a?b", None)
+        assert (compiledConfig.matchCache.misses == 2)
+
+    def test_negativeUrlMatch_doesNotReadCookies(self):
+        customerIntegration = createUrlOnlyConfig()
+        customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"].append({
+            "CookieName": "c1",
+            "ValidatorType": "CookieValidator",
+            "ValueToCompare": "v1",
+            "Operator": "Equals",
+            "IsIgnoreCase": False,
+            "IsNegative": False
+        })
+        compiledConfig = CompiledIntegrationConfig(customerIntegration)
+        assert (not compiledConfig.isUrlOnly)
+
+        hcpMock = HttpContextProviderMock({"c1": "v1"})
+        assert (compiledConfig.getMatchedIntegrationConfig(
+            "http://other.com/queue", hcpMock) is None)
+        assert (hcpMock.cookieReads == 0)
+
+        assert (compiledConfig.getMatchedIntegrationConfig(
+            "http://test.com/queue", hcpMock)["Name"] == "queue")
+        assert (compiledConfig.getMatchedIntegrationConfig(
+            "http://test.com/queue", HttpContextProviderMock({"c1": "v2"})) is None)
+        assert (hcpMock.cookieReads == 1)
+
+    def test_malformedConfig_keepsEvaluatorResult(self):
+        customerIntegration = createUrlOnlyConfig()
+        customerIntegration["Integrations"][0]["Triggers"].insert(0, "invalid")
+        compiledConfig = CompiledIntegrationConfig(customerIntegration)
+
+        assert (compiledConfig.getMatchedIntegrationConfig(
+            "http://test.com/queue", None) is False)
+        assert (compiledConfig.configNode.droppedParts ==
+                ("Integrations[0].Triggers[0]", ))
+
+    def test_malformedConfig_equivalentToEvaluator(self):
+        rnd = random.Random(36)
+        evaluator = IntegrationEvaluator()
+        for _ in range(200):
+            customerIntegration = createRandomConfig(rnd, rnd.randint(1, 4))
+            corruptConfig(rnd, customerIntegration)
+            compiledConfig = CompiledIntegrationConfig(customerIntegration)
+            for _ in range(20):
+                url, cookies, headers = createRandomRequest(rnd)
+                expected = evaluator.getMatchedIntegrationConfig(
+                    customerIntegration, url, HttpContextProviderMock(cookies, headers))
+                actual = compiledConfig.getMatchedIntegrationConfig(
+                    url, HttpContextProviderMock(cookies, headers))
+                assert (actual is expected)
+
+    def test_nonStringValues_equivalentToEvaluator(self):
+        evaluator = IntegrationEvaluator()
+        triggerParts = []
+        for operator, value in [("Equals", 5), ("Contains", 5),
+                                ("EqualsAny", [None, "/queue"]),
+                                ("ContainsAny", ["/queue", 3, "/checkout"]),
+                                ("EqualsAny", "/"), ("ContainsAny", 5)]:
+            for isNegative in [False, True]:
+                for isIgnoreCase in [False, True]:
+                    triggerParts.append({
+                        "UrlPart": "PagePath",
+                        "ValidatorType": "UrlValidator",
+                        "Operator": operator,
+                        "ValueToCompare": value,
+                        "ValuesToCompare": value,
+                        "IsNegative": isNegative,
+                        "IsIgnoreCase": isIgnoreCase
+                    })
+        for triggerPart in triggerParts:
+            customerIntegration = {
+                "Version": 1,
+                "Integrations": [{
+                    "Name": "queue",
+                    "Triggers": [{
+                        "LogicalOperator": "And",
+                        "TriggerParts": [triggerPart]
+                    }]
+                }]
+            }
+            compiledConfig = CompiledIntegrationConfig(customerIntegration)
+            assert (compiledConfig.configNode.droppedParts == ())
+            for path in ["/", "/queue", "/Queue", "/checkout"]:
+                url = "http://test.com" + path
+                expected = evaluator.getMatchedIntegrationConfig(
+                    customerIntegration, url, HttpContextProviderMock())
+                actual = compiledConfig.getMatchedIntegrationConfig(
+                    url, HttpContextProviderMock())
+                assert (actual is expected)
+
+        negatedEquals = triggerParts[2]
+        assert (negatedEquals["IsNegative"] and negatedEquals["Operator"] == "Equals")
+        customerIntegration = {"Version": 1, "Integrations": [{
+            "Name": "queue",
+            "Triggers": [{"LogicalOperator": "And", "TriggerParts": [negatedEquals]}]
+        }]}
+        assert (CompiledIntegrationConfig(customerIntegration).getMatchedIntegrationConfig(
+            "http://test.com/", None) is customerIntegration["Integrations"][0])
+
+    def test_compile_newVersionStartsWithEmptyCache(self):
+        configString = json.dumps(createUrlOnlyConfig())
+        compiledConfig = CompiledIntegrationConfig.compile(configString)
+        compiledConfig.getMatchedIntegrationConfig("http://test.com/queue", None)
+        assert (len(compiledConfig.matchCache) == 1)
+
+        recompiledConfig = CompiledIntegrationConfig.compile(configString)
+        assert (len(recompiledConfig.matchCache) == 0)
+
+    def test_matchCacheSize_zero_disablesCache(self):
+        compiledConfig = CompiledIntegrationConfig(createUrlOnlyConfig(), 0)
+        assert (compiledConfig.matchCache is None)
+        assert (compiledConfig.getMatchedIntegrationConfig(
+            "http://test.com/queue", None)["Name"] == "queue")
+
+    def test_dependencies(self):
+        customerIntegration = createUrlOnlyConfig()
+        triggerParts = customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"]
+        triggerParts.extend([{
+            "CookieName": "c1",
+            "ValidatorType": "CookieValidator",
+            "ValueToCompare": "v1",
+            "Operator": "Equals",
+            "IsIgnoreCase": False,
+            "IsNegative": False
+        }, {
+            "ValidatorType": "UserAgentValidator",
+            "ValueToCompare": "bot",
+            "Operator": "Contains",
+            "IsIgnoreCase": True,
+            "IsNegative": True
+        }, {
+            "HttpHeaderName": "X-Custom",
+            "ValidatorType": "HttpHeaderValidator",
+            "ValueToCompare": "1",
+            "Operator": "Equals",
+            "IsIgnoreCase": False,
+            "IsNegative": False
+        }])
+        dependencies = CompiledIntegrationConfig(customerIntegration).dependencies
+
+        assert (dependencies.urlParts == frozenset(["HostName", "PagePath"]))
+        assert (dependencies.cookieNames == frozenset(["c1"]))
+        assert (dependencies.usesUserAgent)
+        assert (dependencies.headerNames == frozenset(["X-Custom"]))
+        assert (not dependencies.isUrlOnly())
+
+        hcpMock = HttpContextProviderMock({"c1": "v1", "c2": "v2"}, {
+            "user-agent": "Mozilla", "X-Custom": "1"})
+        requestInputs = dependencies.extract(hcpMock)
+        assert (requestInputs.cookies == {"c1": "v1"})
+        assert (requestInputs.getHeader("x-custom") == "1")
+        assert (requestInputs.getHeader("User-Agent") == "Mozilla")
+        assert (hcpMock.cookieReads == 1)
+        assert (hcpMock.headerReads == 2)
+
+    def test_requestDependentMatch_fetchesEachInputOnceAndCaches(self):
+        customerIntegration = createUrlOnlyConfig()
+        cookiePart = {
+            "CookieName": "c1",
+            "ValidatorType": "CookieValidator",
+            "ValueToCompare": "v1",
+            "Operator": "Equals",
+            "IsIgnoreCase": False,
+            "IsNegative": False
+        }
+        customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"].append(cookiePart)
+        customerIntegration["Integrations"].append({
+            "Name": "second",
+            "Triggers": [{"LogicalOperator": "Or", "TriggerParts": [dict(cookiePart, ValueToCompare="v2")]}]
+        })
+        compiledConfig = CompiledIntegrationConfig(customerIntegration)
+
+        hcpMock = HttpContextProviderMock({"c1": "v2"})
+        assert (compiledConfig.getMatchedIntegrationConfig(
+            "http://test.com/queue", hcpMock)["Name"] == "second")
+        assert (hcpMock.cookieReads == 1)
+
+        assert (compiledConfig.getMatchedIntegrationConfig(
+            "http://test.com/queue?x=1", hcpMock)["Name"] == "second")
+        assert (compiledConfig.inputMatchCache.hits == 1)
+
+    def test_requestDependentMatch_userAgentOrLongValue_notCached(self):
+        customerIntegration = createUrlOnlyConfig()
+        triggerParts = customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"]
+        triggerParts.append({
+            "CookieName": "c1",
+            "ValidatorType": "CookieValidator",
+            "ValueToCompare": "v1",
+            "Operator": "Contains",
+            "IsIgnoreCase": False,
+            "IsNegative": False
+        })
+        compiledConfig = CompiledIntegrationConfig(customerIntegration)
+        longValue = "v1" + "x" * CompiledIntegrationConfig.MAX_CACHED_INPUT_LENGTH
+        assert (compiledConfig.getMatchedIntegrationConfig(
+            "http://test.com/queue", HttpContextProviderMock({"c1": longValue}))["Name"] == "queue")
+        assert (len(compiledConfig.inputMatchCache) == 0)
+        compiledConfig.getMatchedIntegrationConfig(
+            "http://test.com/queue", HttpContextProviderMock({"c1": "v1"}))
+        assert (len(compiledConfig.inputMatchCache) == 1)
+
+        triggerParts[-1] = {
+            "ValidatorType": "UserAgentValidator",
+            "ValueToCompare": "googlebot",
+            "Operator": "Contains",
+            "IsIgnoreCase": True,
+            "IsNegative": True
+        }
+        compiledConfig = CompiledIntegrationConfig(customerIntegration)
+        for userAgent in ["Mozilla/5.0", "Mozilla/5.0", "Googlebot/2.1"]:
+            matchedConfig = compiledConfig.getMatchedIntegrationConfig(
+                "http://test.com/queue", HttpContextProviderMock(headers={"user-agent": userAgent}))
+            assert ((matchedConfig is None) == (userAgent == "Googlebot/2.1"))
+        assert (len(compiledConfig.inputMatchCache) == 0)
+
+    def test_getMatchedIntegrationConfig_withPrefetchedRequestInputs(self):
+        customerIntegration = createUrlOnlyConfig()
+        customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"].append({
+            "HttpHeaderName": "X-Custom",
+            "ValidatorType": "HttpHeaderValidator",
+            "ValueToCompare": "1",
+            "Operator": "Equals",
+            "IsIgnoreCase": False,
+            "IsNegative": False
+        })
+        compiledConfig = CompiledIntegrationConfig(customerIntegration)
+
+        requestInputs = RequestInputs(headers={"x-custom": "1"})
+        assert (compiledConfig.getMatchedIntegrationConfig(
+            "http://test.com/queue", requestInputs)["Name"] == "queue")
+        assert (compiledConfig.getMatchedIntegrationConfig(
+            "http://test.com/queue", RequestInputs()) is None)
+
+    def test_triggerParts_orderedByStaticCost(self):
+        customerIntegration = createUrlOnlyConfig()
+        customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"][:0] = [{
+            "ValidatorType": "UserAgentValidator",
+            "ValuesToCompare": ["googlebot", "bingbot", "yandex"],
+            "Operator": "ContainsAny",
+            "IsIgnoreCase": True,
+            "IsNegative": True
+        }, {
+            "CookieName": "c1",
+            "ValidatorType": "CookieValidator",
+            "ValueToCompare": "v1",
+            "Operator": "Equals",
+            "IsIgnoreCase": False,
+            "IsNegative": False
+        }]
+        compiledConfig = CompiledIntegrationConfig(customerIntegration, 0)
+        compiledTrigger = compiledConfig.compiledIntegrations[0][1][0]
+        assert ([triggerPart.validatorType for triggerPart in compiledTrigger.requestParts] ==
+                ["CookieValidator", "UserAgentValidator"])
+
+        hcpMock = HttpContextProviderMock({"c1": "v2"}, {"user-agent": "Mozilla"})
+        assert (compiledConfig.getMatchedIntegrationConfig("http://test.com/queue", hcpMock) is None)
+        assert (hcpMock.cookieReads == 1)
+        assert (hcpMock.headerReads == 0)
+
+    def test_unhashableUrlPart_equivalentToEvaluator(self):
+        evaluator = IntegrationEvaluator()
+        for urlPart in [["PagePath"], {"PagePath": 1}]:
+            customerIntegration = createUrlOnlyConfig()
+            triggerParts = customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"]
+            triggerParts[1]["UrlPart"] = urlPart
+            triggerParts[1]["IsNegative"] = True
+            compiledConfig = CompiledIntegrationConfig(customerIntegration)
+            assert (CompiledIntegrationConfig.getTriggerPartCost(
+                compiledConfig.configNode.integrations[0].triggers[0].triggerParts[1]) > 0)
+            for url in ["http://test.com/queue", "http://other.com/queue"]:
+                assert (compiledConfig.getMatchedIntegrationConfig(url, HttpContextProviderMock()) is
+                        evaluator.getMatchedIntegrationConfig(customerIntegration, url, HttpContextProviderMock()))
+
+    def test_adaptiveOrdering_ranksSelectivePartFirst(self):
+        customerIntegration = createUrlOnlyConfig()
+        customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"][:0] = [{
+            "CookieName": "c1",
+            "ValidatorType": "CookieValidator",
+            "ValueToCompare": "v1",
+            "Operator": "Equals",
+            "IsIgnoreCase": False,
+            "IsNegative": False
+        }, {
+            "HttpHeaderName": "h1",
+            "ValidatorType": "HttpHeaderValidator",
+            "ValueToCompare": "x",
+            "Operator": "Equals",
+            "IsIgnoreCase": False,
+            "IsNegative": False
+        }]
+        compiledConfig = CompiledIntegrationConfig(customerIntegration, 0,
+                                                   adaptiveOrdering=True)
+        hcpMock = HttpContextProviderMock({"c1": "v1"}, {"h1": "y"})
+        for _ in range(CompiledIntegrationConfig.RERANK_INTERVAL):
+            assert (compiledConfig.getMatchedIntegrationConfig("http://test.com/queue", hcpMock) is None)
+        assert (hcpMock.cookieReads == CompiledIntegrationConfig.RERANK_INTERVAL)
+
+        hcpMock.cookieReads = 0
+        assert (compiledConfig.getMatchedIntegrationConfig("http://test.com/queue", hcpMock) is None)
+        assert (hcpMock.cookieReads == 0)
+        assert (compiledConfig.getMatchedIntegrationConfig(
+            "http://test.com/queue", HttpContextProviderMock({"c1": "v1"}, {"h1": "x"}))["Name"] == "queue")
+
+    def test_adaptiveOrdering_equivalentToEvaluator(self):
+        rnd = random.Random(39)
+        evaluator = IntegrationEvaluator()
+        rerankInterval = CompiledIntegrationConfig.RERANK_INTERVAL
+        CompiledIntegrationConfig.RERANK_INTERVAL = 5
+        try:
+            for _ in range(40):
+                customerIntegration = createRandomConfig(rnd, rnd.randint(1, 6))
+                compiledConfig = CompiledIntegrationConfig(customerIntegration, 0,
+                                                           adaptiveOrdering=True)
+                for _ in range(60):
+                    url, cookies, headers = createRandomRequest(rnd)
+                    expected = evaluator.getMatchedIntegrationConfig(
+                        customerIntegration, url, HttpContextProviderMock(cookies, headers))
+                    actual = compiledConfig.getMatchedIntegrationConfig(
+                        url, HttpContextProviderMock(cookies, headers))
+                    assert (actual is expected)
+        finally:
+            CompiledIntegrationConfig.RERANK_INTERVAL = rerankInterval
+
+    def test_sharedTriggerPart_evaluatedOncePerRequest(self):
+        userAgentPart = {
+            "ValidatorType": "UserAgentValidator",
+            "ValueToCompare": "bot",
+            "Operator": "Contains",
+            "IsIgnoreCase": True,
+            "IsNegative": False
+        }
+        customerIntegration = {"Version": 1, "Integrations": [{
+            "Name": "integration" + str(i),
+            "Triggers": [{"LogicalOperator": "And", "TriggerParts": [
+                dict(userAgentPart), dict(userAgentPart, ValueToCompare="v" + str(i))]}]
+        } for i in range(3)]}
+        compiledConfig = CompiledIntegrationConfig(customerIntegration, 0)
+        assert (compiledConfig.sharesTriggerParts)
+
+        hcpMock = HttpContextProviderMock(headers={"user-agent": "Mozilla"})
+        assert (compiledConfig.getMatchedIntegrationConfig("http://test.com/", hcpMock) is None)
+        assert (hcpMock.headerReads == 1)
+
+        hcpMock = HttpContextProviderMock(headers={"user-agent": "bot v2"})
+        assert (compiledConfig.getMatchedIntegrationConfig(
+            "http://test.com/", hcpMock)["Name"] == "integration2")
+        assert (hcpMock.headerReads == 4)
+
+    def test_sharedTriggerParts_equivalentToEvaluator(self):
+        rnd = random.Random(47)
+        evaluator = IntegrationEvaluator()
+        for _ in range(40):
+            triggerParts = [createTriggerPart(rnd) for _ in range(4)]
+            customerIntegration = {"Version": 1, "Integrations": [{
+                "Name": "integration" + str(i),
+                "Triggers": [{
+                    "LogicalOperator": rnd.choice(["And", "Or"]),
+                    "TriggerParts": [dict(rnd.choice(triggerParts)) for _ in range(rnd.randint(1, 3))]
+                } for _ in range(rnd.randint(1, 2))]
+            } for i in range(rnd.randint(2, 8))]}
+            compiledConfigs = [
+                CompiledIntegrationConfig(customerIntegration, 0),
+                CompiledIntegrationConfig(customerIntegration, adaptiveOrdering=True),
+                CompiledIntegrationConfig(customerIntegration, useUrlDecisionTable=True)]
+            for _ in range(30):
+                url, cookies, headers = createRandomRequest(rnd)
+                expected = evaluator.getMatchedIntegrationConfig(
+                    customerIntegration, url, HttpContextProviderMock(cookies, headers))
+                for compiledConfig in compiledConfigs:
+                    actual = compiledConfig.getMatchedIntegrationConfig(
+                        url, HttpContextProviderMock(cookies, headers))
+                    assert (actual is expected)
@@ -0,0 +1,224 @@
+import unittest
+import contextlib
+import copy
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+
+from queueit_knownuserv3.__main__ import main
+from queueit_knownuserv3.config_optimizer import ConfigOptimizer
+from queueit_knownuserv3.integration_config_loader import IntegrationConfigError
+from queueit_knownuserv3.request_inputs import RequestInputs
+from test_compiled_integration_config import (corruptConfig, createRandomConfig,
+                                              createRandomRequest)
+
+
+def createTriggerPart(value, operator="Equals", urlPart="PagePath",
+                      isNegative=False, isIgnoreCase=False):
+    triggerPart = {
+        "UrlPart": urlPart,
+        "ValidatorType": "UrlValidator",
+        "Operator": operator,
+        "IsNegative": isNegative,
+        "IsIgnoreCase": isIgnoreCase
+    }
+    if (operator in ("EqualsAny", "ContainsAny")):
+        triggerPart["ValuesToCompare"] = value
+    else:
+        triggerPart["ValueToCompare"] = value
+    return triggerPart
+
+
+def createConfig(*triggerLists):
+    return {
+        "Version": 3,
+        "Integrations": [{
+            "Name": "integration" + str(index),
+            "EventId": "event" + str(index),
+            "Triggers": [{"LogicalOperator": logicalOperator, "TriggerParts": triggerParts}
+                         for logicalOperator, triggerParts in triggers]
+        } for index, triggers in enumerate(triggerLists)]
+    }
+
+
+def addRedundancy(rnd, customerIntegration):
+    for integration in customerIntegration["Integrations"]:
+        for trigger in integration["Triggers"]:
+            triggerParts = trigger["TriggerParts"]
+            for triggerPart in list(triggerParts):
+                redundancy = rnd.random()
+                if (redundancy < 0.2):
+                    triggerParts.append(copy.deepcopy(triggerPart))
+                elif (redundancy < 0.3):
+                    triggerPart = copy.deepcopy(triggerPart)
+                    triggerPart["IsNegative"] = not triggerPart["IsNegative"]
+                    triggerParts.append(triggerPart)
+                elif (redundancy < 0.4):
+                    triggerPart = copy.deepcopy(triggerPart)
+                    triggerPart["ValueToCompare"] = rnd.choice(["*", "", "e"])
+                    triggerParts.append(triggerPart)
+    return customerIntegration
+
+
+class TestConfigOptimizer(unittest.TestCase):
+    def test_optimize_mergesOrEqualsIntoEqualsAny(self):
+        result = ConfigOptimizer().optimize(createConfig([("Or", [
+            createTriggerPart("/a"), createTriggerPart("/b"), createTriggerPart("/a"),
+            createTriggerPart(["/c", "/b"], "EqualsAny")])]))
+
+        integration = result.customerIntegration["Integrations"][0]
+        assert (integration["Name"] == "integration0")
+        assert (integration["EventId"] == "event0")
+        assert (integration["Triggers"] == [{
+            "LogicalOperator": "And",
+            "TriggerParts": [createTriggerPart(["/a", "/b", "/c"], "EqualsAny")]
+        }])
+        report = result.getReport()
+        assert (report["original"]["triggerParts"] == 4)
+        assert (report["optimized"]["triggerParts"] == 1)
+        assert (report["costReduction"] > 0.5)
+
+    def test_optimize_mergesNegatedAndParts(self):
+        result = ConfigOptimizer().optimize(createConfig([("And", [
+            createTriggerPart("test.com", urlPart="HostName"),
+            createTriggerPart("/a", isNegative=True, isIgnoreCase=True),
+            createTriggerPart("/A", isNegative=True, isIgnoreCase=True),
+            createTriggerPart("/b", isNegative=True, isIgnoreCase=True)])]))
+
+        assert (result.customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"] == [
+            createTriggerPart("test.com", urlPart="HostName"),
+            createTriggerPart(["/a", "/b"], "EqualsAny", isNegative=True, isIgnoreCase=True)])
+
+    def test_optimize_dropsSubsumedContainsValues(self):
+        result = ConfigOptimizer().optimize(createConfig([("Or", [
+            createTriggerPart("/shop", "Contains"),
+            createTriggerPart(["/shop/cart", "/img"], "ContainsAny")])]))
+
+        assert (result.customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"] == [
+            createTriggerPart(["/shop", "/img"], "ContainsAny")])
+
+    def test_optimize_contradictionDropsTrigger(self):
+        result = ConfigOptimizer().optimize(createConfig(
+            [("And", [createTriggerPart("/a"), createTriggerPart("/a", isNegative=True)])],
+            [("And", [createTriggerPart("/b")])]))
+
+        assert ([integration["Name"] for integration in result.customerIntegration["Integrations"]] ==
+                ["integration1"])
+
+    def test_optimize_tautologyDropsLaterIntegrations(self):
+        result = ConfigOptimizer().optimize(createConfig(
+            [("Or", [createTriggerPart("/a"), createTriggerPart("/a", isNegative=True)]),
+             ("And", [createTriggerPart("/b")])],
+            [("And", [createTriggerPart("/b")])]))
+
+        assert (result.customerIntegration["Integrations"] == [{
+            "Name": "integration0",
+            "EventId": "event0",
+            "Triggers": [{"LogicalOperator": "And", "TriggerParts": []}]
+        }])
+
+    def test_optimize_keepsNegatedContainsStar(self):
+        customerIntegration = createConfig(
+            [("And", [createTriggerPart("*", "Contains", isNegative=True),
+                      createTriggerPart("/a")])],
+            [("And", [createTriggerPart(["*"], "ContainsAny", isNegative=True)])])
+        result = ConfigOptimizer().optimize(customerIntegration)
+
+        assert (result.customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"] ==
+                [createTriggerPart("/a")])
+        assert (result.customerIntegration["Integrations"][1]["Triggers"][0]["TriggerParts"] ==
+                [createTriggerPart(["*"], "ContainsAny", isNegative=True)])
+
+    def test_optimize_foldsSinglePartTriggers(self):
+        result = ConfigOptimizer().optimize(createConfig([
+            ("And", [createTriggerPart("/a")]),
+            ("And", [createTriggerPart("/b"), createTriggerPart("test.com", urlPart="HostName")]),
+            ("And", [createTriggerPart("/c")])]))
+
+        assert (result.customerIntegration["Integrations"][0]["Triggers"] == [{
+            "LogicalOperator": "And",
+            "TriggerParts": [createTriggerPart(["/a", "/c"], "EqualsAny")]
+        }, {
+            "LogicalOperator": "And",
+            "TriggerParts": [createTriggerPart("/b"), createTriggerPart("test.com", urlPart="HostName")]
+        }])
+
+    def test_optimize_keepsStopAtInvalidTrigger(self):
+        customerIntegration = createConfig([("And", [createTriggerPart("/a")])],
+                                           [("And", [createTriggerPart("/b")])])
+        customerIntegration["Integrations"][0]["Triggers"].append("invalid")
+        result = ConfigOptimizer().optimize(customerIntegration)
+
+        checkedCount, mismatchCount, _ = result.checkEquivalence([
+            ("https://test.com/a", RequestInputs()), ("https://test.com/b", RequestInputs())])
+        assert (checkedCount == 2)
+        assert (mismatchCount == 0)
+        assert (result.customerIntegration["Integrations"][0]["Triggers"][-1] is None)
+        assert (len(result.customerIntegration["Integrations"]) == 1)
+
+    def test_optimize_strictRejectsInvalidConfig(self):
+        with self.assertRaises(IntegrationConfigError):
+            ConfigOptimizer.loads(json.dumps({"Integrations": []}), True)
+
+    def test_checkEquivalence_reportsMismatches(self):
+        result = ConfigOptimizer().optimize(createConfig([("And", [createTriggerPart("/a")])]))
+        result.customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"][0]["ValueToCompare"] = "/b"
+
+        checkedCount, mismatchCount, mismatches = result.checkEquivalence([
+            ("https://test.com/a", RequestInputs()), ("https://test.com/c", RequestInputs())])
+        assert (checkedCount == 2)
+        assert (mismatchCount == 1)
+        assert (mismatches == [("https://test.com/a", 0, None)])
+
+    def test_createSampleRequests_unhashableUrlPart(self):
+        result = ConfigOptimizer().optimize(createConfig([("And", [createTriggerPart("/a", urlPart=["PagePath"])])]))
+
+        requests = list(ConfigOptimizer.createSampleRequests(result.originalNode, 10))
+        assert (len(requests) == 10)
+        assert (result.checkEquivalence(requests)[1] == 0)
+
+    def test_optimize_equivalentOnRandomConfigs(self):
+        for seed in range(60):
+            rnd = random.Random(seed)
+            customerIntegration = addRedundancy(rnd, createRandomConfig(rnd, rnd.randint(1, 8)))
+            if (rnd.random() < 0.3):
+                corruptConfig(rnd, customerIntegration)
+            result = ConfigOptimizer().optimize(customerIntegration)
+            requests = []
+            for _ in range(100):
+                url, cookies, headers = createRandomRequest(rnd)
+                requests.append((url, RequestInputs(cookies, headers)))
+            requests.extend(ConfigOptimizer.createSampleRequests(result.originalNode, 100, seed))
+
+            _, mismatchCount, mismatches = result.checkEquivalence(requests)
+            assert (mismatchCount == 0), (seed, mismatches)
+            assert (result.getReport()["optimized"]["cost"] <= result.getReport()["original"]["cost"])
+
+
+class TestOptimizeCommand(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.configPath = os.path.join(self.directory, "integrationconfig.json")
+        self.outputPath = os.path.join(self.directory, "optimized.json")
+        with open(self.configPath, "w") as configFile:
+            json.dump(createConfig([("Or", [createTriggerPart("/a"), createTriggerPart("/b")])]),
+                      configFile)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_optimize_writesOptimizedConfig(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            exitCode = main(["optimize", self.configPath, "-o", self.outputPath,
+                             "--samples", "200", "--strict"])
+
+        assert (exitCode == 0)
+        assert ("Equivalence check: 200 requests, 0 mismatches" in output.getvalue())
+        with open(self.outputPath) as outputFile:
+            customerIntegration = json.load(outputFile)
+        assert (customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"] ==
+                [createTriggerPart(["/a", "/b"], "EqualsAny")])
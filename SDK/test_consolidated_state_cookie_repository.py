@@ -0,0 +1,194 @@
+import unittest
+
+from queueit_knownuserv3.consolidated_state_cookie_repository import ConsolidatedStateCookieRepository
+from queueit_knownuserv3.user_in_queue_state_cookie_repository import UserInQueueStateCookieRepository
+from queueit_knownuserv3.lru_cache import LruCache
+from queueit_knownuserv3.queueit_helpers import QueueitHelpers
+from test_user_in_queue_state_cookie_repository import HttpContextProviderMock
+
+SECRET_KEY = "4e1deweb821-a82ew5-49da-acdqq0-5d3476f2068db"
+COOKIE_KEY = ConsolidatedStateCookieRepository.QUEUEIT_DATA_KEY
+
+
+class TestConsolidatedStateCookieRepository(unittest.TestCase):
+    def test_store_multipleEvents_singleCookie(self):
+        wfHandler = HttpContextProviderMock()
+        testObject = ConsolidatedStateCookieRepository(wfHandler)
+        testObject.store("event1", "queueId1", None, ".test.com", "Queue",
+                         SECRET_KEY)
+        testObject.store("event2", "queueId2", 3, ".test.com", "Idle",
+                         SECRET_KEY)
+
+        assert (list(wfHandler.cookieList.keys()) == [COOKIE_KEY])
+        cookieValue = wfHandler.cookieList[COOKIE_KEY]["value"]
+        assert (cookieValue.startswith("m~.test.com~event1.queueId1..Queue."))
+        assert (cookieValue.count("~h_") == 1)
+        assert (QueueitHelpers.urlEncode(cookieValue) == cookieValue)
+
+        testObject = ConsolidatedStateCookieRepository(wfHandler)
+        state = testObject.getState("event1", 10, SECRET_KEY, True)
+        assert (state.isValid)
+        assert (state.queueId == "queueId1")
+        assert (state.isStateExtendable())
+        state = testObject.getState("EVENT2", 10, SECRET_KEY, True)
+        assert (state.isValid)
+        assert (state.fixedCookieValidityMinutes == 3)
+        assert (state.redirectType == "Idle")
+        assert (not testObject.getState("event3", 10, SECRET_KEY, True).isFound)
+
+    def test_store_otherCookieDomain_usesEventCookie(self):
+        wfHandler = HttpContextProviderMock()
+        testObject = ConsolidatedStateCookieRepository(wfHandler)
+        testObject.store("event1", "queueId1", None, ".test.com", "Queue",
+                         SECRET_KEY)
+        testObject.store("event2", "queueId2", None, "", "Queue", SECRET_KEY)
+
+        eventCookieKey = UserInQueueStateCookieRepository.getCookieKey("event2")
+        assert (wfHandler.cookieList[COOKIE_KEY]["cookieDomain"] == ".test.com")
+        assert ("event2" not in wfHandler.cookieList[COOKIE_KEY]["value"])
+        assert (wfHandler.cookieList[eventCookieKey]["cookieDomain"] == "")
+
+        testObject = ConsolidatedStateCookieRepository(wfHandler)
+        assert (testObject.getState("event1", 10, SECRET_KEY, True).isValid)
+        assert (testObject.getState("event2", 10, SECRET_KEY, True).queueId == "queueId2")
+
+        testObject.reissueQueueCookie("event1", 10, "", SECRET_KEY)
+        assert (wfHandler.cookieList[COOKIE_KEY]["value"] is None)
+        assert (wfHandler.cookieList[COOKIE_KEY]["cookieDomain"] == ".test.com")
+        assert (wfHandler.cookieList[UserInQueueStateCookieRepository.getCookieKey(
+            "event1")]["cookieDomain"] == "")
+        testObject = ConsolidatedStateCookieRepository(wfHandler)
+        assert (testObject.getState("event1", 10, SECRET_KEY, True).queueId == "queueId1")
+
+    def test_store_maxEvents_evictsLeastRecentlyStored(self):
+        wfHandler = HttpContextProviderMock()
+        testObject = ConsolidatedStateCookieRepository(wfHandler, 2)
+        testObject.store("event1", "queueId1", None, "", "Queue", SECRET_KEY)
+        testObject.store("event2", "queueId2", None, "", "Queue", SECRET_KEY)
+        testObject.store("event1", "queueId1", None, "", "Queue", SECRET_KEY)
+        testObject.store("event3", "queueId3", None, "", "Queue", SECRET_KEY)
+
+        testObject = ConsolidatedStateCookieRepository(wfHandler, 2)
+        assert (testObject.getState("event1", 10, SECRET_KEY, True).isValid)
+        assert (not testObject.getState("event2", 10, SECRET_KEY, True).isFound)
+        assert (testObject.getState("event3", 10, SECRET_KEY, True).isValid)
+
+    def test_getState_tamperedCookie_stateIsNotValid(self):
+        wfHandler = HttpContextProviderMock()
+        ConsolidatedStateCookieRepository(wfHandler).store(
+            "event1", "queueId1", None, "", "Queue", SECRET_KEY)
+        cookieValue = wfHandler.cookieList[COOKIE_KEY]["value"]
+        wfHandler.cookieList[COOKIE_KEY]["value"] = cookieValue.replace(
+            "queueId1", "queueId2")
+
+        testObject = ConsolidatedStateCookieRepository(wfHandler)
+        state = testObject.getState("event1", 10, SECRET_KEY, True)
+        assert (state.isFound)
+        assert (not state.isValid)
+
+        testObject.cancelQueueCookie("event1", "")
+        assert (wfHandler.cookieList[COOKIE_KEY]["value"] is None)
+
+    def test_getState_expiredEvent_stateIsNotValid(self):
+        wfHandler = HttpContextProviderMock()
+        ConsolidatedStateCookieRepository(wfHandler).store(
+            "event1", "queueId1", None, "", "Queue", SECRET_KEY)
+        getCurrentTime = QueueitHelpers.getCurrentTime
+        currentTime = getCurrentTime()
+        QueueitHelpers.getCurrentTime = staticmethod(lambda: currentTime + 120)
+        try:
+            testObject = ConsolidatedStateCookieRepository(wfHandler)
+            assert (not testObject.getState("event1", 1, SECRET_KEY,
+                                            True).isValid)
+            assert (testObject.getState("event1", 1, SECRET_KEY,
+                                        False).isValid)
+        finally:
+            QueueitHelpers.getCurrentTime = staticmethod(getCurrentTime)
+
+    def test_cancelQueueCookie_keepsOtherEvents(self):
+        wfHandler = HttpContextProviderMock()
+        testObject = ConsolidatedStateCookieRepository(wfHandler)
+        testObject.store("event1", "queueId1", None, "", "Queue", SECRET_KEY)
+        testObject.store("event2", "queueId2", None, "", "Queue", SECRET_KEY)
+
+        testObject = ConsolidatedStateCookieRepository(wfHandler)
+        testObject.getState("event1", 10, SECRET_KEY, False)
+        testObject.cancelQueueCookie("event1", "")
+
+        testObject = ConsolidatedStateCookieRepository(wfHandler)
+        assert (not testObject.getState("event1", 10, SECRET_KEY, True).isFound)
+        assert (testObject.getState("event2", 10, SECRET_KEY, True).isValid)
+
+        testObject.cancelQueueCookie("event2", "")
+        assert (wfHandler.cookieList[COOKIE_KEY]["value"] is None)
+
+    def test_getState_legacyCookie_readAndMigratedOnStore(self):
+        wfHandler = HttpContextProviderMock()
+        UserInQueueStateCookieRepository(wfHandler).store(
+            "event1", "queueId1", None, "", "Queue", SECRET_KEY)
+        legacyCookieKey = UserInQueueStateCookieRepository.getCookieKey("event1")
+
+        testObject = ConsolidatedStateCookieRepository(wfHandler)
+        state = testObject.getState("event1", 10, SECRET_KEY, True)
+        assert (state.isValid)
+        assert (state.queueId == "queueId1")
+
+        testObject.store("event1", "queueId1", None, "", "Queue", SECRET_KEY)
+        assert (wfHandler.cookieList[legacyCookieKey]["value"] is None)
+        assert (ConsolidatedStateCookieRepository(wfHandler).getState(
+            "event1", 10, SECRET_KEY, True).isValid)
+
+    def test_store_unsupportedCharacters_fallsBackToEventCookie(self):
+        wfHandler = HttpContextProviderMock()
+        testObject = ConsolidatedStateCookieRepository(wfHandler)
+        testObject.store("event.1", "queueId1", None, "", "Queue", SECRET_KEY)
+
+        assert (COOKIE_KEY not in wfHandler.cookieList)
+        assert (ConsolidatedStateCookieRepository(wfHandler).getState(
+            "event.1", 10, SECRET_KEY, True).isValid)
+
+    def test_reissueQueueCookie_refreshesIssueTime(self):
+        wfHandler = HttpContextProviderMock()
+        getCurrentTime = QueueitHelpers.getCurrentTime
+        currentTime = getCurrentTime()
+        ConsolidatedStateCookieRepository(wfHandler).store(
+            "event1", "queueId1", None, "", "Queue", SECRET_KEY)
+        QueueitHelpers.getCurrentTime = staticmethod(lambda: currentTime + 50)
+        try:
+            ConsolidatedStateCookieRepository(wfHandler).reissueQueueCookie(
+                "event1", 1, "", SECRET_KEY)
+            QueueitHelpers.getCurrentTime = staticmethod(
+                lambda: currentTime + 100)
+            assert (ConsolidatedStateCookieRepository(wfHandler).getState(
+                "event1", 1, SECRET_KEY, True).isValid)
+        finally:
+            QueueitHelpers.getCurrentTime = staticmethod(getCurrentTime)
+
+    def test_getState_verifiedCookieCache_skipsVerification(self):
+        wfHandler = HttpContextProviderMock()
+        verifiedCookieCache = LruCache(10)
+        ConsolidatedStateCookieRepository(wfHandler).store(
+            "event1", "queueId1", None, "", "Queue", SECRET_KEY)
+
+        hmacSha256Base64UrlEncode = QueueitHelpers.hmacSha256Base64UrlEncode
+        hashCalls = []
+
+        def countingEncode(value, key, byteLength):
+            hashCalls.append(value)
+            return hmacSha256Base64UrlEncode(value, key, byteLength)
+
+        QueueitHelpers.hmacSha256Base64UrlEncode = staticmethod(countingEncode)
+        try:
+            for i in range(3):
+                testObject = ConsolidatedStateCookieRepository(
+                    wfHandler, None, verifiedCookieCache)
+                assert (testObject.getState("event1", 10, SECRET_KEY,
+                                            True).isValid)
+            assert (not ConsolidatedStateCookieRepository(
+                wfHandler, None, verifiedCookieCache).getState(
+                    "event1", 10, "other-secret", True).isValid)
+        finally:
+            QueueitHelpers.hmacSha256Base64UrlEncode = staticmethod(
+                hmacSha256Base64UrlEncode)
+        assert (len(hashCalls) == 2)
+        assert (verifiedCookieCache.hits == 2)
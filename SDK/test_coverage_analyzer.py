@@ -0,0 +1,170 @@
+import unittest
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+
+from queueit_knownuserv3.__main__ import main
+from queueit_knownuserv3.coverage_analyzer import CoverageAnalyzer, LogParser
+from queueit_knownuserv3.integration_config_helpers import IntegrationEvaluator
+from test_compiled_integration_config import (HttpContextProviderMock,
+                                              createRandomConfig,
+                                              createRandomRequest,
+                                              createUrlOnlyConfig)
+
+
+def createConfig():
+    customerIntegration = createUrlOnlyConfig()
+    customerIntegration["Integrations"].append({
+        "Name": "bots",
+        "Triggers": [{"LogicalOperator": "And", "TriggerParts": [{
+            "ValidatorType": "UserAgentValidator",
+            "ValueToCompare": "bot",
+            "Operator": "Contains",
+            "IsIgnoreCase": True,
+            "IsNegative": False
+        }]}]
+    })
+    return customerIntegration
+
+
+LOG_LINES = [
+    '{"url": "http://test.com/queue/1"}',
+    '{"host": "test.com", "path": "/queue", "userAgent": "Googlebot"}',
+    '127.0.0.1 - - [10/Oct/2026:13:55:36 +0000] "GET /checkout?a=1 HTTP/1.1" 200 2326 "-" "Googlebot/2.1"',
+    '127.0.0.1 - - [10/Oct/2026:13:55:36 +0000] "GET /queue HTTP/1.1" 200 2326 "-" "Mozilla/5.0"',
+    '127.0.0.1 - - [10/Oct/2026:13:55:36 +0000] "GET /other HTTP/1.1" 404 -',
+    'not a log line',
+    ''
+]
+
+
+class TestLogParser(unittest.TestCase):
+    def test_parseJsonLine(self):
+        url, requestInputs = LogParser().parseLine(json.dumps({
+            "host": "test.com", "path": "/a?b=1",
+            "headers": {"User-Agent": "ua", "Cookie": "c1=v1; c2=v2"}}))
+        assert (url == "https://test.com/a?b=1")
+        assert (requestInputs.getHeader("user-agent") == "ua")
+        assert (requestInputs.getCookie("c2") == "v2")
+
+        url, requestInputs = LogParser().parseLine(json.dumps({
+            "url": "http://test.com/", "cookies": {"c1": "v1"}, "user_agent": "ua"}))
+        assert (url == "http://test.com/")
+        assert (requestInputs.getCookie("c1") == "v1")
+        assert (requestInputs.getHeader("user-agent") == "ua")
+
+        assert (LogParser().parseLine('{"path": "/a"}') is None)
+        assert (LogParser().parseLine('{broken') is None)
+
+    def test_parseCombinedLine(self):
+        parser = LogParser(host="test.com", scheme="http")
+        url, requestInputs = parser.parseLine(LOG_LINES[2])
+        assert (url == "http://test.com/checkout?a=1")
+        assert (requestInputs.getHeader("user-agent") == "Googlebot/2.1")
+
+        url, requestInputs = parser.parseLine(LOG_LINES[4])
+        assert (url == "http://test.com/other")
+        assert (requestInputs.getHeader("user-agent") is None)
+
+        assert (LogParser().parseLine(LOG_LINES[2]) is None)
+        assert (parser.parseLine(LOG_LINES[5]) is None)
+        assert (LogParser("jsonl", "test.com").parseLine(LOG_LINES[2]) is None)
+
+
+class TestCoverageAnalyzer(unittest.TestCase):
+    def test_analyzeLines(self):
+        analyzer = CoverageAnalyzer(createConfig(), LogParser(host="test.com"))
+        report = analyzer.analyzeLines(LOG_LINES)
+        result = analyzer.toDict(report)
+
+        assert (result["lines"] == 6)
+        assert (result["parseErrors"] == 1)
+        assert (result["requests"] == 5)
+        assert ([integration["hits"] for integration in result["integrations"]] == [3, 1])
+        assert (result["unmatched"] == 1)
+        assert (result["unmatchedShare"] == 0.2)
+        assert ([triggerPart["passes"] for triggerPart in result["triggerParts"]] == [5, 3, 2])
+        assert (result["triggerParts"][2]["path"] == "Integrations[1].Triggers[0].TriggerParts[0]")
+        assert ("UserAgentValidator Contains 'bot'" in analyzer.formatReport(report))
+
+    def test_triggerPartPaths_useConfigIndices(self):
+        customerIntegration = createConfig()
+        urlPart = customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"][0]
+        customerIntegration["Integrations"][1]["Triggers"] = [
+            {"LogicalOperator": "And", "TriggerParts": [{"ValidatorType": "Bogus"}]},
+            {"LogicalOperator": "Or", "TriggerParts": [{"ValidatorType": "Bogus"}, urlPart]}
+        ]
+        analyzer = CoverageAnalyzer(customerIntegration)
+
+        assert ([path for path, _ in analyzer.triggerParts] == [
+            "Integrations[0].Triggers[0].TriggerParts[0]",
+            "Integrations[0].Triggers[0].TriggerParts[1]",
+            "Integrations[1].Triggers[1].TriggerParts[1]"])
+        assert (analyzer.triggerParts[2][1] is analyzer.triggerParts[0][1])
+
+    def test_analyzeStream_equivalentToEvaluator(self):
+        rnd = random.Random(42)
+        customerIntegration = createRandomConfig(rnd, 6)
+        evaluator = IntegrationEvaluator()
+        lines = []
+        expectedHits = [0] * 6
+        for _ in range(500):
+            url, cookies, headers = createRandomRequest(rnd)
+            lines.append(json.dumps({"url": url, "cookies": cookies, "headers": headers}))
+            matchedConfig = evaluator.getMatchedIntegrationConfig(
+                customerIntegration, url, HttpContextProviderMock(cookies, headers))
+            if (matchedConfig):
+                expectedHits[customerIntegration["Integrations"].index(matchedConfig)] += 1
+
+        analyzer = CoverageAnalyzer(customerIntegration)
+        report = analyzer.analyzeStream(iter(lines), 1, 64)
+        assert (report.matchCounts == expectedHits)
+        assert (report.unmatchedCount == 500 - sum(expectedHits))
+
+        parallelReport = analyzer.analyzeStream(iter(lines), 2, 64)
+        assert (analyzer.toDict(parallelReport) == analyzer.toDict(report))
+
+
+class TestCoverageCommand(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.configPath = os.path.join(self.directory, "integrationconfig.json")
+        self.logPath = os.path.join(self.directory, "access.log")
+        with open(self.configPath, "w") as configFile:
+            json.dump(createConfig(), configFile)
+        with open(self.logPath, "w") as logFile:
+            logFile.write("\n".join(LOG_LINES))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def runCommand(self, argv):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            exitCode = main(argv)
+        return exitCode, output.getvalue()
+
+    def test_coverage_json(self):
+        exitCode, output = self.runCommand([
+            "coverage", self.logPath, "--config", self.configPath, "--host", "test.com",
+            "--processes", "2", "--chunk-size", "2", "--json"])
+        result = json.loads(output)
+        assert (exitCode == 0)
+        assert (result["requests"] == 5)
+        assert ([integration["name"] for integration in result["integrations"]] == ["queue", "bots"])
+        assert ([integration["hits"] for integration in result["integrations"]] == [3, 1])
+
+    def test_coverage_text(self):
+        exitCode, output = self.runCommand([
+            "coverage", self.logPath, "--config", self.configPath, "--host", "test.com"])
+        assert (exitCode == 0)
+        assert ("Requests: 5, unmatched: 1 (20.00%)" in output)
+
+    def test_noCommand_printsHelp(self):
+        exitCode, output = self.runCommand([])
+        assert (exitCode == 2)
+        assert ("coverage" in output)
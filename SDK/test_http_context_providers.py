@@ -0,0 +1,112 @@
+import unittest
+import datetime
+
+from queueit_knownuserv3.http_context_providers import Asgi_Provider, Wsgi_Provider
+from queueit_knownuserv3.user_in_queue_state_cookie_repository import UserInQueueStateCookieRepository
+
+
+def createEnviron(**environ):
+    result = {
+        "REQUEST_METHOD": "GET",
+        "wsgi.url_scheme": "https",
+        "SERVER_NAME": "test.com",
+        "SERVER_PORT": "443",
+        "SCRIPT_NAME": "",
+        "PATH_INFO": "/shop/item 1",
+        "QUERY_STRING": "a=1&b=2",
+        "REMOTE_ADDR": "10.0.0.1"
+    }
+    result.update(environ)
+    return result
+
+
+def createScope(headers):
+    return {
+        "type": "http",
+        "method": "POST",
+        "scheme": "https",
+        "server": ("test.com", 8443),
+        "client": ("10.0.0.2", 51234),
+        "root_path": "",
+        "path": "/shop/item 1",
+        "query_string": b"a=1",
+        "headers": headers
+    }
+
+
+class TestWsgiProvider(unittest.TestCase):
+    def test_requestValues(self):
+        provider = Wsgi_Provider(createEnviron(
+            HTTP_USER_AGENT="Mozilla/5.0", HTTP_X_FORWARDED_FOR="1.2.3.4", CONTENT_TYPE="text/html",
+            HTTP_COOKIE="a=1; QueueITAccepted-SDFrts345E-V3_e1=EventId%3De1"))
+
+        assert (provider.getProviderName() == "wsgi")
+        assert (provider.getHeader("user-agent") == "Mozilla/5.0")
+        assert (provider.getHeader("X-Forwarded-For") == "1.2.3.4")
+        assert (provider.getHeader("content-type") == "text/html")
+        assert (provider.getHeader("via") is None)
+        assert (provider.getHeader("") is None)
+        assert (provider.getCookie("QueueITAccepted-SDFrts345E-V3_e1") == "EventId=e1")
+        assert (provider.getCookie("b") is None)
+        assert (provider.getRequestIp() == "10.0.0.1")
+        assert (provider.getRequestMethod() == "GET")
+        assert (provider.getOriginalRequestUrl() == "https://test.com/shop/item%201?a=1&b=2")
+
+    def test_getOriginalRequestUrl_hostHeader(self):
+        provider = Wsgi_Provider(createEnviron(HTTP_HOST="www.test.com:8080", QUERY_STRING=""))
+        assert (provider.getOriginalRequestUrl() == "https://www.test.com:8080/shop/item%201")
+        provider = Wsgi_Provider(createEnviron(SERVER_PORT="8443"))
+        assert (provider.getOriginalRequestUrl() == "https://test.com:8443/shop/item%201?a=1&b=2")
+
+    def test_setCookie(self):
+        provider = Wsgi_Provider(createEnviron())
+        provider.setCookie("c1", "a=b&c", datetime.datetime(2026, 10, 19, 12, 30, 0), ".test.com")
+        provider.setCookie("c2", None, -1, "")
+        provider.setCookie("c3", "x", None, None)
+
+        assert (provider.responseHeaders == [
+            ("Set-Cookie", "c1=a%3Db%26c; Expires=Mon, 19 Oct 2026 12:30:00 GMT; Domain=.test.com; Path=/"),
+            ("Set-Cookie", "c2=; Max-Age=0; Expires=Thu, 01 Jan 1970 00:00:00 GMT; Path=/"),
+            ("Set-Cookie", "c3=x; Path=/")])
+
+    def test_stateCookie_roundTrip(self):
+        provider = Wsgi_Provider(createEnviron())
+        UserInQueueStateCookieRepository(provider).store("e1", "queueId", 3, None, "queue", "secret")
+        setCookieHeader = provider.responseHeaders[0][1]
+
+        provider = Wsgi_Provider(createEnviron(HTTP_COOKIE="a=1; " + setCookieHeader.split(";")[0]))
+        state = UserInQueueStateCookieRepository(provider).getState("e1", 10, "secret", True)
+        assert (state.isValid)
+        assert (state.queueId == "queueId")
+
+
+class TestAsgiProvider(unittest.TestCase):
+    def test_requestValues(self):
+        provider = Asgi_Provider(createScope([
+            (b"user-agent", b"Mozilla/5.0"),
+            (b"cookie", b"a=1"),
+            (b"cookie", b"QueueITAccepted-SDFrts345E-V3_e1=EventId%3De1"),
+            (b"x-forwarded-for", b"1.2.3.4"),
+            (b"x-forwarded-for", b"5.6.7.8")]))
+
+        assert (provider.getProviderName() == "asgi")
+        assert (provider.getHeader("User-Agent") == "Mozilla/5.0")
+        assert (provider.getHeader("x-forwarded-for") == "1.2.3.4, 5.6.7.8")
+        assert (provider.getHeader(None) is None)
+        assert (provider.getCookie("a") == "1")
+        assert (provider.getCookie("QueueITAccepted-SDFrts345E-V3_e1") == "EventId=e1")
+        assert (provider.getRequestIp() == "10.0.0.2")
+        assert (provider.getRequestMethod() == "POST")
+        assert (provider.getOriginalRequestUrl() == "https://test.com:8443/shop/item%201?a=1")
+
+    def test_getOriginalRequestUrl_hostHeaderAndRawPath(self):
+        scope = createScope([(b"host", b"www.test.com")])
+        scope["raw_path"] = b"/shop/item%201"
+        scope["query_string"] = b""
+        assert (Asgi_Provider(scope).getOriginalRequestUrl() == "https://www.test.com/shop/item%201")
+
+    def test_setCookie(self):
+        provider = Asgi_Provider(createScope([]))
+        provider.setCookie("c1", "a b", None, "test.com")
+        assert (provider.responseHeaders == [(b"set-cookie", b"c1=a%20b; Domain=test.com; Path=/")])
+        assert (provider.getCookie("c1") is None)
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import unittest
+
+PACKAGE = "queueit_knownuserv3"
+IMPORT_TIME_CAP_MICROSECONDS = 100000
+RUNS = 3
+LAZY_MODULES = ["json", "base64", "pickle", PACKAGE + ".connector_diagnostics",
+                PACKAGE + ".compiled_config_cache"]
+
+
+def measureImport(moduleName):
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + moduleName],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stderr=subprocess.PIPE, universal_newlines=True, check=True).stderr
+    selfTimes = {}
+    for line in output.splitlines():
+        if (not line.startswith("import time:") or "|" not in line):
+            continue
+        selfTime, _, name = line[len("import time:"):].split("|")
+        if (selfTime.strip().isdigit()):
+            selfTimes[name.strip()] = int(selfTime)
+    return selfTimes
+
+
+def getPackageImportTime(selfTimes):
+    return sum(selfTime for name, selfTime in selfTimes.items()
+               if name == PACKAGE or name.startswith(PACKAGE + "."))
+
+
+class TestImportTime(unittest.TestCase):
+    def test_knownUserEngine_doesNotImportColdPaths(self):
+        selfTimes = measureImport(PACKAGE + ".known_user_engine")
+        assert (PACKAGE + ".known_user" in selfTimes)
+        for moduleName in LAZY_MODULES:
+            assert (moduleName not in selfTimes), moduleName
+
+    def test_knownUser_doesNotImportColdPaths(self):
+        selfTimes = measureImport(PACKAGE + ".known_user")
+        for moduleName in LAZY_MODULES:
+            assert (moduleName not in selfTimes), moduleName
+
+    def test_packageImportTime_isCapped(self):
+        importTime = min(
+            getPackageImportTime(measureImport(PACKAGE + ".known_user_engine"))
+            for _ in range(RUNS))
+        assert (importTime < IMPORT_TIME_CAP_MICROSECONDS), importTime
@@ -0,0 +1,219 @@
+import unittest
+import json
+
+from queueit_knownuserv3.compiled_integration_config import CompiledIntegrationConfig
+from queueit_knownuserv3.integration_config_loader import ConfigInterner, IntegrationConfigLoader, IntegrationConfigError
+from queueit_knownuserv3.known_user_engine import KnownUserEngine
+from queueit_knownuserv3.models import KnownUserError
+from test_compiled_integration_config import HttpContextProviderMock
+
+
+def createConfig():
+    return {
+        "Version": 3,
+        "Integrations": [{
+            "Name": "integration1",
+            "ActionType": "Queue",
+            "Triggers": [{
+                "LogicalOperator": "Or",
+                "TriggerParts": [{
+                    "ValidatorType": "UrlValidator",
+                    "UrlPart": "PagePath",
+                    "Operator": "Contains",
+                    "ValueToCompare": "/queue",
+                    "IsNegative": False,
+                    "IsIgnoreCase": True
+                }, {
+                    "ValidatorType": "CookieValidator",
+                    "CookieName": "c1",
+                    "Operator": "EqualsAny",
+                    "ValuesToCompare": ["v1", "v2"],
+                    "IsNegative": True,
+                    "IsIgnoreCase": False
+                }]
+            }]
+        }]
+    }
+
+
+def getLoadError(customerIntegration):
+    try:
+        IntegrationConfigLoader.load(customerIntegration)
+    except IntegrationConfigError as err:
+        return err
+    return None
+
+
+class TestIntegrationConfigLoader(unittest.TestCase):
+    def test_load_normalizesConfig(self):
+        customerIntegration = createConfig()
+        configNode = IntegrationConfigLoader.load(customerIntegration)
+
+        assert (configNode.version == 3)
+        assert (configNode.noMatchResult is None)
+        assert (configNode.droppedParts == ())
+        integration = configNode.integrations[0]
+        assert (integration.config is customerIntegration["Integrations"][0])
+        trigger = integration.triggers[0]
+        assert (trigger.isOrOperator)
+        urlPart, cookiePart = trigger.triggerParts
+        assert (urlPart.urlPart == "PagePath")
+        assert (urlPart.valueToCompare == "/queue")
+        assert (urlPart.valuesToCompare == ())
+        assert (cookiePart.inputName == "c1")
+        assert (cookiePart.valuesToCompare == ("v1", "v2"))
+        assert (cookiePart.valueToCompare == "")
+        assert (cookiePart.isNegative is True)
+
+    def test_load_strict_reportsPath(self):
+        customerIntegration = createConfig()
+        customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"][1]["Operator"] = "StartsWith"
+        err = getLoadError(customerIntegration)
+        assert (err.path == "Integrations[0].Triggers[0].TriggerParts[1].Operator")
+        assert (err.message.startswith(
+            "Integrations[0].Triggers[0].TriggerParts[1].Operator must be one of"))
+        assert (isinstance(err, KnownUserError))
+
+        customerIntegration = createConfig()
+        del customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"][0]["UrlPart"]
+        assert (getLoadError(customerIntegration).path ==
+                "Integrations[0].Triggers[0].TriggerParts[0].UrlPart")
+
+        customerIntegration = createConfig()
+        customerIntegration["Integrations"][0]["Triggers"][0]["LogicalOperator"] = "and"
+        assert (getLoadError(customerIntegration).path ==
+                "Integrations[0].Triggers[0].LogicalOperator")
+
+        customerIntegration = createConfig()
+        customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"][1]["ValuesToCompare"] = ["v1", 2]
+        assert (getLoadError(customerIntegration).path ==
+                "Integrations[0].Triggers[0].TriggerParts[1].ValuesToCompare")
+
+        customerIntegration = createConfig()
+        customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"][0]["IsNegative"] = "false"
+        assert (getLoadError(customerIntegration).path ==
+                "Integrations[0].Triggers[0].TriggerParts[0].IsNegative")
+
+        customerIntegration = createConfig()
+        customerIntegration["Integrations"].append({"Name": "integration2"})
+        assert (getLoadError(customerIntegration).path ==
+                "Integrations[1].Triggers")
+
+        assert (getLoadError({"Integrations": []}).path == "Version")
+        assert (getLoadError([]).path == "$")
+
+    def test_loads_invalidJson(self):
+        errorThrown = False
+        try:
+            IntegrationConfigLoader.loads("{")
+        except IntegrationConfigError as err:
+            errorThrown = err.path == "$"
+        assert (errorThrown)
+
+    def test_load_lenient_dropsMalformedParts(self):
+        customerIntegration = createConfig()
+        triggerParts = customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"]
+        triggerParts[1]["Operator"] = "StartsWith"
+        customerIntegration["Integrations"][0]["Triggers"].append({
+            "LogicalOperator": "And",
+            "TriggerParts": [triggerParts[0], {"ValidatorType": "IpValidator"}]
+        })
+
+        configNode = IntegrationConfigLoader.load(customerIntegration, False)
+
+        triggers = configNode.integrations[0].triggers
+        assert (len(triggers) == 1)
+        assert (len(triggers[0].triggerParts) == 1)
+        assert (configNode.droppedParts == (
+            "Integrations[0].Triggers[0].TriggerParts[1].Operator",
+            "Integrations[0].Triggers[1].TriggerParts[1].ValidatorType"))
+
+    def test_load_lenient_invalidTriggerEndsEvaluation(self):
+        customerIntegration = createConfig()
+        customerIntegration["Integrations"][0]["Triggers"].append("invalid")
+        customerIntegration["Integrations"].append(createConfig()["Integrations"][0])
+
+        configNode = IntegrationConfigLoader.load(customerIntegration, False)
+
+        assert (len(configNode.integrations) == 1)
+        assert (configNode.noMatchResult is False)
+        assert (configNode.droppedParts == ("Integrations[0].Triggers[1]",
+                                            "Integrations[1]"))
+
+    def test_knownUserEngine_strictConfig_rejectsMalformedConfig(self):
+        customerIntegration = createConfig()
+        customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"][0]["ValidatorType"] = "IpValidator"
+        configString = json.dumps(customerIntegration)
+
+        errorThrown = False
+        try:
+            KnownUserEngine("customerid", "secretkey", configString,
+                            strictConfig=True)
+        except IntegrationConfigError as err:
+            errorThrown = err.path == "Integrations[0].Triggers[0].TriggerParts[0].ValidatorType"
+        assert (errorThrown)
+
+        engine = KnownUserEngine("customerid", "secretkey", configString)
+        assert (len(engine.compiledConfig.configNode.droppedParts) == 1)
+
+    def test_load_sharesIdenticalNodes(self):
+        customerIntegration = createConfig()
+        integration2 = createConfig()["Integrations"][0]
+        integration2["Name"] = "integration2"
+        integration2["Triggers"].append({
+            "LogicalOperator": "And",
+            "TriggerParts": [dict(integration2["Triggers"][0]["TriggerParts"][1],
+                                  IsNegative=False)]
+        })
+        customerIntegration["Integrations"].append(integration2)
+
+        configNode = IntegrationConfigLoader.load(customerIntegration)
+
+        integration1, integration2 = configNode.integrations
+        assert (integration1.config is not integration2.config)
+        assert (integration1.triggers[0] is integration2.triggers[0])
+        cookiePart = integration1.triggers[0].triggerParts[1]
+        otherCookiePart = integration2.triggers[1].triggerParts[0]
+        assert (cookiePart is not otherCookiePart)
+        assert (cookiePart.isNegative and not otherCookiePart.isNegative)
+        assert (cookiePart.valuesToCompare[0] is otherCookiePart.valuesToCompare[0])
+
+    def test_load_lenient_unhashableUrlPart(self):
+        customerIntegration = createConfig()
+        customerIntegration["Integrations"].append(createConfig()["Integrations"][0])
+        for integration in customerIntegration["Integrations"]:
+            integration["Triggers"][0]["TriggerParts"][0]["UrlPart"] = ["PagePath"]
+
+        configNode = IntegrationConfigLoader.load(customerIntegration, False)
+
+        integration1, integration2 = configNode.integrations
+        assert (integration1.triggers[0].triggerParts[0].urlPart == ["PagePath"])
+        assert (integration1.triggers[0] is not integration2.triggers[0])
+
+    def test_internConfig(self):
+        customerIntegration = createConfig()
+        customerIntegration["Integrations"].append(createConfig()["Integrations"][0])
+        customerIntegration["Integrations"][0]["Flags"] = [1, True, 1.0]
+
+        internedConfig = ConfigInterner().internConfig(customerIntegration)
+
+        assert (internedConfig == customerIntegration)
+        assert (internedConfig is not customerIntegration)
+        integration1, integration2 = internedConfig["Integrations"]
+        assert (integration1 is not integration2)
+        assert (integration1["Triggers"] is integration2["Triggers"])
+        assert ([type(flag) for flag in integration1["Flags"]] == [int, bool, float])
+        assert (ConfigInterner().internConfig([]) == [])
+
+    def test_compile_internedConfig_matchesEachIntegration(self):
+        customerIntegration = createConfig()
+        customerIntegration["Integrations"].append(createConfig()["Integrations"][0])
+        customerIntegration["Integrations"][1]["Name"] = "integration2"
+        customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"][0]["ValueToCompare"] = "/other"
+
+        compiledConfig = CompiledIntegrationConfig.compile(json.dumps(customerIntegration))
+
+        matchedConfig = compiledConfig.getMatchedIntegrationConfig(
+            "https://example.com/queue", HttpContextProviderMock({"c1": "v1"}))
+        assert (matchedConfig["Name"] == "integration2")
+        assert (matchedConfig is compiledConfig.customerIntegration["Integrations"][1])
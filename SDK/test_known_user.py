@@ -1957,7 +1957,7 @@ class TestKnownUser(unittest.TestCase):
             KnownUser.cancelRequestByLocalConfig("targetUrl", "token", cancelConfig,
                                                           "customerId", "secretKey", HttpContextProviderMock())
         except Exception as e:
-            assert (e.message == "Exception")
+            assert (str(e) == "Exception")
 
         assert (len(userInQueueService.validateCancelRequestCalls) > 0)
         assert (len(hcpMock.setCookies) == 0)
@@ -1990,7 +1990,7 @@ class TestKnownUser(unittest.TestCase):
             KnownUser.resolveQueueRequestByLocalConfig("target", "token", queueConfig, "id", "key",
                                 HttpContextProviderMock())
         except Exception as e:
-            assert (e.message == "Exception")
+            assert (str(e) == "Exception")
 
         assert (len(userInQueueService.validateQueueRequestCalls) > 0)
         assert (len(hcpMock.setCookies) == 0)
@@ -2053,7 +2053,7 @@ class TestKnownUser(unittest.TestCase):
             KnownUser.validateRequestByIntegrationConfig("http://test.com?event1=true", "queueIttoken",
                                     integrationConfigJson, "customerid", "secretkey", HttpContextProviderMock())
         except Exception as e:
-            assert (e.message == "Exception")
+            assert (str(e) == "Exception")
 
         assert (len(userInQueueService.validateCancelRequestCalls) > 0)
         assert (len(hcpMock.setCookies) == 0)
\ No newline at end of file
@@ -0,0 +1,251 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+
+from queueit_knownuserv3.known_user_engine import KnownUserEngine
+from queueit_knownuserv3.known_user import KnownUser
+from queueit_knownuserv3.bypass_rules import BypassRules
+from queueit_knownuserv3.consolidated_state_cookie_repository import ConsolidatedStateCookieRepository
+from queueit_knownuserv3.user_in_queue_state_cookie_repository import UserInQueueStateCookieRepository
+from queueit_knownuserv3.models import ActionTypes, KnownUserError
+from queueit_knownuserv3.http_context_providers import HttpContextProvider
+from queueit_knownuserv3.queueit_helpers import QueueitHelpers
+from test_user_in_queue_service import TestHelper
+
+
+class HttpContextProviderMock(HttpContextProvider):
+    def __init__(self):
+        self.headers = {}
+        self.cookies = {}
+        self.setCookies = {}
+        self.method = "GET"
+        self.cookieReads = 0
+
+    def getProviderName(self):
+        return "mock-connector"
+
+    def getHeader(self, headerName):
+        return self.headers.get(headerName)
+
+    def getCookie(self, cookieName):
+        self.cookieReads += 1
+        return self.cookies.get(cookieName)
+
+    def setCookie(self, name, value, expire, domain):
+        self.setCookies[name] = {
+            "value": value,
+            "expire": expire,
+            "domain": domain
+        }
+
+    def getRequestMethod(self):
+        return self.method
+
+    def getRequestIp(self):
+        return "127.0.0.1"
+
+    def getOriginalRequestUrl(self):
+        return ""
+
+
+def createIntegrationConfigString():
+    return json.dumps({
+        "Version": 3,
+        "Integrations": [{
+            "Name": "event1action",
+            "ActionType": "Queue",
+            "EventId": "event1",
+            "CookieDomain": ".test.com",
+            "LayoutName": "Christmas Layout by Queue-it",
+            "Culture": "",
+            "ExtendCookieValidity": True,
+            "CookieValidityMinute": 20,
+            "QueueDomain": "knownusertest.queue-it.net",
+            "RedirectLogic": "AllowTParameter",
+            "ForcedTargetUrl": "",
+            "Triggers": [{
+                "TriggerParts": [{
+                    "Operator": "Contains",
+                    "ValueToCompare": "test.com",
+                    "UrlPart": "PageUrl",
+                    "ValidatorType": "UrlValidator",
+                    "IsNegative": False,
+                    "IsIgnoreCase": True
+                }],
+                "LogicalOperator": "And"
+            }]
+        }]
+    })
+
+
+class TestKnownUserEngine(unittest.TestCase):
+    def setUp(self):
+        KnownUser.userInQueueService = None
+
+    def test_validateRequestByIntegrationConfig_matched_redirectsToQueue(self):
+        engine = KnownUserEngine("customerid", "secretkey",
+                                 createIntegrationConfigString())
+
+        result = engine.validateRequestByIntegrationConfig(
+            "http://test.com/page", None, HttpContextProviderMock())
+
+        assert (result.actionType == ActionTypes.QUEUE)
+        assert (result.eventId == "event1")
+        assert (result.doRedirect())
+        assert (result.redirectUrl.startswith(
+            "https://knownusertest.queue-it.net/?c=customerid&e=event1"))
+
+    def test_validateRequestByIntegrationConfig_notMatched(self):
+        engine = KnownUserEngine("customerid", "secretkey",
+                                 createIntegrationConfigString())
+
+        result = engine.validateRequestByIntegrationConfig(
+            "http://other.com/page", None, HttpContextProviderMock())
+
+        assert (result.actionType is None)
+        assert (not result.doRedirect())
+
+    def test_validateRequestByIntegrationConfig_noConfig(self):
+        engine = KnownUserEngine("customerid", "secretkey")
+        errorThrown = False
+        try:
+            engine.validateRequestByIntegrationConfig(
+                "http://test.com/page", None, HttpContextProviderMock())
+        except KnownUserError as err:
+            errorThrown = err.message.startswith(
+                "integrationsConfigString can not be none or empty")
+        assert (errorThrown)
+
+    def test_validateRequestByIntegrationConfig_bypassed_shortCircuits(self):
+        bypassRules = BypassRules.forStaticAssets(methods=["OPTIONS"])
+        engine = KnownUserEngine("customerid", "secretkey",
+                                 createIntegrationConfigString(), bypassRules)
+        hcpMock = HttpContextProviderMock()
+
+        result = engine.validateRequestByIntegrationConfig(
+            "http://test.com/img/logo.png?v=2", "e_event1~rt_debug~h_x",
+            hcpMock)
+        assert (result.actionType is None)
+        assert (not result.doRedirect())
+
+        hcpMock.method = "OPTIONS"
+        result = engine.validateRequestByIntegrationConfig(
+            "http://test.com/page", None, hcpMock)
+        assert (result.actionType is None)
+
+        assert (hcpMock.cookieReads == 0)
+        assert (len(hcpMock.setCookies) == 0)
+        assert (bypassRules.bypassedCount == 2)
+
+        hcpMock.method = "GET"
+        result = engine.validateRequestByIntegrationConfig(
+            "http://test.com/page", None, hcpMock)
+        assert (result.actionType == ActionTypes.QUEUE)
+        assert (bypassRules.bypassedCount == 2)
+
+    def test_resolveQueueRequestByLocalConfig_bypassed(self):
+        engine = KnownUserEngine("customerid", "secretkey",
+                                 bypassRules=BypassRules(pathPrefixes=["/static/"]))
+        hcpMock = HttpContextProviderMock()
+
+        result = engine.resolveQueueRequestByLocalConfig(
+            "http://test.com/static/app.js", None, None, hcpMock)
+
+        assert (result.actionType is None)
+        assert (hcpMock.cookieReads == 0)
+
+    def test_updateIntegrationConfig_replacesCompiledConfig(self):
+        engine = KnownUserEngine("customerid", "secretkey",
+                                 createIntegrationConfigString())
+        engine.updateIntegrationConfig(
+            json.dumps({"Version": 4, "Integrations": []}))
+
+        result = engine.validateRequestByIntegrationConfig(
+            "http://test.com/page", None, HttpContextProviderMock())
+
+        assert (engine.compiledConfig.version == 4)
+        assert (result.actionType is None)
+
+    def test_optimizeConfig_matchesSameIntegration(self):
+        engine = KnownUserEngine("customerid", "secretkey",
+                                 createIntegrationConfigString(),
+                                 optimizeConfig=True)
+
+        result = engine.validateRequestByIntegrationConfig(
+            "http://test.com/page", None, HttpContextProviderMock())
+
+        assert (result.actionType == ActionTypes.QUEUE)
+        assert (result.eventId == "event1")
+
+    def test_loadIntegrationConfigFile_usesCompiledCache(self):
+        directory = tempfile.mkdtemp()
+        try:
+            configPath = os.path.join(directory, "integrationconfig.json")
+            with open(configPath, "w") as configFile:
+                configFile.write(createIntegrationConfigString())
+            KnownUserEngine("customerid", "secretkey").loadIntegrationConfigFile(configPath)
+            assert (os.path.exists(configPath + ".compiled"))
+
+            engine = KnownUserEngine("customerid", "secretkey")
+            engine.loadIntegrationConfigFile(configPath)
+            result = engine.validateRequestByIntegrationConfig(
+                "http://test.com/page", None, HttpContextProviderMock())
+            assert (result.actionType == ActionTypes.QUEUE)
+            assert (result.eventId == "event1")
+        finally:
+            shutil.rmtree(directory)
+
+    def test_consolidatedCookie_integrationsWithOtherCookieDomains(self):
+        customerIntegration = json.loads(createIntegrationConfigString())
+        integration = customerIntegration["Integrations"][0]
+        integration["Triggers"][0]["TriggerParts"][0]["ValueToCompare"] = "/one"
+        otherIntegration = json.loads(json.dumps(integration))
+        otherIntegration.update({"Name": "event2action", "EventId": "event2",
+                                 "CookieDomain": ""})
+        otherIntegration["Triggers"][0]["TriggerParts"][0]["ValueToCompare"] = "/two"
+        customerIntegration["Integrations"].append(otherIntegration)
+        engine = KnownUserEngine("customerid", "secretkey",
+                                 json.dumps(customerIntegration),
+                                 useConsolidatedCookie=True)
+        hcpMock = HttpContextProviderMock()
+        timestamp = str(QueueitHelpers.getCurrentTime() + 180)
+
+        for eventId, url in [("event1", "http://test.com/one"),
+                             ("event2", "http://test.com/two")]:
+            queueitToken = TestHelper.generateHash(
+                eventId, "queueid" + eventId, timestamp, "true", None, "queue",
+                "secretkey")
+            result = engine.validateRequestByIntegrationConfig(url, queueitToken, hcpMock)
+            assert (not result.doRedirect())
+            hcpMock.cookies.update((name, cookie["value"])
+                                   for name, cookie in hcpMock.setCookies.items())
+
+        consolidatedCookie = hcpMock.setCookies[ConsolidatedStateCookieRepository.QUEUEIT_DATA_KEY]
+        assert (consolidatedCookie["domain"] == ".test.com")
+        assert ("event2" not in consolidatedCookie["value"])
+        assert (hcpMock.setCookies[UserInQueueStateCookieRepository.getCookieKey(
+            "event2")]["domain"] == "")
+
+        for eventId, url in [("event1", "http://test.com/one"),
+                             ("event2", "http://test.com/two")]:
+            result = engine.validateRequestByIntegrationConfig(url, None, hcpMock)
+            assert (not result.doRedirect())
+            assert (result.queueId == "queueid" + eventId)
+        assert (hcpMock.setCookies[ConsolidatedStateCookieRepository.QUEUEIT_DATA_KEY][
+            "domain"] == ".test.com")
+
+    def test_createStateCookieRepository_consolidatedCookie(self):
+        engine = KnownUserEngine("customerid", "secretkey",
+                                 useConsolidatedCookie=True)
+        repository = engine.createStateCookieRepository(
+            HttpContextProviderMock())
+
+        assert (isinstance(repository, ConsolidatedStateCookieRepository))
+        assert (repository.verifiedCookieCache is engine.verifiedCookieCache)
+        assert (isinstance(engine.createStateCookieRepository(
+            HttpContextProviderMock()), ConsolidatedStateCookieRepository))
+        assert (isinstance(
+            KnownUserEngine("customerid", "secretkey").createStateCookieRepository(
+                HttpContextProviderMock()), UserInQueueStateCookieRepository))
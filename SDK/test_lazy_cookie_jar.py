@@ -0,0 +1,47 @@
+import unittest
+import random
+
+from queueit_knownuserv3.lazy_cookie_jar import LazyCookieJar
+
+
+def parseCookieHeader(cookieHeader):
+    cookies = {}
+    for cookie in cookieHeader.split(";"):
+        key, separator, value = cookie.partition("=")
+        if (separator):
+            cookies.setdefault(key.strip(), value.strip())
+    return cookies
+
+
+class TestLazyCookieJar(unittest.TestCase):
+    def test_get(self):
+        jar = LazyCookieJar("a=1; QueueITAccepted-SDFrts345E-V3_e1=EventId%3De1%26QueueId%3Dq;b = 2 ")
+        assert (jar.get("QueueITAccepted-SDFrts345E-V3_e1") == "EventId=e1&QueueId=q")
+        assert (jar.getRaw("QueueITAccepted-SDFrts345E-V3_e1") == "EventId%3De1%26QueueId%3Dq")
+        assert (jar.get("a") == "1")
+        assert (jar.get("b") == "2")
+        assert (jar.get("c") is None)
+
+    def test_get_matchesWholeNamesOnly(self):
+        jar = LazyCookieJar("xa=1; a b=2; c=a=3; a=4")
+        assert (jar.get("a") == "4")
+        assert (jar.get("b") is None)
+        assert (jar.get("c") == "a=3")
+
+    def test_get_firstCookieWins(self):
+        assert (LazyCookieJar("a=1; a=2").get("a") == "1")
+
+    def test_get_emptyHeader(self):
+        assert (LazyCookieJar(None).get("a") is None)
+        assert (LazyCookieJar("").get("") is None)
+        assert (LazyCookieJar("a=").get("a") == "")
+
+    def test_get_equivalentToFullParse(self):
+        rnd = random.Random(45)
+        pieces = ["a", "b", "ab", "=", ";", " ", "\t", "1", "%3D"]
+        for _ in range(5000):
+            cookieHeader = "".join(rnd.choice(pieces) for _ in range(rnd.randint(0, 15)))
+            cookies = parseCookieHeader(cookieHeader)
+            jar = LazyCookieJar(cookieHeader)
+            for name in ["a", "b", "ab"]:
+                assert (jar.getRaw(name) == cookies.get(name)), (cookieHeader, name)
@@ -0,0 +1,156 @@
+import unittest
+import http.client
+import io
+import json
+import sys
+
+from queueit_knownuserv3 import __main__
+from queueit_knownuserv3.known_user import KnownUser
+from queueit_knownuserv3.known_user_engine import KnownUserEngine
+from queueit_knownuserv3.local_queue import LocalQueueServer, LocalTokenIssuer
+from queueit_knownuserv3.models import ActionTypes, KnownUserError
+from queueit_knownuserv3.queue_url_params import QueueUrlParams
+from queueit_knownuserv3.queueit_helpers import QueueitHelpers
+from queueit_knownuserv3.request_url import RequestUrl
+from test_known_user_engine import HttpContextProviderMock, createIntegrationConfigString
+
+
+def getLocation(server, redirectUrl):
+    url = RequestUrl(LocalQueueServer.getLocalUrl(redirectUrl))
+    connection = http.client.HTTPConnection(server.getQueueDomain())
+    try:
+        connection.request("GET", url[url.index("/", len("http://")):])
+        response = connection.getresponse()
+        response.read()
+        return response.status, response.getheader("Location")
+    finally:
+        connection.close()
+
+
+class TestLocalQueue(unittest.TestCase):
+    def setUp(self):
+        KnownUser.userInQueueService = None
+
+    def test_createToken_parsedAndAccepted(self):
+        tokenIssuer = LocalTokenIssuer("secretkey", cookieValidityMinutes=5)
+        queueitToken = tokenIssuer.createToken("event1", "queueid", 2000000000)
+
+        assert (queueitToken.startswith(
+            "e_event1~q_queueid~ts_2000000000~ce_true~cv_5~rt_queue~h_"))
+        queueParams = QueueUrlParams.extractQueueParams(queueitToken)
+        assert (queueParams.hashCode == QueueitHelpers.hmacSha256Encode(
+            queueParams.queueITTokenWithoutHash, "secretkey"))
+        assert (queueParams.extendableCookie and queueParams.cookieValidityMinutes == 5)
+
+        engine = KnownUserEngine("customerid", "secretkey", createIntegrationConfigString())
+        hcpMock = HttpContextProviderMock()
+        result = engine.validateRequestByIntegrationConfig(
+            "http://test.com/page", tokenIssuer.createToken("event1"), hcpMock)
+        assert (result.actionType == ActionTypes.QUEUE and not result.doRedirect())
+        assert (len(hcpMock.setCookies) == 1)
+
+        result = engine.validateRequestByIntegrationConfig(
+            "http://test.com/page", LocalTokenIssuer("othersecret").createToken("event1"),
+            HttpContextProviderMock())
+        assert ("/error/hash/" in result.redirectUrl)
+
+    def test_createTokens(self):
+        tokenIssuer = LocalTokenIssuer("secretkey", redirectType=None, extendableCookie=False)
+        queueitTokens = list(tokenIssuer.createTokens("event1", 20))
+
+        assert (len(set(queueitTokens)) == 20)
+        assert (tokenIssuer.issuedCount == 20)
+        queueParams = [QueueUrlParams.extractQueueParams(token) for token in queueitTokens]
+        assert (len(set(params.timeStamp for params in queueParams)) == 1)
+        assert (not any(params.extendableCookie or params.redirectType for params in queueParams))
+
+    def test_addToken(self):
+        assert (LocalTokenIssuer.addToken("http://test.com/page", "e_1~h_x") ==
+                "http://test.com/page?queueittoken=e_1~h_x")
+        assert (LocalTokenIssuer.addToken("http://test.com/page?a=1#top", "e_1~h_x") ==
+                "http://test.com/page?a=1&queueittoken=e_1~h_x#top")
+
+    def test_server_redirectTokenCookieFlow(self):
+        server = LocalQueueServer(LocalTokenIssuer("secretkey")).start()
+        try:
+            customerIntegration = json.loads(createIntegrationConfigString())
+            customerIntegration["Integrations"][0]["QueueDomain"] = server.getQueueDomain()
+            engine = KnownUserEngine("customerid", "secretkey", json.dumps(customerIntegration))
+
+            hcpMock = HttpContextProviderMock()
+            result = engine.validateRequestByIntegrationConfig(
+                "http://test.com/page?a=1", None, hcpMock)
+            assert (result.doRedirect())
+
+            status, location = getLocation(server, result.redirectUrl)
+            assert (status == 302)
+            requestUrl = RequestUrl.parse(location)
+            assert (requestUrl == "http://test.com/page?a=1")
+            result = engine.validateRequestByIntegrationConfig(
+                requestUrl, requestUrl.queueitToken, hcpMock)
+            assert (result.actionType == ActionTypes.QUEUE and not result.doRedirect())
+            assert (result.queueId is not None)
+
+            hcpMock.cookies = dict((name, cookie["value"])
+                                   for name, cookie in hcpMock.setCookies.items())
+            steadyResult = engine.validateRequestByIntegrationConfig(
+                "http://test.com/page", None, hcpMock)
+            assert (not steadyResult.doRedirect())
+            assert (steadyResult.queueId == result.queueId)
+
+            assert (getLocation(server, "http://localhost/?c=customerid")[0] == 400)
+            assert (server.tokenIssuer.issuedCount == 1)
+        finally:
+            server.stop()
+
+    def test_server_refusesRemoteHostByDefault(self):
+        assert (LocalQueueServer.isLoopbackHost("127.0.0.1"))
+        assert (LocalQueueServer.isLoopbackHost("::1"))
+        assert (LocalQueueServer.isLoopbackHost("localhost"))
+        assert (not LocalQueueServer.isLoopbackHost("0.0.0.0"))
+        assert (not LocalQueueServer.isLoopbackHost("queue.example.com"))
+
+        errorThrown = False
+        try:
+            LocalQueueServer(LocalTokenIssuer("secretkey"), "0.0.0.0")
+        except KnownUserError:
+            errorThrown = True
+        assert (errorThrown)
+
+        stderr = sys.stderr
+        sys.stderr = io.StringIO()
+        try:
+            exitCode = __main__.main(["queue-server", "--host", "0.0.0.0",
+                                      "--secret-key", "secretkey"])
+            output = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+        assert (exitCode == 2)
+        assert ("--allow-remote" in output)
+
+    def test_server_targetHosts(self):
+        server = LocalQueueServer(LocalTokenIssuer("secretkey"),
+                                  targetHosts=["Test.com"]).start()
+        try:
+            queueUrl = "http://{}/?c=customerid&e=event1&t=".format(server.getQueueDomain())
+            status, location = getLocation(server, queueUrl + "http%3A%2F%2Ftest.com%2Fpage")
+            assert (status == 302 and location.startswith("http://test.com/page?queueittoken="))
+            assert (getLocation(server, queueUrl + "http%3A%2F%2Fother.com%2F")[0] == 400)
+            assert (getLocation(server, queueUrl + "javascript%3Aalert(1)")[0] == 400)
+            assert (server.tokenIssuer.issuedCount == 1)
+        finally:
+            server.stop()
+
+    def test_main_token(self):
+        stdout = sys.stdout
+        sys.stdout = io.StringIO()
+        try:
+            exitCode = __main__.main(["token", "--event-id", "event1", "--count", "3",
+                                      "--secret-key", "secretkey"])
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        assert (exitCode == 0)
+        queueitTokens = output.split()
+        assert (len(queueitTokens) == 3)
+        assert (all(token.startswith("e_event1~q_") for token in queueitTokens))
@@ -0,0 +1,146 @@
+import gc
+import threading
+import unittest
+
+from queueit_knownuserv3.lru_cache import CacheBudget, LruCache
+
+
+class TestLruCache(unittest.TestCase):
+    def test_get_missingKey_returnsDefault(self):
+        cache = LruCache(2)
+        assert (cache.get("a") is None)
+        assert (cache.get("a", "default") == "default")
+        assert (cache.misses == 2)
+
+    def test_put_evictsLeastRecentlyUsed(self):
+        cache = LruCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert (cache.get("a") == 1)
+        cache.put("c", 3)
+
+        assert ("a" in cache)
+        assert ("b" not in cache)
+        assert ("c" in cache)
+        assert (len(cache) == 2)
+
+    def test_concurrentAccess_keepsSizeBounded(self):
+        budget = CacheBudget(50)
+        caches = [LruCache(40, budget, "tenant" + str(i)) for i in range(2)]
+
+        def worker(seed):
+            for i in range(2000):
+                cache = caches[(seed + i) % 2]
+                key = (seed * i) % 97
+                if (cache.get(key) is None):
+                    cache.put(key, i)
+
+        threads = [threading.Thread(target=worker, args=(seed,))
+                   for seed in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert (all(len(cache) <= 40 for cache in caches))
+        assert (budget.totalUsage == sum(len(cache) for cache in caches))
+        # Concurrent inserts can each pass the budget check once.
+        assert (budget.totalUsage <= 50 + len(threads))
+
+    def test_clear(self):
+        cache = LruCache(2)
+        cache.put("a", 1)
+        cache.get("a")
+        cache.clear()
+        assert (len(cache) == 0)
+        assert (cache.hits == 0)
+
+
+class TestCacheBudget(unittest.TestCase):
+    def test_admit_capsTotalUsage(self):
+        budget = CacheBudget(4)
+        cache = LruCache(10, budget, "tenant1")
+        for i in range(6):
+            cache.put(i, i)
+
+        assert (len(cache) == 4)
+        assert (budget.totalUsage == 4)
+        assert (budget.getUsage("tenant1") == 4)
+        assert (0 not in cache)
+        assert (5 in cache)
+
+    def test_admit_spikingOwnerEvictsOnlyItsOwnEntries(self):
+        budget = CacheBudget(10)
+        quietCache = LruCache(100, budget, "quiet")
+        busyCache = LruCache(100, budget, "busy")
+        for i in range(4):
+            quietCache.put(i, i)
+        for i in range(1000):
+            busyCache.put(i, i)
+
+        assert (len(quietCache) == 4)
+        assert (len(busyCache) == 6)
+        assert (budget.totalUsage == 10)
+        assert (budget.evictions == 994)
+
+    def test_admit_ownerBelowFairShareEvictsLargestOwner(self):
+        budget = CacheBudget(10)
+        busyCache = LruCache(100, budget, "busy")
+        quietCache = LruCache(100, budget, "quiet")
+        for i in range(10):
+            busyCache.put(i, i)
+        for i in range(3):
+            quietCache.put(i, i)
+
+        assert (len(quietCache) == 3)
+        assert (len(busyCache) == 7)
+        assert (0 not in busyCache)
+        assert (budget.totalUsage == 10)
+
+    def test_admit_sharesUsageAcrossCachesOfOneOwner(self):
+        budget = CacheBudget(4)
+        firstCache = LruCache(10, budget, "tenant1")
+        secondCache = LruCache(10, budget, "tenant1")
+        for i in range(3):
+            firstCache.put(i, i)
+        for i in range(3):
+            secondCache.put(i, i)
+
+        assert (len(firstCache) + len(secondCache) == 4)
+        assert (budget.getUsage("tenant1") == 4)
+
+    def test_clear_releasesUsage(self):
+        budget = CacheBudget(10)
+        cache = LruCache(10, budget, "tenant1")
+        cache.put("a", 1)
+        cache.put("a", 2)
+        cache.put("b", 3)
+        assert (budget.getUsage("tenant1") == 2)
+
+        cache.clear()
+        assert (budget.getUsage("tenant1") == 0)
+        assert (budget.totalUsage == 0)
+
+    def test_unregisterOwner_clearsCaches(self):
+        budget = CacheBudget(10)
+        cache = LruCache(10, budget, "tenant1")
+        otherCache = LruCache(10, budget, "tenant2")
+        cache.put("a", 1)
+        otherCache.put("a", 1)
+
+        budget.unregisterOwner("tenant1")
+
+        assert (len(cache) == 0)
+        assert (len(otherCache) == 1)
+        assert (budget.totalUsage == 1)
+        assert (budget.getFairShare() == 10)
+
+    def test_collectedCache_releasesUsage(self):
+        budget = CacheBudget(10)
+        cache = LruCache(10, budget, "tenant1")
+        cache.put("a", 1)
+        cache.put("b", 2)
+
+        del cache
+        gc.collect()
+        assert (budget.totalUsage == 0)
@@ -0,0 +1,199 @@
+import unittest
+import json
+
+from queueit_knownuserv3.multi_tenant_engine import MultiTenantKnownUserEngine
+from queueit_knownuserv3.known_user import KnownUser
+from queueit_knownuserv3.models import ActionTypes, KnownUserError
+from test_known_user_engine import HttpContextProviderMock
+
+
+def createIntegrationConfigString(eventId, hostName):
+    return json.dumps({
+        "Version": 3,
+        "Integrations": [{
+            "Name": eventId + "action",
+            "ActionType": "Queue",
+            "EventId": eventId,
+            "CookieDomain": "",
+            "LayoutName": "",
+            "Culture": "",
+            "ExtendCookieValidity": True,
+            "CookieValidityMinute": 20,
+            "QueueDomain": "knownusertest.queue-it.net",
+            "RedirectLogic": "AllowTParameter",
+            "ForcedTargetUrl": "",
+            "Triggers": [{
+                "TriggerParts": [{
+                    "Operator": "Contains",
+                    "ValueToCompare": hostName,
+                    "UrlPart": "HostName",
+                    "ValidatorType": "UrlValidator",
+                    "IsNegative": False,
+                    "IsIgnoreCase": True
+                }],
+                "LogicalOperator": "And"
+            }]
+        }]
+    })
+
+
+class TestMultiTenantKnownUserEngine(unittest.TestCase):
+    def setUp(self):
+        KnownUser.userInQueueService = None
+        self.engine = MultiTenantKnownUserEngine(100)
+        self.engine.addTenant(
+            "tenant1", "customer1", "secret1",
+            createIntegrationConfigString("event1", "shop1.com"),
+            hosts=["shop1.com", "WWW.shop1.com"])
+        self.engine.addTenant(
+            "tenant2", "customer2", "secret2",
+            createIntegrationConfigString("event2", "shop2.com"),
+            hosts=["shop2.com"])
+
+    def test_validateRequestByIntegrationConfig_resolvesTenantByHost(self):
+        result = self.engine.validateRequestByIntegrationConfig(
+            "http://www.shop1.com/page", None, HttpContextProviderMock())
+        assert (result.actionType == ActionTypes.QUEUE)
+        assert (result.eventId == "event1")
+        assert ("c=customer1" in result.redirectUrl)
+
+        result = self.engine.validateRequestByIntegrationConfig(
+            "http://shop2.com/page", None, HttpContextProviderMock())
+        assert (result.eventId == "event2")
+        assert ("c=customer2" in result.redirectUrl)
+
+    def test_validateRequestByIntegrationConfig_explicitTenantId(self):
+        result = self.engine.validateRequestByIntegrationConfig(
+            "http://shop2.com/page", None, HttpContextProviderMock(),
+            "tenant1")
+        assert (result.actionType is None)
+
+    def test_validateRequestByIntegrationConfig_unknownTenant(self):
+        errorThrown = False
+        try:
+            self.engine.validateRequestByIntegrationConfig(
+                "http://other.com/page", None, HttpContextProviderMock())
+        except KnownUserError as err:
+            errorThrown = err.message == "No tenant is mapped to host 'other.com'."
+        assert (errorThrown)
+
+        errorThrown = False
+        try:
+            self.engine.validateRequestByIntegrationConfig(
+                "http://shop1.com/page", None, HttpContextProviderMock(),
+                "tenant3")
+        except KnownUserError as err:
+            errorThrown = err.message == "Unknown tenant 'tenant3'."
+        assert (errorThrown)
+
+    def test_resolveTenant_malformedUrl_unknownTenant(self):
+        for url in ["http://[::1/page", "http://[shop1.com]/page"]:
+            errorThrown = False
+            try:
+                self.engine.validateRequestByIntegrationConfig(
+                    url, None, HttpContextProviderMock())
+            except KnownUserError as err:
+                errorThrown = err.message.startswith("No tenant is mapped")
+            assert (errorThrown)
+
+    def test_addTenant_forwardsEngineOptions(self):
+        engine = self.engine.addTenant(
+            "tenant3", "customer3", "secret3",
+            createIntegrationConfigString("event3", "shop3.com"), hosts=["shop3.com"],
+            strictConfig=True, adaptiveTriggerOrdering=True,
+            useUrlDecisionTable=True, optimizeConfig=True)
+
+        assert (engine.strictConfig and engine.optimizeConfig)
+        assert (engine.compiledConfig.adaptiveOrdering)
+        assert (engine.compiledConfig.urlDecisionTable is not None)
+        errorThrown = False
+        try:
+            self.engine.addTenant("tenant4", "customer4", "secret4",
+                                  json.dumps({"Integrations": []}), strictConfig=True)
+        except KnownUserError:
+            errorThrown = True
+        assert (errorThrown)
+
+    def test_addTenant_hostOwnedByOtherTenant(self):
+        errorThrown = False
+        try:
+            self.engine.addTenant("tenant3", "customer3", "secret3",
+                                  hosts=["SHOP1.com"])
+        except KnownUserError as err:
+            errorThrown = err.message.startswith("host 'shop1.com'")
+        assert (errorThrown)
+        assert (self.engine.getTenant("tenant3") is None)
+
+    def test_addTenant_invalidConfigKeepsCurrentTenant(self):
+        self.engine.validateRequestByIntegrationConfig(
+            "http://shop1.com/page", None, HttpContextProviderMock())
+        usage = self.engine.cacheBudget.getUsage("tenant1")
+        engine = self.engine.getTenant("tenant1")
+
+        for tenantId in ["tenant1", "tenant3"]:
+            errorThrown = False
+            try:
+                self.engine.addTenant(tenantId, "customer1", "secret1", "{not json",
+                                      hosts=["shop3.com"])
+            except Exception:
+                errorThrown = True
+            assert (errorThrown)
+
+        assert (self.engine.getTenant("tenant1") is engine)
+        assert (self.engine.getTenant("tenant3") is None)
+        assert (self.engine.getTenantByHost("shop3.com") is None)
+        assert (self.engine.cacheBudget.getUsage("tenant1") == usage)
+        result = self.engine.validateRequestByIntegrationConfig(
+            "http://www.shop1.com/page", None, HttpContextProviderMock())
+        assert (result.eventId == "event1")
+
+    def test_addTenant_reloadReplacesHostsAndReleasesOldCaches(self):
+        self.engine.validateRequestByIntegrationConfig(
+            "http://shop1.com/page", None, HttpContextProviderMock())
+        assert (self.engine.cacheBudget.getUsage("tenant1") > 0)
+
+        engine = self.engine.addTenant(
+            "tenant1", "customer1", "secret1",
+            createIntegrationConfigString("event3", "shop1.com"), hosts=["shop1.com"])
+
+        assert (self.engine.getTenantByHost("shop1.com") is engine)
+        assert (self.engine.getTenantByHost("www.shop1.com") is None)
+        assert (self.engine.cacheBudget.getUsage("tenant1") == 0)
+        result = self.engine.validateRequestByIntegrationConfig(
+            "http://shop1.com/page", None, HttpContextProviderMock())
+        assert (result.eventId == "event3")
+        assert (self.engine.cacheBudget.getUsage("tenant1") > 0)
+
+    def test_removeTenant_releasesCacheUsage(self):
+        self.engine.validateRequestByIntegrationConfig(
+            "http://shop1.com/page", None, HttpContextProviderMock())
+        assert (self.engine.cacheBudget.getUsage("tenant1") > 0)
+
+        assert (self.engine.removeTenant("tenant1"))
+        assert (not self.engine.removeTenant("tenant1"))
+        assert (self.engine.getTenantByHost("shop1.com") is None)
+        assert (self.engine.cacheBudget.getUsage("tenant1") == 0)
+        assert (self.engine.getTenantIds() == ["tenant2"])
+
+    def test_trafficSpike_doesNotEvictOtherTenant(self):
+        self.engine.validateRequestByIntegrationConfig(
+            "http://shop2.com/warm", None, HttpContextProviderMock())
+        tenant2Config = self.engine.getTenant("tenant2").compiledConfig
+        assert (len(tenant2Config.matchCache) == 1)
+
+        for i in range(500):
+            self.engine.validateRequestByIntegrationConfig(
+                "http://shop1.com/page" + str(i), None,
+                HttpContextProviderMock())
+
+        assert (len(tenant2Config.matchCache) == 1)
+        assert (self.engine.cacheBudget.totalUsage <= 100)
+
+    def test_updateIntegrationConfig_releasesOldCaches(self):
+        self.engine.validateRequestByIntegrationConfig(
+            "http://shop1.com/page", None, HttpContextProviderMock())
+        self.engine.updateIntegrationConfig(
+            "tenant1", json.dumps({"Version": 4, "Integrations": []}))
+
+        assert (self.engine.cacheBudget.getUsage("tenant1") == 0)
+        assert (self.engine.getTenant("tenant1").compiledConfig.version == 4)
@@ -0,0 +1,46 @@
+import unittest
+from urllib.parse import quote, unquote
+
+from queueit_knownuserv3.queueit_helpers import QueueitHelpers
+
+
+class TestQueueitHelpers(unittest.TestCase):
+    def setUp(self):
+        QueueitHelpers.clearUrlCodecCache()
+
+    def test_urlEncode_matchesQuote(self):
+        values = [
+            "", "abcXYZ019_.-~", "http://test.com/path?a=b&c=d#frag",
+            "space and+plus", "æøå/ü", "%41", "a€b", "event id 1"
+        ]
+        for value in values:
+            assert (QueueitHelpers.urlEncode(value) == quote(value, safe='~'))
+
+    def test_urlEncode_safeValueReturnedAsIs(self):
+        value = "SafeValue-1.2_3~"
+        assert (QueueitHelpers.urlEncode(value) is value)
+
+    def test_urlEncode_usesUpperCaseHex(self):
+        assert (QueueitHelpers.urlEncode("http://q.queue-it.net") ==
+                "http%3A%2F%2Fq.queue-it.net")
+
+    def test_urlDecode_matchesUnquote(self):
+        values = [
+            "", "plain", "http%3A%2F%2Ftest.com%2F%3Fa%3Db", "a+b%20c",
+            "%C3%A6%C3%B8%C3%A5", "%zz", "100%"
+        ]
+        for value in values:
+            assert (QueueitHelpers.urlDecode(value) == unquote(value))
+
+    def test_urlEncode_urlDecode_roundTrip(self):
+        value = "EventId=e1&QueueId=q1&RedirectType=queue&Hash=abc"
+        encoded = QueueitHelpers.urlEncode(value)
+        assert (QueueitHelpers.urlDecode(encoded) == value)
+        assert (QueueitHelpers.urlDecode(encoded) == value)
+
+    def test_hmacSha256Encode_acceptsStrAndBytes(self):
+        expected = "f7bc83f430538424b13298e6aa6fb143ef4d59a14946175997479dbc2d1a3cd8"
+        assert (QueueitHelpers.hmacSha256Encode(
+            "The quick brown fox jumps over the lazy dog", "key") == expected)
+        assert (QueueitHelpers.hmacSha256Encode(
+            b"The quick brown fox jumps over the lazy dog", b"key") == expected)
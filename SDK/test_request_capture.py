@@ -0,0 +1,215 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from queueit_knownuserv3 import __main__
+from queueit_knownuserv3.known_user import KnownUser
+from queueit_knownuserv3.known_user_engine import KnownUserEngine
+from queueit_knownuserv3.models import ActionTypes, KnownUserError
+from queueit_knownuserv3.queueit_helpers import QueueitHelpers
+from queueit_knownuserv3.request_capture import (RecordedClock, RequestCapture,
+                                                 RequestCaptureWriter,
+                                                 RequestReplayer)
+from queueit_knownuserv3.request_inputs import RequestInputs
+from test_known_user_engine import HttpContextProviderMock, createIntegrationConfigString
+from test_user_in_queue_service import TestHelper
+
+
+class RequestInputsProvider(RequestInputs):
+    def __init__(self, cookies=None, headers=None):
+        RequestInputs.__init__(self, cookies, headers)
+        self.setCookies = {}
+
+    def setCookie(self, name, value, expire, domain):
+        self.setCookies[name] = value
+
+
+class TestRequestCapture(unittest.TestCase):
+    def setUp(self):
+        KnownUser.userInQueueService = None
+        self.directory = tempfile.mkdtemp()
+        self.capturePath = os.path.join(self.directory, "capture.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def captureRequests(self, sampleRate=1.0):
+        requestCapture = RequestCapture(self.capturePath, sampleRate)
+        engine = KnownUserEngine("customerid", "secretkey",
+                                 createIntegrationConfigString(),
+                                 requestCapture=requestCapture)
+        queueitToken = TestHelper.generateHash(
+            "event1", "queueid", str(QueueitHelpers.getCurrentTime() + 180),
+            "true", None, "queue", "secretkey")
+        hcpMock = HttpContextProviderMock()
+        hcpMock.headers["user-agent"] = "Mozilla"
+        results = [
+            engine.validateRequestByIntegrationConfig("http://other.com/page", None, hcpMock),
+            engine.validateRequestByIntegrationConfig("http://test.com/page", None, hcpMock),
+            engine.validateRequestByIntegrationConfig("http://test.com/page", queueitToken, hcpMock)
+        ]
+        requestCapture.close()
+        return results
+
+    def test_capture_recordsRequestsAndDecisions(self):
+        results = self.captureRequests()
+
+        assert (results[1].doRedirect())
+        assert (results[2].actionType == ActionTypes.QUEUE and not results[2].doRedirect())
+        records = list(RequestCaptureWriter.readRecords(self.capturePath))
+        assert ([record["u"] for record in records] == [
+            "http://other.com/page", "http://test.com/page", "http://test.com/page"])
+        assert (records[0]["d"] == [None, None, None, None, None, None, False])
+        assert (records[1]["d"][0] == "Queue" and records[1]["d"][3] == results[1].redirectUrl)
+        assert (records[2]["k"] is not None and records[2]["d"][2] == "queueid")
+        assert ("QueueITAccepted-SDFrts345E-V3_event1" in records[1]["c"])
+        assert (all(isinstance(record["t"], int) and record["l"] >= 0 for record in records))
+
+    def test_capture_requestInputsProvider_keepsFastPath(self):
+        customerIntegration = json.loads(createIntegrationConfigString())
+        customerIntegration["Integrations"][0]["Triggers"][0]["TriggerParts"].append({
+            "CookieName": "c1",
+            "ValidatorType": "CookieValidator",
+            "ValueToCompare": "v1",
+            "Operator": "Equals",
+            "IsIgnoreCase": False,
+            "IsNegative": False
+        })
+        requestCapture = RequestCapture(self.capturePath)
+        engine = KnownUserEngine("customerid", "secretkey", json.dumps(customerIntegration),
+                                 requestCapture=requestCapture)
+        fetch = RequestInputs.fetch
+        RequestInputs.fetch = staticmethod(lambda *args: self.fail("request inputs fetched"))
+        try:
+            result = engine.validateRequestByIntegrationConfig(
+                "http://test.com/page", None, RequestInputsProvider({"c1": "v1"}))
+        finally:
+            RequestInputs.fetch = staticmethod(fetch)
+        requestCapture.close()
+
+        assert (result.doRedirect())
+        records = list(RequestCaptureWriter.readRecords(self.capturePath))
+        assert (records[0]["c"]["c1"] == "v1")
+        assert (records[0]["p"] == "request-inputs")
+        report = RequestReplayer(json.dumps(customerIntegration), "customerid",
+                                 "secretkey").replay(records)
+        assert (report.mismatchCount == 0)
+
+    def test_capture_sampleRate(self):
+        self.captureRequests(0.0)
+        assert (not os.path.exists(self.capturePath))
+
+        errorThrown = False
+        try:
+            RequestCapture(self.capturePath, 1.5)
+        except KnownUserError:
+            errorThrown = True
+        assert (errorThrown)
+
+    def test_replay_reproducesDecisions(self):
+        self.captureRequests()
+        records = list(RequestCaptureWriter.readRecords(self.capturePath))
+
+        for engine in [None, KnownUserEngine("customerid", "secretkey",
+                                             createIntegrationConfigString())]:
+            report = RequestReplayer(createIntegrationConfigString(), "customerid",
+                                     "secretkey", engine).replay(records)
+            assert (report.requestCount == 3)
+            assert (report.errorCount == 0)
+            assert (report.mismatchCount == 0)
+            assert (report.actionCounts == {None: 1, "Queue": 2})
+            assert (len(report.latencies) == 3 and len(report.recordedLatencies) == 3)
+        assert ("decision mismatches: 0" in report.formatReport())
+
+        report = RequestReplayer(createIntegrationConfigString(), "customerid",
+                                 "othersecret").replay(records)
+        assert (report.mismatchCount == 1)
+        assert (report.mismatches[0][0] == "http://test.com/page")
+
+    def test_replay_usesRecordedClock(self):
+        currentTime = 1000000
+        queueitToken = TestHelper.generateHash(
+            "event1", "queueid", str(currentTime + 180), "true", None, "queue", "secretkey")
+        record = {"v": 1, "t": currentTime, "u": "http://test.com/page", "k": queueitToken,
+                  "d": ["Queue", "event1", "queueid", None, "queue", "event1action", False]}
+        getCurrentTime = QueueitHelpers.getCurrentTime
+
+        report = RequestReplayer(createIntegrationConfigString(), "customerid",
+                                 "secretkey").replay([record])
+
+        assert (report.mismatchCount == 0)
+        assert (QueueitHelpers.getCurrentTime == getCurrentTime)
+        with RecordedClock() as clock:
+            clock.currentTime = currentTime
+            assert (QueueitHelpers.getCurrentTime() == currentTime)
+            assert (QueueitHelpers.getCurrentTimeAsIso8601Str() == "1970-01-12T13:46:40Z")
+        assert (QueueitHelpers.getCurrentTime() > currentTime)
+
+    def test_writer_rotatesBySize(self):
+        writer = RequestCaptureWriter(self.capturePath, maxBytes=200, backupCount=2)
+        for index in range(30):
+            writer.write({"v": 1, "u": "http://test.com/" + str(index)})
+        writer.close()
+
+        assert (writer.writtenCount == 30)
+        assert (not os.path.exists(self.capturePath + ".3"))
+        files = RequestCaptureWriter.getCaptureFiles(self.capturePath)
+        assert (files == [self.capturePath + ".2", self.capturePath + ".1", self.capturePath])
+        assert (all(os.path.getsize(path) <= 200 for path in files))
+        urls = [record["u"] for record in RequestCaptureWriter.readRecords(self.capturePath)]
+        assert (urls == ["http://test.com/" + str(index)
+                         for index in range(30 - len(urls), 30)])
+
+    def test_writer_failure_dropsRecordsAndRaisesOnClose(self):
+        for capturePath, record in [
+                (os.path.join(self.directory, "missing", "capture.jsonl"), {"v": 1}),
+                (self.capturePath, {"v": 1, "u": object()})]:
+            writer = RequestCaptureWriter(capturePath)
+            writer.write(record)
+            for _ in range(100):
+                if (writer.error is not None):
+                    break
+                time.sleep(0.01)
+            writer.write({"v": 1})
+            assert (writer.droppedCount == 1)
+            assert (writer.writtenCount == 0)
+
+            errorThrown = False
+            try:
+                writer.close()
+            except KnownUserError:
+                errorThrown = True
+            assert (errorThrown)
+
+    def test_capture_afterClose_dropsRecord(self):
+        requestCapture = RequestCapture(self.capturePath)
+        engine = KnownUserEngine("customerid", "secretkey", createIntegrationConfigString(),
+                                 requestCapture=requestCapture)
+        requestCapture.close()
+
+        result = engine.validateRequestByIntegrationConfig(
+            "http://test.com/page", None, HttpContextProviderMock())
+        assert (result.doRedirect())
+        assert (requestCapture.writer.droppedCount == 1)
+        assert (not os.path.exists(self.capturePath))
+        requestCapture.close()
+
+    def test_writer_skipsTruncatedLine(self):
+        with open(self.capturePath, "wb") as captureFile:
+            captureFile.write(b'{"v":1,"u":"http://test.com/"}\n{"v":1,"u":"ht')
+        records = list(RequestCaptureWriter.readRecords(self.capturePath))
+        assert (records == [{"v": 1, "u": "http://test.com/"}])
+
+    def test_main_replay(self):
+        self.captureRequests()
+        configPath = os.path.join(self.directory, "integrationconfig.json")
+        with open(configPath, "w") as configFile:
+            configFile.write(createIntegrationConfigString())
+
+        arguments = ["replay", self.capturePath, "--config", configPath,
+                     "--customer-id", "customerid"]
+        assert (__main__.main(arguments + ["--secret-key", "secretkey"]) == 0)
+        assert (__main__.main(arguments + ["--secret-key", "othersecret", "--engine"]) == 1)
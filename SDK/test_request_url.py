@@ -0,0 +1,89 @@
+import unittest
+import random
+from urllib.parse import urlparse
+
+from queueit_knownuserv3.compiled_integration_config import CompiledIntegrationConfig
+from queueit_knownuserv3.integration_config_helpers import UrlValidatorHelper
+from queueit_knownuserv3.request_url import RequestUrl
+
+
+class TestRequestUrl(unittest.TestCase):
+    def test_parse_noToken(self):
+        url = RequestUrl.parse("https://Shop.Test.com:8080/a/b?c=1#d")
+        assert (url == "https://Shop.Test.com:8080/a/b?c=1#d")
+        assert (isinstance(url, str))
+        assert (url.queueitToken is None)
+        assert (url.hostName == "shop.test.com")
+        assert (url.path == "/a/b")
+        assert (url.originalUrl == url)
+
+    def test_parse_removesToken(self):
+        for requestUrl, expectedUrl in [
+                ("http://test.com/?queueittoken=e_1~q_2&a=b", "http://test.com/?a=b"),
+                ("http://test.com/?a=b&queueittoken=e_1~q_2", "http://test.com/?a=b"),
+                ("http://test.com/?a=b&queueittoken=e_1~q_2&c=d", "http://test.com/?a=b&c=d"),
+                ("http://test.com/?queueittoken=e_1~q_2", "http://test.com/"),
+                ("http://test.com/?QueueITToken=e_1~q_2#top", "http://test.com/#top"),
+                ("http://test.com/?a=b&queueittoken=e_1~q_2&queueittoken=x#top", "http://test.com/?a=b#top")]:
+            url = RequestUrl.parse(requestUrl)
+            assert (url == expectedUrl), requestUrl
+            assert (url.queueitToken == "e_1~q_2"), requestUrl
+            assert (url.originalUrl == requestUrl)
+            assert (url.hostName == "test.com")
+            assert (url.path == "/")
+
+    def test_parse_decodesToken(self):
+        url = RequestUrl.parse("http://test.com/?queueittoken=e_1%7Eq_2")
+        assert (url.queueitToken == "e_1~q_2")
+        assert (RequestUrl.parse("http://test.com/?queueittoken=").queueitToken == "")
+
+    def test_parse_keepsOtherParameters(self):
+        for requestUrl in ["http://test.com/queueittoken?a=1",
+                           "http://test.com/?queueittokens=1",
+                           "http://test.com/?a=queueittoken",
+                           "http://test.com/#?queueittoken=1"]:
+            url = RequestUrl.parse(requestUrl)
+            assert (url == requestUrl)
+            assert (url.queueitToken is None)
+
+    def test_parse_invalidUrl(self):
+        url = RequestUrl.parse("http://[::1/a?queueittoken=x")
+        assert (url == "http://[::1/a")
+        assert (url.queueitToken == "x")
+        assert (not url.isValid)
+        assert (UrlValidatorHelper.getUrlPart("PageUrl", url) == "")
+        with self.assertRaises(ValueError):
+            RequestUrl.getHostNameAndPath(url)
+
+    def test_splitUrl_equivalentToUrlparse(self):
+        pieces = ["http://", "https://", "HTTP://", "a", "B", "1", ".", ":", "@", "[", "]", "/", "?", "#",
+                  ";", "&", "=", "%20", " ", "\t", "\n", "é", "-", "_"]
+        rnd = random.Random(44)
+        for _ in range(20000):
+            url = rnd.choice(["http://", "https://", ""]) + "".join(
+                rnd.choice(pieces) for _ in range(rnd.randint(0, 10)))
+            try:
+                uri = urlparse(url)
+                expected = (uri.hostname, uri.path)
+            except ValueError:
+                expected = None
+            try:
+                actual = RequestUrl.splitUrl(url)
+            except ValueError:
+                actual = None
+            assert (actual == expected), url
+
+    def test_compiledConfig_usesParsedUrl(self):
+        compiledConfig = CompiledIntegrationConfig({"Integrations": [{
+            "Name": "queue",
+            "Triggers": [{"LogicalOperator": "And", "TriggerParts": [{
+                "UrlPart": "PageUrl",
+                "ValidatorType": "UrlValidator",
+                "ValueToCompare": "http://test.com/a?b=1",
+                "Operator": "Equals",
+                "IsIgnoreCase": False,
+                "IsNegative": False
+            }]}]
+        }]})
+        url = RequestUrl.parse("http://test.com/a?queueittoken=x&b=1")
+        assert (compiledConfig.getMatchedIntegrationConfig(url, None)["Name"] == "queue")
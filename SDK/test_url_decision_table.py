@@ -0,0 +1,97 @@
+import unittest
+import random
+
+from queueit_knownuserv3.compiled_integration_config import CompiledIntegrationConfig
+from queueit_knownuserv3.integration_config_helpers import IntegrationEvaluator
+from queueit_knownuserv3.url_decision_table import AhoCorasickAutomaton
+from test_compiled_integration_config import (HttpContextProviderMock,
+                                              corruptConfig,
+                                              createRandomConfig,
+                                              createRandomRequest,
+                                              createUrlOnlyConfig)
+
+SPECIAL_VALUES = ["*", "", "/", "COM", "check", "checkout", "ß", "SS", "Test.com", "\x00",
+                  "/queue\x00"]
+
+
+def addSpecialValues(rnd, customerIntegration):
+    for integration in customerIntegration["Integrations"]:
+        for trigger in integration["Triggers"]:
+            for triggerPart in trigger["TriggerParts"]:
+                if (triggerPart["ValidatorType"] != "UrlValidator" or rnd.random() < 0.5):
+                    continue
+                triggerPart["ValueToCompare"] = rnd.choice(SPECIAL_VALUES)
+                triggerPart["ValuesToCompare"] = rnd.sample(SPECIAL_VALUES, rnd.randint(0, 3))
+
+
+def createSpecialRequest(rnd):
+    url, cookies, headers = createRandomRequest(rnd)
+    if (rnd.random() < 0.2):
+        url = rnd.choice(["http://test.com/straße", "http://TEST.COM/CHECKOUT",
+                          "http:///nohost", "http://[::1/broken", "/relative/checkout",
+                          "http://test.com/queue\x00", "http://test.com/queue"])
+    return url, cookies, headers
+
+
+class TestAhoCorasickAutomaton(unittest.TestCase):
+    def test_findAll_overlappingPatterns(self):
+        automaton = AhoCorasickAutomaton({"he": 0, "she": 1, "his": 2, "hers": 3, "e": 4})
+        assert (automaton.findAll("ushers", set()) == set([0, 1, 3, 4]))
+        assert (automaton.findAll("his", set()) == set([2]))
+        assert (automaton.findAll("xyz", set()) == set())
+        assert (automaton.findAll("", set()) == set())
+
+    def test_findAll_equivalentToSubstringSearch(self):
+        rnd = random.Random(40)
+        for _ in range(50):
+            patterns = dict(("".join(rnd.choice("abc") for _ in range(rnd.randint(1, 4))), i)
+                            for i in range(rnd.randint(1, 12)))
+            automaton = AhoCorasickAutomaton(patterns)
+            for _ in range(20):
+                text = "".join(rnd.choice("abcd") for _ in range(rnd.randint(0, 20)))
+                assert (automaton.findAll(text, set()) ==
+                        set(output for pattern, output in patterns.items() if pattern in text))
+
+
+class TestUrlDecisionTable(unittest.TestCase):
+    def assertEquivalentToEvaluator(self, seed, corrupt, matchCacheSize):
+        rnd = random.Random(seed)
+        evaluator = IntegrationEvaluator()
+        for _ in range(60):
+            customerIntegration = createRandomConfig(rnd, rnd.randint(1, 8))
+            addSpecialValues(rnd, customerIntegration)
+            if (corrupt):
+                corruptConfig(rnd, customerIntegration)
+            compiledConfig = CompiledIntegrationConfig(customerIntegration, matchCacheSize,
+                                                       useUrlDecisionTable=True)
+            for _ in range(40):
+                url, cookies, headers = createSpecialRequest(rnd)
+                expected = evaluator.getMatchedIntegrationConfig(
+                    customerIntegration, url, HttpContextProviderMock(cookies, headers))
+                actual = compiledConfig.getMatchedIntegrationConfig(
+                    url, HttpContextProviderMock(cookies, headers))
+                assert (actual is expected), (customerIntegration, url)
+
+    def test_equivalentToEvaluator(self):
+        self.assertEquivalentToEvaluator(40, False, None)
+
+    def test_equivalentToEvaluator_withoutCaches(self):
+        self.assertEquivalentToEvaluator(41, False, 0)
+
+    def test_malformedConfig_equivalentToEvaluator(self):
+        self.assertEquivalentToEvaluator(42, True, 0)
+
+    def test_urlOnlyConfig_sharesTableEntriesAcrossUrls(self):
+        compiledConfig = CompiledIntegrationConfig(createUrlOnlyConfig(),
+                                                   useUrlDecisionTable=True)
+        urlDecisionTable = compiledConfig.urlDecisionTable
+        assert (urlDecisionTable.getAtomCount() == 2)
+
+        for path in ["/queue", "/queue/a", "/b/queue", "/other", "/other2"]:
+            compiledConfig.getMatchedIntegrationConfig("http://test.com" + path, HttpContextProviderMock())
+        assert (len(compiledConfig.matchCache) == 5)
+        assert (len(urlDecisionTable.table) == 2)
+        assert (urlDecisionTable.table.hits == 3)
+
+        compiledConfig.clearCaches()
+        assert (len(urlDecisionTable.table) == 0)
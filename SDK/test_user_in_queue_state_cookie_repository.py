@@ -1,6 +1,6 @@
 import unittest
 
-from queueit_knownuserv3.user_in_queue_state_cookie_repository import UserInQueueStateCookieRepository
+from queueit_knownuserv3.user_in_queue_state_cookie_repository import UserInQueueStateCookieRepository, QueueStateCookie
 from queueit_knownuserv3.queueit_helpers import QueueitHelpers
 from queueit_knownuserv3.http_context_providers import HttpContextProvider
 from queueit_knownuserv3.models import Utils
@@ -332,3 +332,141 @@ class TestUserInQueueStateCookieRepository(unittest.TestCase):
         state = testObject.getState(eventId, 10, secretKey, True)
         assert (not state.isFound)
         assert (not state.isValid)
+
+    def test_store_compactCookie_hasValidState(self):
+        eventId = "event1"
+        secretKey = "4e1deweb821-a82ew5-49da-acdqq0-5d3476f2068db"
+        queueId = "f8757c2d-34c2-4639-bef2-1736cdd30bbb"
+        cookieKey = UserInQueueStateCookieRepository.getCookieKey(eventId)
+        wfHandler = HttpContextProviderMock()
+        testObject = UserInQueueStateCookieRepository(wfHandler, True)
+        testObject.store(eventId, queueId, 3, ".test.com", "Queue", secretKey)
+
+        cookieValue = wfHandler.cookieList[cookieKey]["value"]
+        parts = cookieValue.split("~")
+        assert (parts[0] == "4")
+        assert (parts[1:5] == ["e_event1", "q_" + queueId, "f_3", "r_Queue"])
+        assert (len(parts[5]) == len("i_") + 6)
+        assert (len(parts[6]) == len("h_") + 22)
+        assert (len(cookieValue) < len(
+            "EventId=event1&QueueId=" + queueId +
+            "&FixedValidityMins=3&RedirectType=Queue&IssueTime=1700000000&Hash=") + 64)
+        assert (QueueitHelpers.urlEncode(cookieValue) == cookieValue)
+
+        state = testObject.getState(eventId, 10, secretKey, True)
+        assert (state.isValid)
+        assert (state.queueId == queueId)
+        assert (state.fixedCookieValidityMinutes == 3)
+        assert (state.redirectType == "Queue")
+
+    def test_getState_compactAndLegacyCookies_readSideBySide(self):
+        secretKey = "4e1deweb821-a82ew5-49da-acdqq0-5d3476f2068db"
+        wfHandler = HttpContextProviderMock()
+        UserInQueueStateCookieRepository(wfHandler, True).store(
+            "event1", "queueId1", None, "", "Queue", secretKey)
+        UserInQueueStateCookieRepository(wfHandler).store(
+            "event2", "queueId2", None, "", "Queue", secretKey)
+
+        for testObject in [UserInQueueStateCookieRepository(wfHandler),
+                           UserInQueueStateCookieRepository(wfHandler, True)]:
+            assert (testObject.getState("event1", 10, secretKey, True).queueId
+                    == "queueId1")
+            assert (testObject.getState("event2", 10, secretKey, True).queueId
+                    == "queueId2")
+
+    def test_getState_compactCookie_tampered_stateIsNotValid(self):
+        secretKey = "4e1deweb821-a82ew5-49da-acdqq0-5d3476f2068db"
+        cookieKey = UserInQueueStateCookieRepository.getCookieKey("event1")
+        wfHandler = HttpContextProviderMock()
+        testObject = UserInQueueStateCookieRepository(wfHandler, True)
+        testObject.store("event1", "queueId", None, "", "Queue", secretKey)
+        cookieValue = wfHandler.cookieList[cookieKey]["value"]
+
+        for tamperedValue in [
+                cookieValue.replace("r_Queue", "r_Idle"),
+                cookieValue.replace("~r_Queue", "~f_9~r_Queue"),
+                cookieValue.replace("~r_Queue", "~r_Queue~r_Queue"),
+                cookieValue.replace("~i_", "~i_A"),
+                cookieValue[:-1]]:
+            wfHandler.cookieList[cookieKey]["value"] = tamperedValue
+            state = testObject.getState("event1", 10, secretKey, True)
+            assert (state.isFound)
+            assert (not state.isValid)
+
+    def test_getState_compactCookie_expired_stateIsNotValid(self):
+        secretKey = "4e1deweb821-a82ew5-49da-acdqq0-5d3476f2068db"
+        wfHandler = HttpContextProviderMock()
+        testObject = UserInQueueStateCookieRepository(wfHandler, True)
+        testObject.store("event1", "queueId", 1, "", "Queue", secretKey)
+        getCurrentTime = QueueitHelpers.getCurrentTime
+        currentTime = getCurrentTime()
+        QueueitHelpers.getCurrentTime = staticmethod(lambda: currentTime + 120)
+        try:
+            state = testObject.getState("event1", 10, secretKey, True)
+        finally:
+            QueueitHelpers.getCurrentTime = staticmethod(getCurrentTime)
+        assert (not state.isValid)
+
+    def test_reissueQueueCookie_legacyCookie_rewrittenAsCompact(self):
+        secretKey = "4e1deweb821-a82ew5-49da-acdqq0-5d3476f2068db"
+        cookieKey = UserInQueueStateCookieRepository.getCookieKey("event1")
+        wfHandler = HttpContextProviderMock()
+        UserInQueueStateCookieRepository(wfHandler).store(
+            "event1", "queueId", None, "", "Queue", secretKey)
+
+        testObject = UserInQueueStateCookieRepository(wfHandler, True)
+        testObject.reissueQueueCookie("event1", 10, "", secretKey)
+
+        assert (wfHandler.cookieList[cookieKey]["value"].startswith("4~"))
+        assert (testObject.getState("event1", 10, secretKey, True).isValid)
+
+
+class TestQueueStateCookie(unittest.TestCase):
+    def test_parse_canonicalCookie(self):
+        stateCookie = QueueStateCookie.parse(
+            "EventId=event1&QueueId=queueId&FixedValidityMins=3"
+            "&RedirectType=idle&IssueTime=1700000000&Hash=abc")
+        assert (stateCookie.isComplete())
+        assert (stateCookie.eventId == "event1")
+        assert (stateCookie.queueId == "queueId")
+        assert (stateCookie.fixedCookieValidityMinutes == "3")
+        assert (stateCookie.redirectType == "idle")
+        assert (stateCookie.issueTime == "1700000000")
+        assert (stateCookie.hashValue == "abc")
+        assert (stateCookie.version is None)
+
+    def test_parse_reorderedCookie(self):
+        stateCookie = QueueStateCookie.parse(
+            "Hash=abc&IssueTime=1700000000&Other=1&RedirectType=queue"
+            "&QueueId=queueId&EventId=event1&Broken=a=b")
+        assert (stateCookie.isComplete())
+        assert (stateCookie.fixedCookieValidityMinutes == "")
+        assert (stateCookie.eventId == "event1")
+        assert (stateCookie.hashValue == "abc")
+
+    def test_parse_malformedCookie(self):
+        assert (QueueStateCookie.parse("") is None)
+        assert (QueueStateCookie.parse("EventId=event1&QueueId=queueId") is None)
+        assert (QueueStateCookie.parse(
+            "EventId=event1&QueueId=queueId&RedirectType=idle"
+            "&IssueTime=17x&Hash=abc") is None)
+        assert (QueueStateCookie.parse(
+            "EventId=event1&QueueId=queueId&FixedValidityMins=-1"
+            "&RedirectType=idle&IssueTime=1700000000&Hash=abc") is None)
+        assert (QueueStateCookie.parse(
+            "EventId=event1&RedirectType=idle&IssueTime=1700000000"
+            "&Hash=abc") is None)
+        assert (not QueueStateCookie.parse(
+            "EventId=event1&FixedValidityMins=3&RedirectType=idle"
+            "&IssueTime=1700000000&Hash=abc").isComplete())
+
+    def test_parse_compactCookie(self):
+        stateCookie = QueueStateCookie.parse(
+            "4~e_event1~q_queueId~r_queue~i_ZVPxAA~h_abc")
+        assert (stateCookie.version == "4")
+        assert (stateCookie.issueTime == str(0x6553F100))
+        assert (stateCookie.fixedCookieValidityMinutes == "")
+        assert (QueueStateCookie.parse(
+            "4~e_event1~q_queueId~r_queue~i_ZVPx~h_abc") is None)
+        assert (QueueStateCookie.parse(
+            "4~q_queueId~e_event1~r_queue~i_ZVPxAA~h_abc") is None)
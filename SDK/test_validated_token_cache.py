@@ -0,0 +1,130 @@
+import unittest
+
+from queueit_knownuserv3.validated_token_cache import ValidatedTokenCache
+from queueit_knownuserv3.queue_url_params import QueueUrlParams
+from queueit_knownuserv3.queueit_helpers import QueueitHelpers
+from queueit_knownuserv3.user_in_queue_service import UserInQueueService
+from queueit_knownuserv3.user_in_queue_state_cookie_repository import StateInfo
+from queueit_knownuserv3.models import QueueEventConfig
+from test_user_in_queue_service import HttpContextProviderMock, UserInQueueStateCookieRepositoryMock, TestHelper
+
+
+class TestValidatedTokenCache(unittest.TestCase):
+    def setUp(self):
+        self.currentTime = 1000
+        self.originalGetCurrentTime = QueueitHelpers.getCurrentTime
+        QueueitHelpers.getCurrentTime = staticmethod(lambda: self.currentTime)
+
+    def tearDown(self):
+        QueueitHelpers.getCurrentTime = self.originalGetCurrentTime
+
+    def createQueueParams(self, timeStamp):
+        queueParams = QueueUrlParams()
+        queueParams.timeStamp = timeStamp
+        return queueParams
+
+    def test_get_afterPut(self):
+        cache = ValidatedTokenCache(ttlSeconds=60)
+        queueParams = self.createQueueParams(2000)
+        cache.put("token", "key", queueParams, True)
+
+        validatedToken = cache.get("token", "key")
+        assert (validatedToken.queueParams is queueParams)
+        assert (validatedToken.isHashValid)
+        assert (validatedToken.expiresAt == 1060)
+
+    def test_get_differentSecretKey_notFound(self):
+        cache = ValidatedTokenCache()
+        cache.put("token", "key", self.createQueueParams(2000), True)
+
+        assert (cache.get("token", "otherkey") is None)
+
+    def test_get_expiresNoLaterThanTokenTimestamp(self):
+        cache = ValidatedTokenCache(ttlSeconds=60)
+        cache.put("token", "key", self.createQueueParams(1010), False)
+        assert (cache.get("token", "key").expiresAt == 1010)
+
+        self.currentTime = 1011
+        assert (cache.get("token", "key") is None)
+
+    def test_put_invalidTokens_doNotEvictValidTokens(self):
+        cache = ValidatedTokenCache(maxSize=2, invalidMaxSize=2)
+        cache.put("token1", "key", self.createQueueParams(2000), True)
+        cache.put("token2", "key", self.createQueueParams(2000), True)
+        for i in range(10):
+            cache.put("forged" + str(i), "key", self.createQueueParams(2000), False)
+
+        assert (cache.get("token1", "key").isHashValid)
+        assert (cache.get("token2", "key").isHashValid)
+        assert (not cache.get("forged9", "key").isHashValid)
+        assert (cache.get("forged0", "key") is None)
+        assert (len(cache.entries) == 2 and len(cache.invalidEntries) == 2)
+
+    def test_put_expiredToken_notStored(self):
+        cache = ValidatedTokenCache()
+        assert (cache.put("token", "key", self.createQueueParams(999), True) is None)
+        assert (cache.get("token", "key") is None)
+
+    def test_getSecretKeyFingerprint(self):
+        fingerprint = ValidatedTokenCache.getSecretKeyFingerprint("key")
+        assert (len(fingerprint) == 16)
+        assert ("key" not in fingerprint)
+        assert (fingerprint != ValidatedTokenCache.getSecretKeyFingerprint("key2"))
+
+
+class TestUserInQueueServiceWithValidatedTokenCache(unittest.TestCase):
+    def setUp(self):
+        self.hmacCalls = 0
+        self.originalHmacSha256Encode = QueueitHelpers.hmacSha256Encode
+
+        def countingHmacSha256Encode(value, key):
+            self.hmacCalls += 1
+            return self.originalHmacSha256Encode(value, key)
+        QueueitHelpers.hmacSha256Encode = staticmethod(countingHmacSha256Encode)
+
+    def tearDown(self):
+        QueueitHelpers.hmacSha256Encode = self.originalHmacSha256Encode
+
+    def validateQueueRequest(self, token, key, validatedTokenCache):
+        queueConfig = QueueEventConfig()
+        queueConfig.eventId = "e1"
+        queueConfig.queueDomain = "testDomain.com"
+        queueConfig.cookieValidityMinute = 10
+        queueConfig.extendCookieValidity = True
+        queueConfig.actionName = "QueueAction"
+        httpContextProviderMock = HttpContextProviderMock()
+        repositoryMock = UserInQueueStateCookieRepositoryMock(httpContextProviderMock)
+        repositoryMock.arrayReturns['getState'].append(StateInfo(False, False, None, None, None))
+        testObject = UserInQueueService(httpContextProviderMock, repositoryMock,
+                                        validatedTokenCache)
+        return testObject.validateQueueRequest("http://test.test.com", token,
+                                               queueConfig, "testCustomer", key)
+
+    def test_validateQueueRequest_repeatedToken_hashComputedOnce(self):
+        key = "4e1db821-a825-49da-acd0-5d376f2068db"
+        token = TestHelper.generateHash(
+            'e1', 'queueId', str(QueueitHelpers.getCurrentTime() + 180),
+            'true', None, 'queue', key)
+        self.hmacCalls = 0
+        cache = ValidatedTokenCache()
+
+        first = self.validateQueueRequest(token, key, cache)
+        second = self.validateQueueRequest(token, key, cache)
+
+        assert (not first.doRedirect() and first.queueId == "queueId")
+        assert (not second.doRedirect() and second.queueId == "queueId")
+        assert (self.hmacCalls == 1)
+
+    def test_validateQueueRequest_repeatedTamperedToken_stillRejected(self):
+        key = "4e1db821-a825-49da-acd0-5d376f2068db"
+        token = TestHelper.generateHash(
+            'e1', 'queueId', str(QueueitHelpers.getCurrentTime() + 180),
+            'true', None, 'queue', key).replace("q_queueId", "q_other")
+        self.hmacCalls = 0
+        cache = ValidatedTokenCache()
+
+        for _ in range(2):
+            result = self.validateQueueRequest(token, key, cache)
+            assert (result.doRedirect())
+            assert ("/error/hash/" in result.redirectUrl)
+        assert (self.hmacCalls == 1)